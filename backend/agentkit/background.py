@@ -0,0 +1,79 @@
+"""
+Background Execution
+Runs accepted work after the response has been sent and keeps receipts for status lookups
+"""
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+
+load_dotenv()
+
+MAX_PENDING = int(os.getenv("AGENT_BACKGROUND_MAX_PENDING", "1000"))
+# Finished receipts kept for GET /receipts/{id}
+MAX_RECEIPTS = int(os.getenv("AGENT_RECEIPTS_KEPT", "10000"))
+
+log = get_logger("agent.background")
+
+
+class BackgroundRunner:
+    """
+    Schedules coroutines on the running loop and tracks them by receipt id
+
+    At most `max_pending` jobs run at once; submit() returns None beyond
+    that so the caller can do the work inline instead (backpressure rather
+    than an unbounded task pile-up).
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING, max_receipts: int = MAX_RECEIPTS):
+        self.max_pending = max_pending
+        self.max_receipts = max_receipts
+        self._ids = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+        self._receipts: OrderedDict[str, dict] = OrderedDict()
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, job: Callable[[], Awaitable[dict]], **info) -> str | None:
+        """Start job() in the background; returns its receipt id, or None when full"""
+        if len(self._tasks) >= self.max_pending:
+            return None
+        receipt_id = f"r-{int(time.time())}-{next(self._ids)}"
+        self._receipts[receipt_id] = {"receipt": receipt_id, "status": "pending", **info}
+        self._trim()
+
+        task = asyncio.get_running_loop().create_task(self._run(receipt_id, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return receipt_id
+
+    async def _run(self, receipt_id: str, job: Callable[[], Awaitable[dict]]) -> None:
+        try:
+            result = await job()
+            update = {"status": "done", "result": result}
+        except Exception as e:
+            log.error("Background job %s failed: %s", receipt_id, e)
+            update = {"status": "failed", "error": str(e)}
+        receipt = self._receipts.get(receipt_id)
+        if receipt is not None:
+            receipt.update(update, finished_at=time.time())
+
+    def get(self, receipt_id: str) -> dict | None:
+        """Status of a receipt: pending, done (with result) or failed (with error)"""
+        return self._receipts.get(receipt_id)
+
+    def _trim(self) -> None:
+        while len(self._receipts) > self.max_receipts:
+            self._receipts.popitem(last=False)
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait for running jobs (call on shutdown, before closing the producer)"""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
@@ -2,13 +2,21 @@
 AgentKit Client
 Simple client for sending events to AgentKit agent
 """
-import requests
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.transport import get_transport
+
 load_dotenv()
 
 AGENTKIT_URL = os.getenv("AGENTKIT_URL", "http://localhost:8000/run")
+AGENTKIT_BATCH_URL = os.getenv("AGENTKIT_BATCH_URL") or f"{AGENTKIT_URL.rstrip('/')}/batch"
 
 
 def send_event(event: dict, timeout: int = 30) -> dict:
@@ -22,11 +30,28 @@ def send_event(event: dict, timeout: int = 30) -> dict:
     Returns:
         Response from AgentKit
     """
-    response = requests.post(AGENTKIT_URL, json=event, timeout=timeout)
+    response = get_transport(AGENTKIT_URL).post(AGENTKIT_URL, json=event, timeout=timeout)
     response.raise_for_status()
     return response.json()
 
 
+def send_events(events: list[dict], timeout: int = 30) -> list[dict]:
+    """
+    Send a batch of events to AgentKit in one request
+
+    Args:
+        events: Event dictionaries with normalized schema
+        timeout: Request timeout in seconds
+
+    Returns:
+        One result per event, in order; failed events have status "failed"
+        and an "error" message
+    """
+    response = get_transport(AGENTKIT_BATCH_URL).post(AGENTKIT_BATCH_URL, json=events, timeout=timeout)
+    response.raise_for_status()
+    return response.json()["results"]
+
+
 if __name__ == "__main__":
     # Simple test
     test_event = {
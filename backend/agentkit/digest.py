@@ -0,0 +1,172 @@
+"""
+Action Digests
+Collects nudges and unblocker meetings per target and sends each batch as one request
+
+During a triage backlog most events fall through to `post_nudge` for the
+same team, and each one used to be its own notification. Events are now
+grouped by (action, target): a group is sent as one digest nudge listing
+every issue, or one meeting for the participant, once AGENT_DIGEST_WINDOW_MS
+has passed since its first event or it holds AGENT_DIGEST_MAX_ITEMS events.
+Every event waits for its group's request, so each still gets its own
+outcome from the shared result.
+
+The shared batcher waits out the window and suits background execution.
+`get_digest(window=False)` only merges events that arrive in the same
+loop iteration (a /run/batch, concurrent /run calls), so callers that
+answer synchronously are not slowed down.
+"""
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import SIZE_BUCKETS, counter, histogram
+from backend.common.transport import get_async_transport
+
+load_dotenv()
+
+CALENDAR_API = os.getenv("CALENDAR_API_BASE", "http://localhost:7300/api")
+DIGEST_WINDOW_MS = float(os.getenv("AGENT_DIGEST_WINDOW_MS", "2000"))
+DIGEST_MAX_ITEMS = int(os.getenv("AGENT_DIGEST_MAX_ITEMS", "100"))
+
+DIGEST_ACTIONS = {"post_nudge", "schedule_unblocker"}
+
+log = get_logger("agent.digest")
+
+DIGEST_ITEMS = histogram("agent_digest_items", "Events covered by one nudge or meeting", ("action",), buckets=SIZE_BUCKETS)
+DIGEST_SENDS = counter("agent_digest_sends_total", "Digest requests to the calendar API by result", ("action", "result"))
+
+
+def nudge_request(target: str, events: list[dict]) -> dict:
+    """One nudge for every event; a single event reads like it always did"""
+    if len(events) == 1:
+        event = events[0]
+        return {"to": target, "message": f"Please triage issue: {event.get('title', 'New Issue')} - {event.get('url', '')}"}
+    lines = [f"Please triage {len(events)} issues:"]
+    lines.extend(f"- {event.get('title', 'New Issue')} - {event.get('url', '')}" for event in events)
+    return {"to": target, "message": "\n".join(lines)}
+
+
+def meeting_request(target: str, events: list[dict]) -> dict:
+    """One unblocker meeting with the participant covering every event"""
+    title = events[0].get("title", "Issue")
+    if len(events) > 1:
+        title = f"{title} (+{len(events) - 1} more)"
+    return {
+        "title": f"Unblocker: {title}",
+        "participants": [target],
+        "start_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600)),
+        "duration_min": 15,
+    }
+
+
+REQUESTS = {
+    "post_nudge": ("nudges", nudge_request),
+    "schedule_unblocker": ("meetings", meeting_request),
+}
+
+
+async def send_digest(action: str, target: str, events: list[dict]) -> dict:
+    """POST one digest to the calendar API; returns its response body"""
+    path, build = REQUESTS[action]
+    r = await get_async_transport(CALENDAR_API).post(f"{CALENDAR_API}/{path}", json=build(target, events), timeout=5)
+    r.raise_for_status()
+    return r.json()
+
+
+class Digest:
+    """Events waiting to go to one target"""
+
+    def __init__(self, action: str, target: str):
+        self.action = action
+        self.target = target
+        self.events: list[dict] = []
+        self.waiters: list[asyncio.Future] = []
+        self.timer: asyncio.Handle | None = None
+
+
+class DigestBatcher:
+    """
+    Groups digest actions per (action, target) until the window closes or the group is full
+
+    Used from the event loop only.
+    """
+
+    def __init__(self, window_ms: float = DIGEST_WINDOW_MS, max_items: int = DIGEST_MAX_ITEMS):
+        self.window = max(0.0, window_ms) / 1000
+        self.max_items = max(1, max_items)
+        self._open: dict[tuple[str, str], Digest] = {}
+        self._sending: set[asyncio.Task] = set()
+
+    async def submit(self, action: str, target: str, event: dict) -> dict:
+        """Add an event to its target's digest; returns the calendar API's response once the digest is sent"""
+        loop = asyncio.get_running_loop()
+        key = (action, target)
+        digest = self._open.get(key)
+        if digest is None:
+            digest = self._open[key] = Digest(action, target)
+            if self.window:
+                digest.timer = loop.call_later(self.window, self._flush, key)
+            else:
+                digest.timer = loop.call_soon(self._flush, key)
+        future = loop.create_future()
+        digest.events.append(event)
+        digest.waiters.append(future)
+        if len(digest.events) >= self.max_items:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple[str, str]) -> None:
+        digest = self._open.pop(key, None)
+        if digest is None:
+            return
+        digest.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._send(digest))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, digest: Digest) -> None:
+        DIGEST_ITEMS.labels(digest.action).observe(len(digest.events))
+        try:
+            result = await send_digest(digest.action, digest.target, digest.events)
+        except Exception as e:
+            DIGEST_SENDS.labels(digest.action, "error").inc()
+            log.error("Digest %s to %s (%d events) failed: %s", digest.action, digest.target, len(digest.events), e)
+            for waiter in digest.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        DIGEST_SENDS.labels(digest.action, "ok").inc()
+        log.debug("Sent %s digest to %s covering %d events", digest.action, digest.target, len(digest.events))
+        for waiter in digest.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(digest.events) for digest in self._open.values())
+
+    async def flush(self) -> None:
+        """Send every open digest now and wait for the requests (call on shutdown)"""
+        for key in list(self._open):
+            self._flush(key)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+
+_batchers: dict[bool, DigestBatcher] = {}
+
+
+def get_digest(window: bool = True) -> DigestBatcher:
+    """Return this process's digest batcher; window=False merges same-iteration events only"""
+    batcher = _batchers.get(window)
+    if batcher is None:
+        batcher = _batchers[window] = DigestBatcher(DIGEST_WINDOW_MS if window else 0)
+    return batcher
+
+
+async def flush_digests() -> None:
+    """Send every open digest (call on app shutdown, before draining background work)"""
+    for batcher in _batchers.values():
+        await batcher.flush()
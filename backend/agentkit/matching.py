@@ -0,0 +1,231 @@
+"""
+Skill Matching
+Picks owners for tasks from the Prisma Employee table with an inverted skill index
+
+Candidates are scored as
+
+    W_SKILLS * coverage + W_LOAD * (1 - workload) + W_PERF * performance
+
+scaled by availability (busy counts half, unavailable never matches).
+Coverage is the share of the task's known skills the employee has; only
+employees covering at least one skill are candidates. Scores for every
+employee are computed at once with NumPy, so a match costs a few vector
+operations regardless of how many employees there are.
+"""
+import json
+import os
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.prisma_cache import PRISMA_DB, connect_readonly
+
+load_dotenv()
+
+MATCHER_RELOAD_SECONDS = float(os.getenv("MATCHER_RELOAD_SECONDS", "30"))
+W_SKILLS = float(os.getenv("MATCH_WEIGHT_SKILLS", "0.6"))
+W_LOAD = float(os.getenv("MATCH_WEIGHT_LOAD", "0.25"))
+W_PERF = float(os.getenv("MATCH_WEIGHT_PERF", "0.15"))
+# Workload points (0-100 scale) one task hour adds during batch assignment; 40h fills a week
+LOAD_PER_HOUR = 2.5
+
+AVAILABILITY = {"available": 1.0, "busy": 0.5, "unavailable": 0.0}
+
+EMPLOYEE_QUERY = (
+    'SELECT id, name, email, skills, currentWorkload, availability, performanceScore FROM "Employee"'
+)
+FINGERPRINT_QUERY = 'SELECT count(*), max(updatedAt) FROM "Employee"'
+
+log = get_logger("matching")
+
+
+def _skills(value) -> list[str]:
+    """Employee/Task skills column (JSON array) or an already-parsed list, normalised"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(skill).strip().lower() for skill in value if str(skill).strip()]
+
+
+class SkillIndex:
+    """
+    Employees as column arrays plus a skill -> employee-rows posting list
+
+    Immutable once built; a reload builds a new index and swaps it in.
+    """
+
+    def __init__(self, rows: list[tuple]):
+        self.size = len(rows)
+        self.ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.emails = [row[2] for row in rows]
+        self.skill_sets = [frozenset(_skills(row[3])) for row in rows]
+
+        self.skill_ids: dict[str, int] = {}
+        postings: list[list[int]] = []
+        for employee, skills in enumerate(self.skill_sets):
+            for skill in skills:
+                column = self.skill_ids.setdefault(skill, len(self.skill_ids))
+                if column == len(postings):
+                    postings.append([])
+                postings[column].append(employee)
+        self.postings = [np.array(rows, dtype=np.intp) for rows in postings]
+        self.skill_names = sorted(self.skill_ids, key=self.skill_ids.get)
+
+        # Dense incidence matrix for batch scoring (employees x skills)
+        self.matrix = np.zeros((self.size, len(self.skill_ids)), dtype=np.float32)
+        for column, employees in enumerate(self.postings):
+            self.matrix[employees, column] = 1.0
+
+        self.workload = np.clip(np.array([row[4] or 0 for row in rows], dtype=np.float64), 0, 100)
+        self.availability = np.array([AVAILABILITY.get(row[5], 0.5) for row in rows], dtype=np.float64)
+        perf = np.array([np.nan if row[6] is None else row[6] for row in rows], dtype=np.float64)
+        known = ~np.isnan(perf)
+        if known.any():
+            perf[~known] = perf[known].mean()
+            top = perf.max()
+            perf = perf / top if top > 0 else np.zeros(self.size)
+        else:
+            perf = np.full(self.size, 0.5)
+        self.perf_term = W_PERF * perf
+
+    def columns(self, skills) -> list[int]:
+        """Index columns for the skills anyone has; unknown skills can't separate candidates"""
+        seen = []
+        for skill in _skills(skills):
+            column = self.skill_ids.get(skill)
+            if column is not None and column not in seen:
+                seen.append(column)
+        return seen
+
+    def _scores(self, coverage: np.ndarray, workload: np.ndarray) -> np.ndarray:
+        scores = (W_SKILLS * coverage + W_LOAD * (1.0 - workload / 100.0) + self.perf_term) * self.availability
+        scores[(coverage <= 0) | (self.availability <= 0)] = -np.inf
+        return scores
+
+    def _candidate(self, row: int, score: float, columns: list[int], workload: np.ndarray | None = None) -> dict:
+        wanted = {self.skill_names[column] for column in columns}
+        return {
+            "employee_id": self.ids[row],
+            "name": self.names[row],
+            "email": self.emails[row],
+            "score": round(float(score), 4),
+            "matched_skills": sorted(self.skill_sets[row] & wanted),
+            "workload": float((self.workload if workload is None else workload)[row]),
+        }
+
+    def match(self, skills, k: int = 1) -> list[dict]:
+        """Best `k` candidates for one task, best first; [] if nobody has any of its skills"""
+        columns = self.columns(skills)
+        if not columns or not self.size:
+            return []
+        coverage = np.zeros(self.size)
+        for column in columns:
+            coverage[self.postings[column]] += 1.0
+        coverage /= len(columns)
+        scores = self._scores(coverage, self.workload)
+
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.size else np.arange(self.size)
+        top = top[np.argsort(-scores[top])]
+        return [self._candidate(row, scores[row], columns) for row in top if np.isfinite(scores[row])]
+
+    def assign_many(self, tasks: list[dict]) -> list[dict | None]:
+        """
+        Assign tasks in order, one owner each
+
+        Coverage for every (task, employee) pair comes from a single matrix
+        product. Each assignment adds the task's estimated hours to the
+        owner's workload, so later tasks in the batch spread across the team.
+        """
+        if not tasks or not self.size or not self.skill_ids:
+            return [None] * len(tasks)
+        task_columns = [self.columns(task.get("required_skills") or task.get("skills")) for task in tasks]
+        demand = np.zeros((len(tasks), len(self.skill_ids)), dtype=np.float32)
+        for i, columns in enumerate(task_columns):
+            demand[i, columns] = 1.0
+        wanted = demand.sum(axis=1, keepdims=True)
+        coverage = (demand @ self.matrix.T) / np.maximum(wanted, 1.0)
+
+        workload = self.workload.copy()
+        assignments: list[dict | None] = []
+        for i, task in enumerate(tasks):
+            if not task_columns[i]:
+                assignments.append(None)
+                continue
+            scores = self._scores(coverage[i], workload)
+            row = int(np.argmax(scores))
+            if not np.isfinite(scores[row]):
+                assignments.append(None)
+                continue
+            assignments.append(self._candidate(row, scores[row], task_columns[i], workload))
+            workload[row] = min(100.0, workload[row] + float(task.get("estimated_hours") or 0) * LOAD_PER_HOUR)
+        return assignments
+
+
+class SkillMatcher:
+    """
+    Serves matches from the Employee table, rebuilding the index when it changes
+
+    The table's row count and latest updatedAt are checked at most every
+    `reload_interval` seconds; a failed reload keeps the previous index.
+    """
+
+    def __init__(self, path: str = PRISMA_DB, reload_interval: float = MATCHER_RELOAD_SECONDS):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._checked = 0.0
+        self.index = SkillIndex([])
+        self.maybe_reload()
+
+    def maybe_reload(self) -> bool:
+        """Rebuild the index if the Employee table changed; returns True if it was rebuilt"""
+        now = time.monotonic()
+        if self._checked and now - self._checked < self.reload_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                db = connect_readonly(self.path)
+                try:
+                    fingerprint = db.execute(FINGERPRINT_QUERY).fetchone()
+                    if fingerprint == self._fingerprint:
+                        return False
+                    rows = db.execute(EMPLOYEE_QUERY).fetchall()
+                finally:
+                    db.close()
+                index = SkillIndex(rows)
+            except Exception as e:
+                log.error("Error loading employees from %s: %s", self.path, e)
+                return False
+            self._fingerprint = fingerprint
+            self.index = index
+            log.info("Indexed %d employees across %d skills", index.size, len(index.skill_ids))
+            return True
+
+    def match(self, skills, k: int = 1) -> list[dict]:
+        self.maybe_reload()
+        return self.index.match(skills, k)
+
+    def assign_many(self, tasks: list[dict]) -> list[dict | None]:
+        self.maybe_reload()
+        return self.index.assign_many(tasks)
+
+
+_matcher: SkillMatcher | None = None
+
+
+def get_matcher() -> SkillMatcher:
+    """Return the process-wide matcher, indexing PRISMA_DB on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = SkillMatcher()
+    return _matcher
@@ -2,180 +2,240 @@
 Mock AgentKit Agent Server
 Simulates an AgentKit agent for testing the Undergoing Project flow
 """
+import asyncio
 import os
+import sys
 import time
-import requests
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, HTTPException, Request, Response
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.agentkit.background import BackgroundRunner
+from backend.agentkit.digest import DIGEST_ACTIONS, DigestBatcher, flush_digests, get_digest
+from backend.agentkit.matching import get_matcher
+from backend.agentkit.policy import get_engine
+from backend.common.ids import IdGenerator
+from backend.common.log import get_logger
+from backend.common.metrics import gauge, histogram, instrument
+from backend.common.prisma_cache import get_cache
+from backend.common.transport import close_async_transports
+from backend.events.producer import close_producer, get_producer
+from backend.events.trace import now_ms, stamp
+
 load_dotenv()
 
-app = FastAPI()
+# "sync" answers /run once the action is done; "background" answers with a receipt right away
+EXECUTION_MODE = os.getenv("AGENT_EXECUTION_MODE", "sync")
+DRAIN_SECONDS = float(os.getenv("AGENT_DRAIN_SECONDS", "30"))
+# Estimate for an issue assigned without its own estimated_hours, so a batch's assignments add workload
+TASK_HOURS = float(os.getenv("AGENT_TASK_HOURS", "4"))
 
-PANDA = os.getenv("PANDA_PROXY", "http://localhost:8082")
-CALENDAR_API = os.getenv("CALENDAR_API_BASE", "http://localhost:7300/api")
+log = get_logger("agent")
+background = BackgroundRunner()
+# Unique across processes and within a second; consumers dedup records by event_id
+action_ids = IdGenerator("a")
+outcome_ids = IdGenerator("o")
 
+DECISION_SECONDS = histogram("agent_policy_decision_seconds", "Time to evaluate the policy for one event")
+ACTION_SECONDS = histogram("agent_action_seconds", "Time to execute a decided action", ("action", "ack"))
+BACKGROUND_PENDING = gauge("agent_background_pending", "Accepted events whose action is still running")
+BACKGROUND_PENDING.set_function(lambda: background.pending)
 
-def produce_to_redpanda(topic: str, key: str, value: dict) -> None:
-    """Produce a message to Redpanda via Pandaproxy"""
-    try:
-        payload = {"records": [{"key": key, "value": value}]}
-        headers = {"Content-Type": "application/vnd.kafka.json.v2+json"}
-        r = requests.post(f"{PANDA}/topics/{topic}", json=payload, headers=headers, timeout=5)
-        r.raise_for_status()
-    except Exception as e:
-        print(f"Error producing to Redpanda: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Finish accepted work, flush buffered records and close pooled connections before exiting"""
+    yield
+    await flush_digests()
+    await background.drain(timeout=DRAIN_SECONDS)
+    await close_producer()
+    await close_async_transports()
 
 
-def apply_undergoing_policy(event: dict) -> dict:
+app = FastAPI(lifespan=lifespan)
+instrument(app, "agentkit")
+
+
+def apply_undergoing_policy(event: dict, match_owner: bool = True) -> dict:
     """
     Apply Undergoing Project policies to determine action
 
-    Policies:
+    Rules live in POLICY_FILE (backend/agentkit/policies.json by default):
     - bug + (p0|highest) → escalate_owner to team:platform
-    - frontend → assign_owner:alice
+    - frontend → assign_owner (best skill match, else alice)
     - due_today|overdue → schedule_unblocker 15min with assignee
     - default → post_nudge to triage
     """
-    labels = event.get("labels", [])
-    priority = event.get("priority", "")
-    assignee = event.get("assignee")
-    due_at = event.get("due_at", "")
-
-    # Check for high priority bugs
-    if "bug" in labels and (priority in ["P0", "Highest", "highest"] or "p0" in labels):
-        return {
-            "action": "escalate_owner",
-            "target": "team:platform",
-            "rationale": "High priority bug requires immediate platform team attention"
-        }
-
-    # Check for frontend issues
-    if "frontend" in labels:
-        return {
-            "action": "assign_owner",
-            "target": "owner:alice",
-            "rationale": "Frontend issue assigned to frontend specialist Alice"
-        }
-
-    # Check for overdue or due today
-    if due_at or "overdue" in labels:
-        target = f"owner:{assignee}" if assignee else "team:triage"
-        return {
-            "action": "schedule_unblocker",
-            "target": target,
-            "rationale": "Issue has approaching deadline, scheduling unblocker meeting"
-        }
-
-    # Default: post nudge
+    started = time.perf_counter()
+    try:
+        decision = get_engine().evaluate(event)
+        if match_owner and decision["action"] == "assign_owner":
+            candidates = get_matcher().match(task_skills(event))
+            decision = route_owner(decision, candidates[0] if candidates else None)
+        return decision
+    finally:
+        DECISION_SECONDS.observe(time.perf_counter() - started)
+
+
+def task_skills(event: dict) -> list:
+    """Skills an event asks for: explicit required_skills, else its labels"""
+    return event.get("required_skills") or event.get("labels") or []
+
+
+def task_hours(event: dict) -> float:
+    """Hours an event's work is estimated at: explicit estimated_hours, else TASK_HOURS"""
+    try:
+        return float(event.get("estimated_hours") or TASK_HOURS)
+    except (TypeError, ValueError):
+        return TASK_HOURS
+
+
+def route_owner(decision: dict, match: dict | None) -> dict:
+    """Point an assign_owner decision at the matched employee; the rule's target stays when nobody matches"""
+    if match is None:
+        return decision
     return {
-        "action": "post_nudge",
-        "target": "team:triage",
-        "rationale": "New issue needs triage"
+        **decision,
+        "target": f"owner:{match['email']}",
+        "rationale": (
+            f"Matched {match['name']} on {', '.join(match['matched_skills'])} "
+            f"(workload {match['workload']:.0f}%)"
+        ),
     }
 
 
-def execute_action(event: dict, decision: dict) -> dict:
+def build_action_record(event: dict, decision: dict) -> dict:
+    """Action record published to the 'actions' topic for a decision"""
+    return {
+        "event_id": action_ids.next(),
+        "project_id": event.get("project_id", "alpha"),
+        "action": decision["action"],
+        "target": decision["target"],
+        "rationale": decision["rationale"],
+        "source_ref": event.get("url", ""),
+        "source_event_id": event.get("event_id"),
+    }
+
+
+def resolve_participant(target: str) -> str:
+    """An owner:<handle> target as the employee's email when the app knows them"""
+    kind, _, handle = target.partition(":")
+    if kind == "owner" and handle:
+        employee = get_cache().find_employee(handle)
+        if employee:
+            return employee["email"]
+    return target
+
+
+async def execute_action(event: dict, decision: dict, digest: DigestBatcher | None = None) -> dict:
     """
     Execute the decided action using domain tools
     Returns outcome with risk delta
+
+    Nudges and unblocker meetings are sent through `digest` (by default one
+    that only merges events arriving together), so the outcome comes once
+    the target's digest has been sent.
     """
     action = decision["action"]
     target = decision["target"]
 
     outcome = {
-        "event_id": f"o-{int(time.time())}",
+        "event_id": outcome_ids.next(),
         "project_id": event.get("project_id", "alpha"),
+        "action": action,
         "risk_delta": 0.0,
         "ack": False,
+        "ts": time.time(),
+        "source_event_id": event.get("event_id"),
+        "trace": dict(event.get("trace") or {}),
     }
 
+    started = time.perf_counter()
     try:
         if action == "assign_owner":
             # Simulate owner assignment
-            print(f"  ✓ Assigned to {target}")
+            log.debug("Assigned to %s", target)
             outcome["risk_delta"] = -0.1
             outcome["ack"] = True
 
         elif action == "escalate_owner":
             # Simulate escalation
-            print(f"  ✓ Escalated to {target}")
+            log.debug("Escalated to %s", target)
             outcome["risk_delta"] = -0.3
             outcome["ack"] = True
 
-        elif action == "schedule_unblocker":
-            # Call calendar API
-            meeting_data = {
-                "title": f"Unblocker: {event.get('title', 'Issue')}",
-                "participants": [target],
-                "start_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600)),
-                "duration_min": 15,
-            }
-            r = requests.post(f"{CALENDAR_API}/meetings", json=meeting_data, timeout=5)
-            r.raise_for_status()
-            result = r.json()
-            print(f"  ✓ Scheduled meeting: {result.get('id')}")
-            outcome["risk_delta"] = -0.2
-            outcome["ack"] = True
-
-        elif action == "post_nudge":
-            # Call calendar/notification API
-            nudge_data = {
-                "to": target,
-                "message": f"Please triage issue: {event.get('title', 'New Issue')} - {event.get('url', '')}",
-            }
-            r = requests.post(f"{CALENDAR_API}/nudges", json=nudge_data, timeout=5)
-            r.raise_for_status()
-            result = r.json()
-            print(f"  ✓ Sent nudge: {result.get('id')}")
-            outcome["risk_delta"] = -0.05
+        elif action in DIGEST_ACTIONS:
+            # Nudges and unblockers for the same target go out together as one digest request
+            result = await (digest or get_digest(window=False)).submit(action, resolve_participant(target), event)
+            log.debug("Sent %s: %s", action, result.get("id"))
+            outcome["risk_delta"] = -0.2 if action == "schedule_unblocker" else -0.05
             outcome["ack"] = True
 
     except Exception as e:
-        print(f"  ✗ Action execution failed: {e}")
+        log.error("Action %s for %s failed: %s", action, target, e)
         outcome["risk_delta"] = 0.1  # Risk increased due to failure
         outcome["ack"] = False
 
-    return outcome
+    ACTION_SECONDS.labels(action, outcome["ack"]).observe(time.perf_counter() - started)
+    return stamp(outcome, "acted")
 
 
 @app.get("/health")
 async def health():
     """Health check"""
-    return {"status": "ok", "service": "mock-agentkit-agent"}
+    return {
+        "status": "ok",
+        "service": "mock-agentkit-agent",
+        "prisma_cache": get_cache().stats(),
+        "digest_pending": get_digest().pending,
+    }
 
 
-@app.post("/run")
-async def process_event(request: Request):
-    """
-    Main AgentKit endpoint - processes events and takes actions
+async def act_and_report(event: dict, decision: dict, digest: DigestBatcher | None = None) -> dict:
+    """Execute a decided action and publish its outcome"""
+    outcome = await execute_action(event, decision, digest)
+    get_producer().send_nowait("outcomes", outcome["project_id"], stamp(outcome, "reported"))
+    log.info(
+        "Processed %s: %s", event.get("event_id", "unknown"), decision["action"],
+        extra={"fields": {"risk_delta": outcome["risk_delta"], "ack": outcome["ack"]}},
+    )
+    return outcome
+
+
+async def run_event(event: dict, mode: str | None = None) -> dict:
     """
-    event = await request.json()
+    Decide, record and act on one event
 
+    Returns the /run reply: "processed" with the outcome, or "accepted" with
+    a receipt when the action was left to run in the background.
+    """
     event_id = event.get("event_id", "unknown")
-    event_type = event.get("type", "unknown")
-    print(f"\n[AGENT] AgentKit processing: {event_type} (ID: {event_id})")
+    log.debug("Processing %s (ID: %s)", event.get("type", "unknown"), event_id)
 
     # Apply policy to decide action
     decision = apply_undergoing_policy(event)
-    print(f"  → Decision: {decision['action']} - {decision['rationale']}")
+    stamp(event, "decided")
+    log.debug("Decision for %s: %s - %s", event_id, decision["action"], decision["rationale"])
 
-    # Record the action
-    action_record = {
-        "event_id": f"a-{int(time.time())}",
-        "project_id": event.get("project_id", "alpha"),
-        "action": decision["action"],
-        "target": decision["target"],
-        "rationale": decision["rationale"],
-        "source_ref": event.get("url", ""),
-    }
-    produce_to_redpanda("actions", action_record["project_id"], action_record)
+    # Record the action; the buffered produce goes out while the action runs
+    action_record = build_action_record(event, decision)
+    get_producer().send_nowait("actions", action_record["project_id"], action_record)
 
-    # Execute the action
-    outcome = execute_action(event, decision)
-    produce_to_redpanda("outcomes", outcome["project_id"], outcome)
+    if (mode or EXECUTION_MODE) == "background":
+        receipt = background.submit(
+            lambda: act_and_report(event, decision, get_digest()), event_id=event_id, action=decision["action"]
+        )
+        if receipt is not None:
+            return {"status": "accepted", "event_id": event_id, "action": decision["action"], "receipt": receipt}
+        # Too much accepted work outstanding: do this one inline, which slows the caller down
 
-    print(f"  → Outcome: risk_delta={outcome['risk_delta']}, ack={outcome['ack']}")
+    # Execute the action and publish its outcome
+    outcome = await act_and_report(event, decision)
 
     return {
         "status": "processed",
@@ -185,8 +245,122 @@ async def process_event(request: Request):
     }
 
 
+@app.post("/run")
+async def process_event(request: Request, response: Response, mode: str | None = None):
+    """
+    Main AgentKit endpoint - processes events and takes actions
+
+    With mode=background (or AGENT_EXECUTION_MODE=background) the event is
+    answered with 202 and a receipt as soon as the action is decided; the
+    action runs afterwards and its outcome is published when it finishes;
+    nudges and meetings then wait out AGENT_DIGEST_WINDOW_MS to be merged
+    with others for the same target.
+    """
+    reply = await run_event(await request.json(), mode)
+    if reply["status"] == "accepted":
+        response.status_code = 202
+    return reply
+
+
+@app.get("/receipts/{receipt_id}")
+async def get_receipt(receipt_id: str):
+    """Status of an event accepted in background mode"""
+    receipt = background.get(receipt_id)
+    if receipt is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired receipt")
+    return receipt
+
+
+@app.post("/run/batch")
+async def process_batch(request: Request):
+    """
+    Batch AgentKit endpoint - processes an array of events
+
+    Every event gets its own result, so one failing event does not fail the
+    batch. Actions run concurrently, with nudges and meetings for the same
+    target merged into one request; all action and outcome records are
+    produced together. An event is "failed" when its policy could not be
+    evaluated (no outcome) or its action failed (outcome with ack false),
+    and counts in `failed` either way.
+    """
+    events = await request.json()
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+
+    log.debug("Processing batch of %d events", len(events))
+
+    results = []
+    decisions = []
+    # One rule snapshot for the whole batch, even if the rules reload meanwhile
+    started = time.perf_counter()
+    evaluated = get_engine().evaluate_many(events)
+    share = (time.perf_counter() - started) / max(1, len(events))
+    for event, decision in zip(events, evaluated):
+        DECISION_SECONDS.observe(share)
+        event_id = event.get("event_id", "unknown") if isinstance(event, dict) else "unknown"
+        if isinstance(decision, Exception):
+            log.error("Event %s failed: %s", event_id, decision)
+            results.append({"status": "failed", "event_id": event_id, "error": str(decision)})
+            continue
+        result = {"status": "processed", "event_id": event_id, "action": decision["action"]}
+        results.append(result)
+        decisions.append([event, decision, result])
+
+    # Owners for the whole batch at once, so assignments spread by workload
+    owned = [item for item in decisions if item[1]["action"] == "assign_owner"]
+    if owned:
+        tasks = [{"required_skills": task_skills(event), "estimated_hours": task_hours(event)} for event, _, _ in owned]
+        matches = get_matcher().assign_many(tasks)
+        for item, match in zip(owned, matches):
+            item[1] = route_owner(item[1], match)
+    decided_at = now_ms()
+    for event, _, _ in decisions:
+        stamp(event, "decided", decided_at)
+
+    decided = [(event, decision, build_action_record(event, decision), result) for event, decision, result in decisions]
+
+    producer = get_producer()
+    producer.send_many_nowait("actions", [(record["project_id"], record) for _, _, record, _ in decided])
+
+    outcomes = await asyncio.gather(*(execute_action(event, decision) for event, decision, _, _ in decided))
+    for (_, _, _, result), outcome in zip(decided, outcomes):
+        result["outcome"] = outcome
+        if not outcome["ack"]:
+            # The cause is in the agent log; the outcome itself records only the failure
+            result.update(status="failed", error=f"Action {outcome['action']} failed")
+    reported = now_ms()
+    producer.send_many_nowait(
+        "outcomes", [(outcome["project_id"], stamp(outcome, "reported", reported)) for outcome in outcomes]
+    )
+
+    failed = sum(1 for result in results if result["status"] == "failed")
+    log.info("Batch done: %d processed, %d failed", len(results) - failed, failed)
+
+    return {"results": results, "processed": len(results) - failed, "failed": failed}
+
+
+@app.post("/assign")
+async def assign_tasks(request: Request):
+    """
+    Pick owners for many tasks at once
+
+    Body: {"tasks": [{"id", "required_skills", "estimated_hours"}, ...]}.
+    Tasks are assigned in order and each one adds its hours to the chosen
+    owner's workload, so a large batch doesn't land on one person.
+    """
+    body = await request.json()
+    tasks = body.get("tasks") if isinstance(body, dict) else None
+    if not isinstance(tasks, list) or not all(isinstance(task, dict) for task in tasks):
+        raise HTTPException(status_code=400, detail="Expected {\"tasks\": [...]}")
+    matches = get_matcher().assign_many(tasks)
+    return {
+        "assignments": [{"task_id": task.get("id"), "owner": match} for task, match in zip(tasks, matches)],
+        "unassigned": sum(1 for match in matches if match is None),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("AGENTKIT_PORT", "8000"))
-    print(f"Starting Mock AgentKit Agent on port {port}...")
+    log.info("Starting Mock AgentKit Agent on port %d", port)
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,267 @@
+"""
+Policy Engine
+Declarative Undergoing Project rules compiled into an indexed matcher
+
+Rules are loaded from JSON (or YAML, if PyYAML is installed) and look like:
+
+    {"name": "p0-bug", "priority": 100,
+     "when": {"labels": ["bug", "p0"], "fields": {"priority": ["P0"]}, "present": ["due_at"]},
+     "then": {"action": "escalate_owner", "target": "owner:{assignee}",
+              "target_fallback": "team:triage", "rationale": "..."}}
+
+All `when` conditions must hold. The highest-priority matching rule wins;
+ties go to the rule listed first.
+"""
+import json
+import os
+import string
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+
+load_dotenv()
+
+POLICY_FILE = os.getenv("POLICY_FILE") or str(Path(__file__).with_name("policies.json"))
+POLICY_RELOAD_SECONDS = float(os.getenv("POLICY_RELOAD_SECONDS", "2"))
+
+# Bound on memoised decisions per compiled policy
+DECISION_CACHE_SIZE = 4096
+
+log = get_logger("policy")
+
+
+class PolicyError(Exception):
+    """Raised for invalid rule files or events that no rule matches"""
+
+
+def load_rules(path: str) -> dict:
+    """Read a rule file, choosing the parser from its extension"""
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise PolicyError("PyYAML is required for YAML policy files (pip install pyyaml)")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+class _Rule:
+    """A compiled rule"""
+
+    __slots__ = ("name", "mask", "fields", "present", "action", "target", "target_refs", "target_fallback", "rationale")
+
+    def __init__(self, spec: dict, label_bits: dict[str, int]):
+        when = spec.get("when") or {}
+        then = spec.get("then") or {}
+        if "action" not in then or "target" not in then:
+            raise PolicyError(f"Rule {spec.get('name')!r} needs then.action and then.target")
+
+        self.name = spec.get("name", then["action"])
+        self.mask = 0
+        for label in when.get("labels", []):
+            self.mask |= label_bits.setdefault(label, 1 << len(label_bits))
+        self.fields = {field: frozenset(values) for field, values in (when.get("fields") or {}).items()}
+        self.present = tuple(when.get("present", []))
+
+        self.action = then["action"]
+        self.target = then["target"]
+        self.target_refs = [name for _, name, _, _ in string.Formatter().parse(self.target) if name]
+        self.target_fallback = then.get("target_fallback", self.target)
+        self.rationale = then.get("rationale", "")
+
+    def decide(self, event: dict) -> dict:
+        target = self.target
+        if self.target_refs:
+            if all(event.get(name) for name in self.target_refs):
+                target = self.target.format_map(event)
+            else:
+                target = self.target_fallback
+        return {"action": self.action, "target": target, "rationale": self.rationale}
+
+
+class CompiledPolicy:
+    """
+    Rule set compiled for constant-time evaluation
+
+    Labels are interned to bits, so a rule's label requirement is one mask
+    test. Rules are indexed by an anchor condition (one required label, a
+    field value, or a required field), so only rules that could match an
+    event are considered. Decisions are memoised by the event's rule-relevant
+    signature, so repeat shapes skip matching altogether.
+    """
+
+    def __init__(self, spec: dict):
+        rules = spec.get("rules") or []
+        if not rules:
+            raise PolicyError("Policy file defines no rules")
+
+        # Rank = evaluation order: priority descending, then file order
+        ordered = sorted(enumerate(rules), key=lambda item: (-item[1].get("priority", 0), item[0]))
+        self.label_bits: dict[str, int] = {}
+        self.rules = [_Rule(rule, self.label_bits) for _, rule in ordered]
+
+        self.field_domains: dict[str, frozenset] = {}
+        for rule in self.rules:
+            for field, values in rule.fields.items():
+                self.field_domains[field] = self.field_domains.get(field, frozenset()) | values
+        self.field_names = tuple(sorted(self.field_domains))
+        self.present_names = tuple(sorted({name for rule in self.rules for name in rule.present}))
+        self.labels_by_bit = {bit: label for label, bit in self.label_bits.items()}
+
+        self.by_label: dict[str, list[int]] = {}
+        self.by_field: dict[tuple[str, object], list[int]] = {}
+        self.by_present: dict[str, list[int]] = {}
+        self.unconditional: list[int] = []
+        for rank, rule in enumerate(self.rules):
+            if rule.mask:
+                anchor = self.labels_by_bit[rule.mask & -rule.mask]
+                self.by_label.setdefault(anchor, []).append(rank)
+            elif rule.fields:
+                field, values = next(iter(rule.fields.items()))
+                for value in values:
+                    self.by_field.setdefault((field, value), []).append(rank)
+            elif rule.present:
+                self.by_present.setdefault(rule.present[0], []).append(rank)
+            else:
+                self.unconditional.append(rank)
+
+        self._decisions: dict[tuple, int | None] = {}
+
+    def signature(self, event: dict) -> tuple:
+        """The parts of an event that rules can observe"""
+        mask = 0
+        for label in event.get("labels") or ():
+            bit = self.label_bits.get(label)
+            if bit is not None:
+                mask |= bit
+        values = []
+        for field in self.field_names:
+            value = event.get(field)
+            try:
+                values.append(value if value in self.field_domains[field] else None)
+            except TypeError:  # unhashable value can't equal any rule value
+                values.append(None)
+        present = tuple(bool(event.get(name)) for name in self.present_names)
+        return mask, tuple(values), present
+
+    def match(self, event: dict) -> _Rule | None:
+        """Return the winning rule for an event, or None"""
+        sig = self.signature(event)
+        if sig in self._decisions:
+            rank = self._decisions[sig]
+        else:
+            rank = self._match(*sig)
+            if len(self._decisions) >= DECISION_CACHE_SIZE:
+                self._decisions.clear()
+            self._decisions[sig] = rank
+        return None if rank is None else self.rules[rank]
+
+    def _match(self, mask: int, values: tuple, present: tuple) -> int | None:
+        candidates = set(self.unconditional)
+        bits = mask
+        while bits:
+            bit = bits & -bits
+            candidates.update(self.by_label.get(self.labels_by_bit[bit], ()))
+            bits ^= bit
+        field_values = dict(zip(self.field_names, values))
+        for field, value in field_values.items():
+            if value is not None:
+                candidates.update(self.by_field.get((field, value), ()))
+        present_fields = {name for name, ok in zip(self.present_names, present) if ok}
+        for name in present_fields:
+            candidates.update(self.by_present.get(name, ()))
+
+        for rank in sorted(candidates):
+            rule = self.rules[rank]
+            if rule.mask & mask != rule.mask:
+                continue
+            if any(field_values.get(field) not in allowed for field, allowed in rule.fields.items()):
+                continue
+            if any(name not in present_fields for name in rule.present):
+                continue
+            return rank
+        return None
+
+
+class PolicyEngine:
+    """
+    Evaluates events against a rule file, recompiling it when the file changes
+
+    The file's mtime is checked at most every `reload_interval` seconds. A
+    file that fails to load or compile is reported and the previous rules
+    stay in effect.
+    """
+
+    def __init__(self, path: str = POLICY_FILE, reload_interval: float = POLICY_RELOAD_SECONDS):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime
+        self._checked = time.monotonic()
+        self.policy = CompiledPolicy(load_rules(path))
+
+    def maybe_reload(self) -> bool:
+        """Recompile the rule file if it changed; returns True if new rules were loaded"""
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return False
+                policy = CompiledPolicy(load_rules(self.path))
+            except Exception as e:
+                log.error("Error reloading policy file %s: %s", self.path, e)
+                return False
+            self._mtime = mtime
+            self.policy = policy
+            log.info("Reloaded %d policy rules from %s", len(policy.rules), self.path)
+            return True
+
+    def evaluate(self, event: dict) -> dict:
+        """Return the decision (action, target, rationale) for one event"""
+        self.maybe_reload()
+        return self._decide(self.policy, event)
+
+    def evaluate_many(self, events: list[dict]) -> list[dict | Exception]:
+        """
+        Decide a batch of events against a single rule snapshot
+
+        Returns:
+            One entry per event, in order: its decision, or the exception
+            that kept it from being decided, so one bad event does not fail
+            the rest
+        """
+        self.maybe_reload()
+        policy = self.policy
+        results: list[dict | Exception] = []
+        for event in events:
+            try:
+                results.append(self._decide(policy, event))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @staticmethod
+    def _decide(policy: CompiledPolicy, event: dict) -> dict:
+        rule = policy.match(event)
+        if rule is None:
+            raise PolicyError(f"No policy rule matched event {event.get('event_id')}")
+        return rule.decide(event)
+
+
+_engine: PolicyEngine | None = None
+
+
+def get_engine() -> PolicyEngine:
+    """Return the process-wide policy engine, loading POLICY_FILE on first use"""
+    global _engine
+    if _engine is None:
+        _engine = PolicyEngine()
+    return _engine
@@ -0,0 +1,210 @@
+"""
+Event Hot-Path Benchmarks
+Offline micro-benchmarks for the code that runs on every event
+
+Usage:
+    python -m backend.bench                          # run everything
+    python -m backend.bench --filter policy          # only matching benchmarks
+    python -m backend.bench --save bench.json        # record a baseline
+    python -m backend.bench --compare bench.json     # diff against a baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from backend.bench.payloads import employee_rows, github_payload, jira_payload, normalized_event
+from backend.bench.runner import run
+from backend.bench.stubs import StubServer, scratch_prisma_db
+
+APP_DB = Path(__file__).resolve().parents[2] / "prisma" / "dev.db"
+
+
+def build_benchmarks(stub_url: str, scratch_dir: str) -> dict:
+    """
+    Name -> zero-argument callable. Imports happen here, after the stand-in URLs are set.
+
+    The agent reads employees from a seeded copy of the app database in
+    `scratch_dir`, so a run leaves the working tree untouched.
+    """
+    os.environ["PANDA_PROXY"] = stub_url
+    os.environ["CALENDAR_API_BASE"] = f"{stub_url}/api"
+    os.environ["AGENTKIT_URL"] = f"{stub_url}/run"
+    # Per-event info lines would be measured as part of each op
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("GATEWAY_METRICS_PORT", "0")
+    # alice is the owner the execute_action benchmarks resolve
+    alice = ("emp-alice", "Alice", "alice@example.com", json.dumps(["frontend", "ux"]), 10, "available", 4.5)
+    os.environ["PRISMA_DB"] = scratch_prisma_db(scratch_dir, [alice, *employee_rows(100)], str(APP_DB))
+
+    from backend.agentkit import mock_agent
+    from backend.agentkit.matching import SkillIndex
+    from backend.events import codec
+    from backend.gateway import consumer
+    from backend.gateway.dispatcher import KeyedDispatcher
+    from backend.gateway.offsets import OffsetTracker
+    from backend.webhooks import github_issues
+    from backend.webhooks.sources import GITHUB_ISSUES, JIRA_ISSUES
+
+    benchmarks = {}
+    secret = "bench-secret"
+
+    for size in ("small", "medium", "large"):
+        body = json.dumps(github_payload(size)).encode()
+        signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        benchmarks[f"webhook.verify_signature[{size}]"] = (
+            lambda body=body, signature=signature: github_issues.verify_signature(secret, body, signature)
+        )
+        # Body bytes to normalized event, as the receivers do it (one decode)
+        benchmarks[f"webhook.github_normalize[{size}]"] = (
+            lambda body=body: GITHUB_ISSUES.parse(body, {"project_id": "alpha", "delivery_id": "delivery-1"})
+        )
+        ignored = json.dumps(github_payload(size, action="closed")).encode()
+        benchmarks[f"webhook.github_ignored[{size}]"] = (
+            lambda body=ignored: GITHUB_ISSUES.parse(body, {"project_id": "alpha"})
+        )
+        jira_body = json.dumps(jira_payload(size)).encode()
+        benchmarks[f"webhook.jira_normalize[{size}]"] = (
+            lambda body=jira_body: JIRA_ISSUES.parse(body, {"project_id": "alpha"})
+        )
+
+    events = [normalized_event(seed) for seed in range(256)]
+    cursor = {"i": 0}
+
+    def next_index() -> int:
+        cursor["i"] = (cursor["i"] + 1) % len(events)
+        return cursor["i"]
+
+    def next_event() -> dict:
+        return events[next_index()]
+
+    benchmarks["agent.apply_policy"] = lambda: mock_agent.apply_undergoing_policy(next_event())
+
+    # Record value encode/decode, as done once per topic hop, in both wire formats
+    benchmarks["events.encode[json]"] = lambda: codec.dumps(next_event())
+    benchmarks["events.encode[binary]"] = lambda: codec.encode_value("issues", next_event())
+    for encoding, encode in (("json", codec.dumps), ("binary", lambda event: codec.encode_value("issues", event))):
+        values = [encode(event) for event in events]
+        benchmarks[f"events.decode[{encoding}]"] = lambda values=values: codec.decode_value(values[next_index()])
+
+    for count in (100, 5_000):
+        index = SkillIndex(employee_rows(count))
+        benchmarks[f"agent.match_owner[{count}]"] = lambda index=index: index.match(["frontend", "ux"], k=3)
+        # One op = 50 tasks assigned together, workload carried between them
+        tasks = [{"required_skills": event["labels"] or ["backend"], "estimated_hours": 8} for event in events[:50]]
+        benchmarks[f"agent.assign_many_x50[{count}]"] = lambda index=index, tasks=tasks: index.assign_many(tasks)
+
+    # Async paths share one loop so pooled connections are reused across ops
+    loop = asyncio.new_event_loop()
+    for action, target in (
+        ("assign_owner", "owner:alice"),
+        ("schedule_unblocker", "owner:alice"),
+        ("post_nudge", "team:triage"),
+    ):
+        decision = {"action": action, "target": target, "rationale": "bench"}
+        benchmarks[f"agent.execute_action[{action}]"] = (
+            lambda decision=decision: loop.run_until_complete(mock_agent.execute_action(next_event(), decision))
+        )
+
+    # One op = a polled batch of 100 records tracked, dispatched to the stand-in agent and completed
+    tracker = OffsetTracker(lambda offsets: True, commit_every=10**9, commit_interval=10**9)
+    dispatcher = KeyedDispatcher(
+        lambda rec: consumer.handle_record(rec, tracker),
+        concurrency=consumer.CONCURRENCY,
+        max_in_flight=consumer.MAX_IN_FLIGHT,
+    )
+    offsets = {"next": 0}
+
+    def gateway_batch() -> None:
+        for event in events[:100]:
+            offset = offsets["next"]
+            offsets["next"] += 1
+            rec = {"topic": "issues", "partition": 0, "offset": offset, "key": event["project_id"], "value": event}
+            tracker.track("issues", 0, offset)
+            dispatcher.submit(event["project_id"], rec)
+        dispatcher.join()
+        tracker.maybe_commit(force=True)
+
+    benchmarks["gateway.records_x100"] = gateway_batch
+    return benchmarks
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """Describe results that regressed by more than threshold percent"""
+    previous = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'benchmark':42} {'ops/s Δ':>10} {'p50 Δ':>10} {'p99 Δ':>10}")
+    for result in results:
+        before = previous.get(result["name"])
+        if not before:
+            continue
+        deltas = {
+            key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("ops_per_sec", "p50_us", "p99_us")
+        }
+        print(f"{result['name']:42} {deltas['ops_per_sec']:+9.1f}% {deltas['p50_us']:+9.1f}% {deltas['p99_us']:+9.1f}%")
+        if deltas["ops_per_sec"] < -threshold or deltas["p99_us"] > threshold:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-event hot paths offline")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to run each benchmark")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    stub = StubServer().start()
+    scratch = tempfile.TemporaryDirectory(prefix="bench-")
+    try:
+        benchmarks = build_benchmarks(stub.url, scratch.name)
+        selected = {name: fn for name, fn in benchmarks.items() if args.filter in name}
+
+        print(f"{'benchmark':42} {'ops/s':>12} {'p50 µs':>10} {'p99 µs':>10} {'alloc KiB':>10}")
+        results = []
+        for name, fn in selected.items():
+            # Keep any stray output off the terminal and out of the timings
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = run(name, fn, min_time=args.min_time)
+            results.append(result)
+            print(
+                f"{name:42} {result['ops_per_sec']:12,.0f} {result['p50_us']:10.1f} "
+                f"{result['p99_us']:10.1f} {result['alloc_kib']:10.1f}"
+            )
+    finally:
+        stub.stop()
+        scratch.cleanup()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark Payloads
+Generators for realistic GitHub and Jira webhook payloads of varying size
+"""
+import json
+import random
+import string
+
+# Issue body length in characters for each payload size
+BODY_SIZES = {"small": 200, "medium": 4_000, "large": 60_000}
+LABEL_COUNTS = {"small": 1, "medium": 4, "large": 12}
+
+LABELS = ["bug", "p0", "frontend", "backend", "docs", "overdue", "security", "perf", "ux", "infra", "api", "db"]
+
+
+def _text(rng: random.Random, length: int) -> str:
+    words = []
+    total = 0
+    while total < length:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10)))
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def _user(rng: random.Random, login: str) -> dict:
+    user_id = rng.randint(1_000, 9_999_999)
+    return {
+        "login": login,
+        "id": user_id,
+        "node_id": f"MDQ6VXNlcj{user_id}",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{user_id}?v=4",
+        "url": f"https://api.github.com/users/{login}",
+        "html_url": f"https://github.com/{login}",
+        "type": "User",
+        "site_admin": False,
+    }
+
+
+def github_payload(size: str = "medium", action: str = "opened", seed: int = 0) -> dict:
+    """A GitHub 'issues' webhook payload shaped like the real thing"""
+    rng = random.Random(seed)
+    number = rng.randint(1, 50_000)
+    repo = "acme/backend"
+    labels = rng.sample(LABELS, LABEL_COUNTS[size])
+    return {
+        "action": action,
+        "issue": {
+            "url": f"https://api.github.com/repos/{repo}/issues/{number}",
+            "repository_url": f"https://api.github.com/repos/{repo}",
+            "html_url": f"https://github.com/{repo}/issues/{number}",
+            "id": rng.randint(10**9, 10**10),
+            "node_id": "I_kwDOA" + _text(rng, 12).replace(" ", ""),
+            "number": number,
+            "title": _text(rng, 60),
+            "user": _user(rng, "bob"),
+            "labels": [
+                {"id": rng.randint(10**8, 10**9), "name": name, "color": "d73a4a", "default": False}
+                for name in labels
+            ],
+            "state": "open",
+            "locked": False,
+            "assignee": _user(rng, "alice") if rng.random() < 0.5 else None,
+            "assignees": [],
+            "comments": rng.randint(0, 40),
+            "created_at": "2025-10-17T19:22:11Z",
+            "updated_at": "2025-10-17T19:25:02Z",
+            "closed_at": None,
+            "author_association": "MEMBER",
+            "body": _text(rng, BODY_SIZES[size]),
+            "reactions": {"total_count": 0, "+1": 0, "-1": 0},
+        },
+        "repository": {
+            "id": 123456789,
+            "name": "backend",
+            "full_name": repo,
+            "private": True,
+            "owner": _user(rng, "acme"),
+            "html_url": f"https://github.com/{repo}",
+            "default_branch": "main",
+            "open_issues_count": rng.randint(0, 500),
+            "topics": ["api", "platform"],
+        },
+        "sender": _user(rng, "bob"),
+    }
+
+
+def jira_payload(size: str = "medium", webhook_event: str = "jira:issue_updated", seed: int = 0) -> dict:
+    """A Jira issue webhook payload shaped like the real thing"""
+    rng = random.Random(seed)
+    issue_id = rng.randint(10_000, 99_999)
+    key = f"PROJ-{rng.randint(1, 9_999)}"
+    return {
+        "timestamp": 1760729000000,
+        "webhookEvent": webhook_event,
+        "issue_event_type_name": "issue_generic",
+        "user": {"accountId": "5b10a2844c20165700ede21g", "displayName": "Bob", "active": True},
+        "issue": {
+            "id": str(issue_id),
+            "self": f"https://acme.atlassian.net/rest/api/2/issue/{issue_id}",
+            "key": key,
+            "fields": {
+                "summary": _text(rng, 60),
+                "issuetype": {"id": "10001", "name": rng.choice(["Bug", "Story", "Task"]), "subtask": False},
+                "project": {"id": "10000", "key": "PROJ", "name": "Project"},
+                "priority": {"id": "2", "name": rng.choice(["Highest", "High", "Medium", "Low"])},
+                "labels": rng.sample(LABELS, LABEL_COUNTS[size]),
+                "assignee": {"accountId": "5b10ac8d82e05b22cc7d4ef5", "displayName": "alice"},
+                "reporter": {"accountId": "5b10a2844c20165700ede21g", "displayName": "Bob"},
+                "status": {"id": "3", "name": "In Progress", "statusCategory": {"key": "indeterminate"}},
+                "created": "2025-10-10T10:00:00.000+0000",
+                "updated": "2025-10-17T21:00:00.000+0000",
+                "duedate": rng.choice(["2025-10-16", None]),
+                "description": _text(rng, BODY_SIZES[size]),
+                "components": [{"id": "10100", "name": "api"}],
+            },
+        },
+        "changelog": {
+            "id": str(rng.randint(10**5, 10**6)),
+            "items": [{"field": "status", "fromString": "To Do", "toString": "In Progress"}],
+        },
+    }
+
+
+def normalized_event(seed: int = 0) -> dict:
+    """A normalized event as the gateway reads it from the 'issues' topic"""
+    rng = random.Random(seed)
+    return {
+        "event_id": f"bench-{seed}",
+        "project_id": rng.choice(["alpha", "beta", "gamma", "delta"]),
+        "source": "github",
+        "type": "issue_opened",
+        "repo": "acme/backend",
+        "issue_number": rng.randint(1, 50_000),
+        "title": _text(rng, 60),
+        "url": "https://github.com/acme/backend/issues/1",
+        "labels": rng.sample(LABELS, rng.randint(0, 4)),
+        "assignee": rng.choice([None, "alice"]),
+        "priority": rng.choice(["", "P0", "High"]),
+        "due_at": rng.choice(["", "2025-10-16"]),
+        "body_preview": _text(rng, 280),
+    }
+
+
+SKILLS = ["frontend", "backend", "fullstack", "ml", "data-science", "devops", "design", "ux", "pm", "qa"]
+
+
+def employee_rows(count: int, seed: int = 0) -> list[tuple]:
+    """Employee rows in the column order the skill matcher selects them"""
+    rng = random.Random(seed)
+    return [
+        (
+            f"emp-{i}",
+            f"Employee {i}",
+            f"emp{i}@example.com",
+            json.dumps(rng.sample(SKILLS, rng.randint(1, 4))),
+            rng.randint(0, 100),
+            rng.choice(["available", "available", "busy", "unavailable"]),
+            rng.choice([None, round(rng.uniform(1, 5), 1)]),
+        )
+        for i in range(count)
+    ]
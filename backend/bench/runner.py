@@ -0,0 +1,76 @@
+"""
+Benchmark Runner
+Times a callable and reports throughput, latency percentiles and allocations
+"""
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def run(
+    name: str,
+    fn: Callable[[], object],
+    min_time: float = 1.0,
+    max_iterations: int = 200_000,
+    warmup: int = 50,
+    alloc_samples: int = 200,
+) -> dict:
+    """
+    Benchmark one operation
+
+    Runs `fn` for at least `min_time` seconds (capped at max_iterations),
+    timing every call, then re-runs a sample under tracemalloc to measure
+    peak allocations separately so tracing does not skew the timings.
+
+    Returns:
+        ops, ops/s, mean/p50/p99 latency in microseconds, and the peak
+        memory allocated during one op in KiB
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    timings = []
+    clock = time.perf_counter_ns
+    started = clock()
+    deadline = started + int(min_time * 1e9)
+    while len(timings) < max_iterations:
+        t0 = clock()
+        fn()
+        t1 = clock()
+        timings.append(t1 - t0)
+        if t1 >= deadline:
+            break
+    elapsed = (clock() - started) / 1e9
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(min(alloc_samples, len(timings))):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": name,
+        "ops": len(timings),
+        "ops_per_sec": len(timings) / elapsed if elapsed else 0.0,
+        "mean_us": statistics.fmean(timings) / 1e3,
+        "p50_us": percentile(timings, 50) / 1e3,
+        "p99_us": percentile(timings, 99) / 1e3,
+        "alloc_kib": statistics.fmean(peaks) / 1024 if peaks else 0.0,
+    }
@@ -0,0 +1,100 @@
+"""
+Benchmark Stand-ins
+Local HTTP server answering the Pandaproxy, calendar and AgentKit calls the hot paths make,
+and a scratch copy of the app database for the lookups they do
+"""
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    ids = itertools.count(1)
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: dict | None = None) -> None:
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        # Consumer polls: nothing to deliver
+        self._reply(204)
+
+    def do_DELETE(self) -> None:
+        self._reply(204)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path
+
+        if path.startswith("/topics/"):
+            offsets = [{"partition": 0, "offset": next(self.ids)} for _ in body.get("records", [])]
+            self._reply(200, {"offsets": offsets})
+        elif path.endswith("/offsets") or path.endswith("/subscription"):
+            self._reply(204)
+        elif path.startswith("/consumers/"):
+            self._reply(200, {"instance_id": "bench", "base_uri": f"{self.server.url}{path}/instances/bench"})
+        elif path.startswith("/api/meetings"):
+            self._reply(200, {"id": f"mtg-{next(self.ids)}", "status": "scheduled", **body})
+        elif path.startswith("/api/nudges"):
+            self._reply(200, {"id": f"nudge-{next(self.ids)}", "status": "sent", **body})
+        elif path.startswith("/run"):
+            self._reply(200, {"status": "processed", "event_id": body.get("event_id")})
+        else:
+            self._reply(404, {"detail": "not stubbed"})
+
+
+class StubServer:
+    """Threaded HTTP stand-in on an ephemeral localhost port"""
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.httpd.url = self.url
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def scratch_prisma_db(directory: str, employees: list[tuple], source: str) -> str:
+    """
+    Copy the app database into `directory` and seed its Employee table
+
+    The agent's lookups then hit real rows, and the tracked database is
+    never opened. `employees` are (id, name, email, skills, workload,
+    availability, performance) rows as bench.payloads.employee_rows() makes them.
+    """
+    path = os.path.join(directory, "bench.db")
+    shutil.copyfile(source, path)
+    db = sqlite3.connect(path)
+    try:
+        with db:
+            db.execute('DELETE FROM "Employee"')
+            db.executemany(
+                'INSERT INTO "Employee" (id, name, email, skills, currentWorkload, availability, '
+                'performanceScore, currentProjects, updatedAt) VALUES (?, ?, ?, ?, ?, ?, ?, \'[]\', CURRENT_TIMESTAMP)',
+                employees,
+            )
+    finally:
+        db.close()
+    return path
@@ -0,0 +1,439 @@
+"""
+Local Broker
+Pandaproxy-compatible REST broker for offline runs and load tests
+
+Usage:
+    python3 backend/broker/proxy.py                                  # serves on :8082 like Pandaproxy
+    python3 backend/broker/proxy.py --topics issues,actions,outcomes,dlq --partitions 6
+
+Implements the subset of the Pandaproxy v2 API the services use: produce to
+/topics/{topic} (JSON or binary embedded format, keyed partitioning),
+consumer-group instances with subscriptions, long-polled /records?timeout=
+fetches, and manual offset commits.
+
+Records are stored as the bytes they carried: JSON text for the JSON
+format, the decoded base64 for the binary one. A binary-format instance gets
+any record back as base64; a JSON-format instance gets non-JSON values
+(those starting with a NUL byte, see backend.events.codec) as null.
+
+Records live in append-only segment files under BROKER_DATA_DIR, so the data
+survives restarts and can grow to millions of records.
+
+Partitions of each subscribed topic are spread over the group's instances
+(sorted by name, round-robin). Joins, leaves and instances that stop polling
+for BROKER_INSTANCE_TIMEOUT seconds rebalance the group; newly assigned
+partitions resume from the group's committed offset.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.broker.storage import BrokerStorage, Topic, TopicNotFound
+from backend.common.log import get_logger
+from backend.common.metrics import counter, instrument
+
+try:
+    import orjson
+
+    def dumps(value) -> bytes:
+        return orjson.dumps(value)
+
+    loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    def dumps(value) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+load_dotenv()
+
+DATA_DIR = os.getenv("BROKER_DATA_DIR", ".broker")
+PARTITIONS = int(os.getenv("BROKER_PARTITIONS", "3"))
+SEGMENT_BYTES = int(os.getenv("BROKER_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+RETENTION_BYTES = int(os.getenv("BROKER_RETENTION_BYTES", "0"))
+AUTO_CREATE = os.getenv("BROKER_AUTO_CREATE", "true").lower() in ("1", "true", "yes")
+FSYNC = os.getenv("BROKER_FSYNC", "false").lower() in ("1", "true", "yes")
+FETCH_MAX_BYTES = int(os.getenv("BROKER_FETCH_MAX_BYTES", str(1024 * 1024)))
+INSTANCE_TIMEOUT = float(os.getenv("BROKER_INSTANCE_TIMEOUT", "300"))
+TOPICS = [t for t in os.getenv("BROKER_TOPICS", "issues,builds,vendors,actions,outcomes,dlq").split(",") if t]
+
+JSON_RECORDS = "application/vnd.kafka.json.v2+json"
+BINARY_RECORDS = "application/vnd.kafka.binary.v2+json"
+FORMATS = {"json": JSON_RECORDS, "binary": BINARY_RECORDS}
+
+log = get_logger("broker")
+
+PRODUCED = counter("broker_records_produced_total", "Records appended", ("topic",))
+FETCHED = counter("broker_records_fetched_total", "Records returned to consumers", ("topic",))
+
+
+def error(status: int, code: int, message: str) -> JSONResponse:
+    """Error body in Pandaproxy's shape"""
+    return JSONResponse({"error_code": code, "message": message}, status_code=status)
+
+
+class Instance:
+    """A consumer instance: its subscription, assignment and fetch positions"""
+
+    def __init__(self, group: str, name: str, reset: str, format: str = "json"):
+        self.group = group
+        self.name = name
+        self.reset = reset
+        self.format = format
+        self.topics: list[str] = []
+        self.generation = -1
+        # (topic, partition) -> next offset to fetch
+        self.positions: dict[tuple[str, int], int] = {}
+        self.cursor = 0
+        self.last_seen = time.monotonic()
+
+
+class Broker:
+    """Storage plus in-memory consumer groups"""
+
+    def __init__(self, storage: BrokerStorage):
+        self.storage = storage
+        self.groups: dict[str, dict[str, Instance]] = {}
+        self.generations: dict[str, int] = {}
+        self._appended = asyncio.Event()
+
+    def topic(self, name: str) -> Topic:
+        try:
+            return self.storage.topic(name)
+        except TopicNotFound:
+            if not AUTO_CREATE:
+                raise
+            return self.storage.create_topic(name)
+
+    def notify(self) -> None:
+        """Wake every long-polling fetch"""
+        self._appended.set()
+        self._appended = asyncio.Event()
+
+    async def wait(self, timeout: float) -> None:
+        """Return when records are appended or after `timeout` seconds"""
+        try:
+            await asyncio.wait_for(self._appended.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def rebalance(self, group: str) -> None:
+        self.generations[group] = self.generations.get(group, 0) + 1
+
+    def join(self, group: str, name: str, reset: str, format: str = "json") -> Instance | None:
+        members = self.groups.setdefault(group, {})
+        if name in members:
+            return None
+        members[name] = Instance(group, name, reset, format)
+        self.rebalance(group)
+        return members[name]
+
+    def leave(self, group: str, name: str) -> bool:
+        members = self.groups.get(group, {})
+        if members.pop(name, None) is None:
+            return False
+        self.rebalance(group)
+        return True
+
+    def expire(self) -> None:
+        """Drop instances that stopped polling, as Pandaproxy does"""
+        cutoff = time.monotonic() - INSTANCE_TIMEOUT
+        for group, members in self.groups.items():
+            for name in [name for name, instance in members.items() if instance.last_seen < cutoff]:
+                log.info("Consumer instance %s/%s timed out", group, name)
+                self.leave(group, name)
+
+    def assignment(self, instance: Instance) -> list[tuple[str, int]]:
+        """Refresh the instance's partitions if the group changed since it last fetched"""
+        generation = self.generations.get(instance.group, 0)
+        if instance.generation != generation:
+            instance.generation = generation
+            members = self.groups.get(instance.group, {})
+            owned = set()
+            for topic_name in instance.topics:
+                try:
+                    topic = self.topic(topic_name)
+                except TopicNotFound:
+                    continue
+                subscribers = sorted(name for name, member in members.items() if topic_name in member.topics)
+                slot = subscribers.index(instance.name)
+                owned.update((topic_name, p) for p in range(slot, len(topic.partitions), len(subscribers)))
+            for position in list(instance.positions):
+                if position not in owned:
+                    del instance.positions[position]
+            for topic_name, partition in owned - instance.positions.keys():
+                log_partition = self.storage.topic(topic_name).partitions[partition]
+                committed = self.storage.committed.get((instance.group, topic_name, partition))
+                if committed is None:
+                    committed = log_partition.start_offset if instance.reset == "earliest" else log_partition.end_offset
+                instance.positions[(topic_name, partition)] = committed
+        return sorted(instance.positions)
+
+    def fetch(self, instance: Instance, max_bytes: int) -> list[bytes]:
+        """Encoded records from the instance's partitions, taking turns between them"""
+        owned = self.assignment(instance)
+        if not owned:
+            return []
+        out = []
+        budget = max_bytes
+        start = instance.cursor % len(owned)
+        for i in range(len(owned)):
+            topic_name, partition = owned[(start + i) % len(owned)]
+            position = instance.positions[(topic_name, partition)]
+            records = self.storage.topic(topic_name).partitions[partition].read(position, budget)
+            if not records:
+                continue
+            prefix = b'{"topic":' + dumps(topic_name) + b',"partition":%d,"offset":' % partition
+            for offset, _, key, value in records:
+                if instance.format == "binary":
+                    key_out = b"null" if key is None else b'"' + base64.b64encode(key) + b'"'
+                    value_out = b'"' + base64.b64encode(value) + b'"'
+                else:
+                    key_out = key or b"null"
+                    value_out = b"null" if value[:1] == b"\x00" else value
+                out.append(prefix + b'%d,"key":' % offset + key_out + b',"value":' + value_out + b"}")
+                budget -= len(value) + len(key or b"")
+            instance.positions[(topic_name, partition)] = records[-1][0] + 1
+            FETCHED.labels(topic_name).inc(len(records))
+            if budget <= 0:
+                break
+        instance.cursor += 1
+        return out
+
+
+broker: Broker | None = None
+
+
+async def expire_instances() -> None:
+    while True:
+        await asyncio.sleep(min(10.0, INSTANCE_TIMEOUT))
+        broker.expire()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the data directory, create the configured topics, and close segments on exit"""
+    global broker
+    storage = BrokerStorage(DATA_DIR, PARTITIONS, SEGMENT_BYTES, RETENTION_BYTES, FSYNC)
+    for name in TOPICS:
+        storage.create_topic(name)
+    broker = Broker(storage)
+    log.info("Broker serving %d topics from %s", len(storage.topics), Path(DATA_DIR).resolve())
+    sweeper = asyncio.create_task(expire_instances())
+    yield
+    sweeper.cancel()
+    storage.close()
+
+
+app = FastAPI(lifespan=lifespan)
+instrument(app, "broker")
+
+
+@app.get("/health")
+async def health():
+    """Health check"""
+    return {"status": "ok", "service": "local-broker", "topics": len(broker.storage.topics)}
+
+
+@app.get("/topics")
+async def list_topics():
+    return sorted(broker.storage.topics)
+
+
+@app.get("/topics/{topic_name}")
+async def describe_topic(topic_name: str):
+    try:
+        topic = broker.storage.topic(topic_name)
+    except TopicNotFound:
+        return error(404, 40401, "Topic not found")
+    return {
+        "name": topic.name,
+        "partitions": [
+            {"partition": p, "leader": 0, "start_offset": part.start_offset, "end_offset": part.end_offset}
+            for p, part in enumerate(topic.partitions)
+        ],
+    }
+
+
+@app.post("/topics/{topic_name}")
+async def produce(topic_name: str, request: Request):
+    """Append records; responds with each record's partition and offset"""
+    try:
+        topic = broker.topic(topic_name)
+    except TopicNotFound:
+        return error(404, 40401, "Topic not found")
+    except ValueError as e:
+        return error(422, 42201, str(e))
+    binary = request.headers.get("content-type", "").startswith(BINARY_RECORDS)
+    try:
+        records = loads(await request.body())["records"]
+        if binary:
+            entries = [
+                (
+                    record.get("partition"),
+                    None if record.get("key") is None else base64.b64decode(record["key"]),
+                    base64.b64decode(record.get("value") or b""),
+                )
+                for record in records
+            ]
+        else:
+            entries = [
+                (
+                    record.get("partition"),
+                    None if record.get("key") is None else dumps(record["key"]),
+                    dumps(record.get("value")),
+                )
+                for record in records
+            ]
+        results = broker.storage.produce(topic, entries)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return error(422, 42201, f"Invalid produce request: {e}")
+    PRODUCED.labels(topic_name).inc(len(results))
+    broker.notify()
+    return {"offsets": [{"partition": partition, "offset": offset} for partition, offset in results]}
+
+
+@app.post("/consumers/{group}")
+async def create_consumer(group: str, request: Request):
+    """Create a consumer instance; 409 if the name is taken"""
+    body = loads(await request.body() or b"{}")
+    name = body.get("name") or f"consumer-{int(time.time() * 1000)}"
+    format = body.get("format", "json")
+    if format not in FORMATS:
+        return error(422, 42204, "Only the json and binary formats are supported")
+    instance = broker.join(group, name, body.get("auto.offset.reset", "earliest"), format)
+    if instance is None:
+        return error(409, 40902, "Consumer instance with the specified name already exists")
+    base = str(request.base_url).rstrip("/")
+    return {"instance_id": name, "base_uri": f"{base}/consumers/{group}/instances/{name}"}
+
+
+def _instance(group: str, name: str) -> Instance | None:
+    instance = broker.groups.get(group, {}).get(name)
+    if instance is not None:
+        instance.last_seen = time.monotonic()
+    return instance
+
+
+@app.delete("/consumers/{group}/instances/{name}")
+async def delete_consumer(group: str, name: str):
+    if not broker.leave(group, name):
+        return error(404, 40403, "Consumer instance not found")
+    return Response(status_code=204)
+
+
+@app.post("/consumers/{group}/instances/{name}/subscription")
+async def subscribe(group: str, name: str, request: Request):
+    instance = _instance(group, name)
+    if instance is None:
+        return error(404, 40403, "Consumer instance not found")
+    topics = loads(await request.body()).get("topics") or []
+    for topic_name in topics:
+        try:
+            broker.topic(topic_name)
+        except (TopicNotFound, ValueError):
+            return error(404, 40401, f"Topic '{topic_name}' not found")
+    instance.topics = list(topics)
+    broker.rebalance(group)
+    return Response(status_code=204)
+
+
+@app.get("/consumers/{group}/instances/{name}/subscription")
+async def get_subscription(group: str, name: str):
+    instance = _instance(group, name)
+    if instance is None:
+        return error(404, 40403, "Consumer instance not found")
+    return {"topics": instance.topics}
+
+
+@app.delete("/consumers/{group}/instances/{name}/subscription")
+async def unsubscribe(group: str, name: str):
+    instance = _instance(group, name)
+    if instance is None:
+        return error(404, 40403, "Consumer instance not found")
+    instance.topics = []
+    broker.rebalance(group)
+    return Response(status_code=204)
+
+
+@app.get("/consumers/{group}/instances/{name}/records")
+async def records(group: str, name: str, timeout: int = 1000, max_bytes: int = FETCH_MAX_BYTES):
+    """Records past the instance's positions, waiting up to `timeout` ms for some to arrive"""
+    instance = _instance(group, name)
+    if instance is None:
+        return error(404, 40403, "Consumer instance not found")
+    deadline = time.monotonic() + max(0, timeout) / 1000
+    while True:
+        out = broker.fetch(instance, max_bytes)
+        remaining = deadline - time.monotonic()
+        if out or remaining <= 0:
+            break
+        await broker.wait(remaining)
+    instance.last_seen = time.monotonic()
+    return Response(b"[" + b",".join(out) + b"]", media_type=FORMATS[instance.format])
+
+
+@app.post("/consumers/{group}/instances/{name}/offsets")
+async def commit_offsets(group: str, name: str, request: Request):
+    """Commit {"partitions": [{"topic", "partition", "offset"}]} for the group"""
+    if _instance(group, name) is None:
+        return error(404, 40403, "Consumer instance not found")
+    body = loads(await request.body() or b"{}")
+    try:
+        entries = [(p["topic"], int(p["partition"]), int(p["offset"])) for p in body.get("partitions") or []]
+    except (KeyError, TypeError, ValueError) as e:
+        return error(422, 42201, f"Invalid commit request: {e}")
+    broker.storage.commit(group, entries)
+    return Response(status_code=204)
+
+
+@app.get("/consumers/{group}/instances/{name}/offsets")
+async def committed_offsets(group: str, name: str, request: Request):
+    """Committed offsets for the requested partitions (-1 if none)"""
+    if _instance(group, name) is None:
+        return error(404, 40403, "Consumer instance not found")
+    body = loads(await request.body() or b"{}")
+    return {
+        "offsets": [
+            {
+                "topic": p["topic"],
+                "partition": p["partition"],
+                "offset": broker.storage.committed.get((group, p["topic"], p["partition"]), -1),
+                "metadata": "",
+            }
+            for p in body.get("partitions") or []
+        ]
+    }
+
+
+def main():
+    global DATA_DIR, PARTITIONS, TOPICS
+    parser = argparse.ArgumentParser(description="Run a local Pandaproxy-compatible broker")
+    parser.add_argument("--port", type=int, default=int(os.getenv("BROKER_PORT", "8082")))
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Where segment files are kept")
+    parser.add_argument("--partitions", type=int, default=PARTITIONS, help="Partitions for new topics")
+    parser.add_argument("--topics", default=",".join(TOPICS), help="Comma-separated topics to create up front")
+    args = parser.parse_args()
+    DATA_DIR, PARTITIONS = args.data_dir, args.partitions
+    TOPICS = [t for t in args.topics.split(",") if t]
+
+    import uvicorn
+    log.info("Starting local broker on port %d", args.port)
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
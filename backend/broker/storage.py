@@ -0,0 +1,330 @@
+"""
+Broker Storage
+Append-only segment files per topic partition, plus the committed group offsets
+
+Layout under the data directory:
+
+    <topic>/<partition>/<base offset, 20 digits>.log
+    offsets.log                                   # group\ttopic\tpartition\toffset lines
+
+Each record is a fixed header (offset, timestamp ms, key length or -1, value
+length) followed by the key and value bytes exactly as they are served. A
+sparse in-memory index (one entry every INDEX_INTERVAL_BYTES) maps offsets
+to file positions, so a fetch seeks close to its start offset and reads
+forward instead of scanning the segment.
+"""
+import bisect
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from backend.common.log import get_logger
+
+RECORD_HEADER = struct.Struct(">QqiI")
+INDEX_INTERVAL_BYTES = 4096
+READ_CHUNK_BYTES = 64 * 1024
+# Rewrite offsets.log once it holds this many superseded commits
+OFFSETS_COMPACT_LINES = 100_000
+
+log = get_logger("broker.storage")
+
+
+class TopicNotFound(Exception):
+    """Raised for produce/fetch against a topic that does not exist"""
+
+
+class Segment:
+    """One append-only file holding offsets [base_offset, next_offset)"""
+
+    def __init__(self, path: Path, base_offset: int, fsync: bool = False):
+        self.path = path
+        self.base_offset = base_offset
+        self.fsync = fsync
+        # Parallel lists: offsets and their file positions, sparse
+        self.index_offsets: list[int] = []
+        self.index_positions: list[int] = []
+        self.size = 0
+        self.next_offset = base_offset
+        self._last_indexed = -INDEX_INTERVAL_BYTES
+        if path.exists():
+            self._recover()
+        self._writer = open(path, "ab", buffering=0)
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def _recover(self) -> None:
+        """Rebuild the index and cut off a torn trailing record left by a crash"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            offset, _, key_length, value_length = RECORD_HEADER.unpack_from(data, position)
+            end = position + RECORD_HEADER.size + max(key_length, 0) + value_length
+            if end > len(data):
+                break
+            self._maybe_index(offset, position)
+            self.next_offset = offset + 1
+            position = end
+        if position < len(data):
+            log.warning("Truncating %d torn bytes from %s", len(data) - position, self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(position)
+        self.size = position
+
+    def _maybe_index(self, offset: int, position: int) -> None:
+        if position - self._last_indexed >= INDEX_INTERVAL_BYTES:
+            self.index_offsets.append(offset)
+            self.index_positions.append(position)
+            self._last_indexed = position
+
+    def append(self, records: list[tuple[bytes | None, bytes]], timestamp_ms: int) -> int:
+        """Write records in one call; returns the first assigned offset"""
+        first = self.next_offset
+        parts = []
+        position = self.size
+        for key, value in records:
+            key_length = -1 if key is None else len(key)
+            self._maybe_index(self.next_offset, position)
+            parts.append(RECORD_HEADER.pack(self.next_offset, timestamp_ms, key_length, len(value)))
+            if key is not None:
+                parts.append(key)
+            parts.append(value)
+            position += RECORD_HEADER.size + max(key_length, 0) + len(value)
+            self.next_offset += 1
+        self._writer.write(b"".join(parts))
+        if self.fsync:
+            os.fsync(self._writer.fileno())
+        self.size = position
+        return first
+
+    def read(self, offset: int, max_bytes: int) -> list[tuple[int, int, bytes | None, bytes]]:
+        """Records from `offset` on, up to about max_bytes (always at least one if any exist)"""
+        if offset >= self.next_offset:
+            return []
+        slot = bisect.bisect_right(self.index_offsets, offset) - 1
+        position = self.index_positions[slot] if slot >= 0 else 0
+        records = []
+        used = 0
+        buffer = b""
+        start = position
+        while position < self.size:
+            if position + RECORD_HEADER.size > start + len(buffer):
+                buffer = os.pread(self._fd, max(READ_CHUNK_BYTES, RECORD_HEADER.size), position)
+                start = position
+            record_offset, timestamp, key_length, value_length = RECORD_HEADER.unpack_from(buffer, position - start)
+            length = RECORD_HEADER.size + max(key_length, 0) + value_length
+            if position + length > start + len(buffer):
+                buffer = os.pread(self._fd, max(READ_CHUNK_BYTES, length), position)
+                start = position
+            if record_offset >= offset:
+                if records and used + length > max_bytes:
+                    break
+                body = position - start + RECORD_HEADER.size
+                key = None if key_length < 0 else buffer[body:body + key_length]
+                value = buffer[body + max(key_length, 0):body + max(key_length, 0) + value_length]
+                records.append((record_offset, timestamp, key, value))
+                used += length
+            position += length
+        return records
+
+    def close(self) -> None:
+        self._writer.close()
+        os.close(self._fd)
+
+    def delete(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class Partition:
+    """Ordered segments for one topic partition; only the last one is written"""
+
+    def __init__(self, directory: Path, segment_bytes: int, retention_bytes: int = 0, fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_bytes = retention_bytes
+        self.fsync = fsync
+        directory.mkdir(parents=True, exist_ok=True)
+        self.segments = [
+            Segment(path, int(path.stem), fsync) for path in sorted(directory.glob("*.log"), key=lambda p: int(p.stem))
+        ]
+        if not self.segments:
+            self.segments.append(self._new_segment(0))
+        self.bases = [segment.base_offset for segment in self.segments]
+
+    def _new_segment(self, base_offset: int) -> Segment:
+        return Segment(self.directory / f"{base_offset:020d}.log", base_offset, self.fsync)
+
+    @property
+    def start_offset(self) -> int:
+        return self.segments[0].base_offset
+
+    @property
+    def end_offset(self) -> int:
+        return self.segments[-1].next_offset
+
+    def append(self, records: list[tuple[bytes | None, bytes]], timestamp_ms: int) -> int:
+        active = self.segments[-1]
+        if active.size >= self.segment_bytes:
+            active = self._new_segment(active.next_offset)
+            self.segments.append(active)
+            self.bases.append(active.base_offset)
+            self._enforce_retention()
+        return active.append(records, timestamp_ms)
+
+    def _enforce_retention(self) -> None:
+        if not self.retention_bytes:
+            return
+        while len(self.segments) > 1 and sum(s.size for s in self.segments) > self.retention_bytes:
+            oldest = self.segments.pop(0)
+            self.bases.pop(0)
+            oldest.delete()
+            log.info("Deleted segment %s (retention)", oldest.path)
+
+    def read(self, offset: int, max_bytes: int) -> list[tuple[int, int, bytes | None, bytes]]:
+        offset = max(offset, self.start_offset)
+        slot = max(0, bisect.bisect_right(self.bases, offset) - 1)
+        records = []
+        budget = max_bytes
+        for segment in self.segments[slot:]:
+            chunk = segment.read(offset, budget)
+            if not chunk:
+                continue
+            records.extend(chunk)
+            budget -= sum(RECORD_HEADER.size + len(value) + len(key or b"") for _, _, key, value in chunk)
+            offset = records[-1][0] + 1
+            if budget <= 0 or offset < segment.next_offset:
+                # Out of budget, or the segment itself stopped short of its end
+                break
+        return records
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+
+class Topic:
+    def __init__(self, name: str, partitions: list[Partition]):
+        self.name = name
+        self.partitions = partitions
+        self._next = 0
+
+    def choose_partition(self, key: bytes | None) -> int:
+        """Same key, same partition; keyless records are spread round-robin"""
+        if key is None:
+            self._next = (self._next + 1) % len(self.partitions)
+            return self._next
+        return zlib.crc32(key) % len(self.partitions)
+
+
+class BrokerStorage:
+    """Topics on disk plus committed consumer-group offsets"""
+
+    def __init__(
+        self,
+        data_dir: str,
+        default_partitions: int = 3,
+        segment_bytes: int = 64 * 1024 * 1024,
+        retention_bytes: int = 0,
+        fsync: bool = False,
+    ):
+        self.root = Path(data_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.default_partitions = default_partitions
+        self.segment_bytes = segment_bytes
+        self.retention_bytes = retention_bytes
+        self.fsync = fsync
+        self.topics: dict[str, Topic] = {}
+        self._lock = threading.Lock()
+        for directory in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            count = len([p for p in directory.iterdir() if p.is_dir() and p.name.isdigit()])
+            if count:
+                self.topics[directory.name] = self._open_topic(directory.name, count)
+
+        # (group, topic, partition) -> committed offset (the next one to consume)
+        self.committed: dict[tuple[str, str, int], int] = {}
+        self._offsets_path = self.root / "offsets.log"
+        self._offset_lines = 0
+        if self._offsets_path.exists():
+            with open(self._offsets_path, "r") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 4:
+                        self.committed[(parts[0], parts[1], int(parts[2]))] = int(parts[3])
+                        self._offset_lines += 1
+        self._offsets_file = open(self._offsets_path, "a")
+
+    def _open_topic(self, name: str, partitions: int) -> Topic:
+        return Topic(name, [
+            Partition(self.root / name / str(p), self.segment_bytes, self.retention_bytes, self.fsync)
+            for p in range(partitions)
+        ])
+
+    def create_topic(self, name: str, partitions: int | None = None) -> Topic:
+        with self._lock:
+            topic = self.topics.get(name)
+            if topic is None:
+                if not name or "/" in name or name.startswith("."):
+                    raise ValueError(f"Invalid topic name {name!r}")
+                topic = self.topics[name] = self._open_topic(name, partitions or self.default_partitions)
+                log.info("Created topic '%s' with %d partitions", name, len(topic.partitions))
+            return topic
+
+    def topic(self, name: str) -> Topic:
+        topic = self.topics.get(name)
+        if topic is None:
+            raise TopicNotFound(name)
+        return topic
+
+    def produce(self, topic: Topic, records: list[tuple[int | None, bytes | None, bytes]]) -> list[tuple[int, int]]:
+        """
+        Append (partition or None, key, value) records
+
+        Returns (partition, offset) per record, in input order. Records for
+        the same partition are written together.
+        """
+        timestamp_ms = int(time.time() * 1000)
+        grouped: dict[int, list[int]] = {}
+        for i, (partition, key, _) in enumerate(records):
+            if partition is None:
+                partition = topic.choose_partition(key)
+            elif not 0 <= partition < len(topic.partitions):
+                raise ValueError(f"Partition {partition} does not exist in '{topic.name}'")
+            grouped.setdefault(partition, []).append(i)
+
+        results: list[tuple[int, int]] = [(0, 0)] * len(records)
+        for partition, indexes in grouped.items():
+            first = topic.partitions[partition].append([records[i][1:] for i in indexes], timestamp_ms)
+            for n, i in enumerate(indexes):
+                results[i] = (partition, first + n)
+        return results
+
+    def commit(self, group: str, entries: list[tuple[str, int, int]]) -> None:
+        """Record (topic, partition, offset) commits for a group"""
+        lines = []
+        for topic, partition, offset in entries:
+            self.committed[(group, topic, partition)] = offset
+            lines.append(f"{group}\t{topic}\t{partition}\t{offset}\n")
+        self._offsets_file.write("".join(lines))
+        self._offsets_file.flush()
+        self._offset_lines += len(lines)
+        if self._offset_lines > max(OFFSETS_COMPACT_LINES, 2 * len(self.committed)):
+            self._compact_offsets()
+
+    def _compact_offsets(self) -> None:
+        self._offsets_file.close()
+        temporary = self._offsets_path.with_suffix(".tmp")
+        with open(temporary, "w") as f:
+            for (group, topic, partition), offset in self.committed.items():
+                f.write(f"{group}\t{topic}\t{partition}\t{offset}\n")
+        os.replace(temporary, self._offsets_path)
+        self._offset_lines = len(self.committed)
+        self._offsets_file = open(self._offsets_path, "a")
+
+    def close(self) -> None:
+        for topic in self.topics.values():
+            for partition in topic.partitions:
+                partition.close()
+        self._offsets_file.close()
@@ -0,0 +1,95 @@
+"""
+Fault Injection
+Configurable latency distributions and error rates for the mock calendar API
+
+Latency specs (milliseconds):
+    none                    no added latency
+    fixed:MS                constant delay
+    uniform:LO:HI           uniformly distributed between LO and HI
+    normal:MEAN:STDDEV      normal, clipped at 0
+    exponential:MEAN        exponential with the given mean
+    lognormal:MEDIAN:SIGMA  log-normal (long tail) with the given median
+"""
+import math
+import os
+import random
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISTRIBUTIONS = {
+    "none": 0,
+    "fixed": 1,
+    "uniform": 2,
+    "normal": 2,
+    "exponential": 1,
+    "lognormal": 2,
+}
+
+
+class FaultConfig(BaseModel):
+    """Fault injection settings"""
+    latency: str = "none"
+    error_rate: float = 0.0  # fraction of requests answered with error_status
+    error_status: int = 503
+    timeout_rate: float = 0.0  # fraction of requests held for timeout_seconds
+    timeout_seconds: float = 30.0
+
+
+def parse_latency(spec: str) -> tuple[str, list[float]]:
+    """Split a latency spec into its distribution name and numeric parameters"""
+    name, *params = spec.split(":")
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution {name!r}; expected one of {sorted(DISTRIBUTIONS)}")
+    if len(params) != DISTRIBUTIONS[name]:
+        raise ValueError(f"Latency {name!r} takes {DISTRIBUTIONS[name]} parameter(s), got {spec!r}")
+    return name, [float(p) for p in params]
+
+
+class FaultInjector:
+    """Samples the delay and failure to apply to each request"""
+
+    def __init__(self, config: FaultConfig | None = None):
+        self.configure(config or FaultConfig(
+            latency=os.getenv("CALENDAR_LATENCY", "none"),
+            error_rate=float(os.getenv("CALENDAR_ERROR_RATE", "0")),
+            error_status=int(os.getenv("CALENDAR_ERROR_STATUS", "503")),
+            timeout_rate=float(os.getenv("CALENDAR_TIMEOUT_RATE", "0")),
+            timeout_seconds=float(os.getenv("CALENDAR_TIMEOUT_SECONDS", "30")),
+        ))
+
+    def configure(self, config: FaultConfig) -> None:
+        """Apply new settings; raises ValueError for an invalid spec"""
+        distribution, params = parse_latency(config.latency)
+        for rate in (config.error_rate, config.timeout_rate):
+            if not 0 <= rate <= 1:
+                raise ValueError("Rates must be between 0 and 1")
+        self.config = config
+        self._distribution = distribution
+        self._params = params
+
+    def delay(self) -> float:
+        """Seconds to wait before answering this request"""
+        if random.random() < self.config.timeout_rate:
+            return self.config.timeout_seconds
+        p = self._params
+        if self._distribution == "fixed":
+            ms = p[0]
+        elif self._distribution == "uniform":
+            ms = random.uniform(p[0], p[1])
+        elif self._distribution == "normal":
+            ms = max(0.0, random.gauss(p[0], p[1]))
+        elif self._distribution == "exponential":
+            ms = random.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        elif self._distribution == "lognormal":
+            ms = random.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+        else:
+            ms = 0.0
+        return ms / 1000
+
+    def error_status(self) -> int | None:
+        """Status code to fail this request with, or None to serve it"""
+        if random.random() < self.config.error_rate:
+            return self.config.error_status
+        return None
@@ -1,14 +1,31 @@
 """
 Mock Calendar API
-Simulates calendar and notification services for testing
+Simulates calendar and notification services for testing and load tests
 """
+import asyncio
 import os
-import time
-from fastapi import FastAPI
+import sys
+from pathlib import Path
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.calendar.faults import FaultConfig, FaultInjector
+from backend.calendar.store import CalendarStore
+from backend.common.log import get_logger
+from backend.common.metrics import instrument
+
 app = FastAPI()
+instrument(app, "calendar")
+
+log = get_logger("calendar")
+store = CalendarStore()
+faults = FaultInjector()
 
 
 class MeetingRequest(BaseModel):
@@ -26,10 +43,41 @@ class NudgeRequest(BaseModel):
     priority: Optional[str] = "normal"
 
 
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """Apply the configured latency and error rate to /api requests"""
+    if request.url.path.startswith("/api/"):
+        delay = faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        status = faults.error_status()
+        if status:
+            log.warning("Injected failure", extra={"fields": {"path": request.url.path, "status": status}})
+            return JSONResponse({"detail": "Injected failure"}, status_code=status)
+    return await call_next(request)
+
+
 @app.get("/health")
 async def health():
     """Health check"""
-    return {"status": "ok", "service": "mock-calendar-api"}
+    return {"status": "ok", "service": "mock-calendar-api", **store.stats()}
+
+
+@app.get("/admin/faults")
+async def get_faults():
+    """Current fault injection settings"""
+    return faults.config
+
+
+@app.put("/admin/faults")
+async def set_faults(config: FaultConfig):
+    """Replace fault injection settings (e.g. between load test phases)"""
+    try:
+        faults.configure(config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log.info("Fault injection updated", extra={"fields": dict(config)})
+    return faults.config
 
 
 @app.post("/api/meetings")
@@ -38,24 +86,26 @@ async def create_meeting(meeting: MeetingRequest):
     Create a meeting/calendar event
     Returns meeting ID and ICS link
     """
-    meeting_id = f"mtg-{int(time.time())}"
-
-    print(f"\n[CALENDAR] Creating meeting")
-    print(f"   Title: {meeting.title}")
-    print(f"   Participants: {', '.join(meeting.participants)}")
-    print(f"   Start: {meeting.start_at}")
-    print(f"   Duration: {meeting.duration_min} minutes")
-    print(f"   ID: {meeting_id}")
-
-    return {
-        "id": meeting_id,
+    try:
+        stored = store.add_meeting({
+            "title": meeting.title,
+            "participants": meeting.participants,
+            "start_at": meeting.start_at,
+            "duration_min": meeting.duration_min,
+            "status": "scheduled",
+        })
+    except ValueError:
+        raise HTTPException(status_code=422, detail="start_at must be an ISO 8601 timestamp")
+    stored["ics"] = f"https://calendar.example.com/ics/{stored['id']}"
+
+    log.info("Created meeting", extra={"fields": {
+        "id": stored["id"],
         "title": meeting.title,
-        "participants": meeting.participants,
+        "participants": ",".join(meeting.participants),
         "start_at": meeting.start_at,
         "duration_min": meeting.duration_min,
-        "ics": f"https://calendar.example.com/ics/{meeting_id}",
-        "status": "scheduled",
-    }
+    }})
+    return stored
 
 
 @app.post("/api/nudges")
@@ -64,44 +114,59 @@ async def send_nudge(nudge: NudgeRequest):
     Send a nudge/notification
     Returns nudge ID
     """
-    nudge_id = f"nudge-{int(time.time())}"
-
-    print(f"\n[NOTIFICATION] Sending nudge")
-    print(f"   To: {nudge.to}")
-    print(f"   Message: {nudge.message}")
-    print(f"   Priority: {nudge.priority}")
-    print(f"   ID: {nudge_id}")
-
-    return {
-        "id": nudge_id,
+    stored = store.add_nudge({
         "to": nudge.to,
         "message": nudge.message,
         "priority": nudge.priority,
         "status": "sent",
-    }
+    })
+
+    log.info("Sent nudge", extra={"fields": {"id": stored["id"], "to": nudge.to, "priority": nudge.priority}})
+    return stored
+
+
+@app.get("/api/meetings")
+async def list_meetings(
+    participant: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 100,
+):
+    """List meetings by participant and/or time range (ISO 8601 start/end)"""
+    try:
+        meetings = store.query_meetings(participant=participant, start=start, end=end, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="start/end must be ISO 8601 timestamps")
+    return {"meetings": meetings, "count": len(meetings)}
 
 
 @app.get("/api/meetings/{meeting_id}")
 async def get_meeting(meeting_id: str):
     """Get meeting details"""
-    return {
-        "id": meeting_id,
-        "status": "scheduled",
-        "title": "Mock Meeting",
-    }
+    meeting = store.meetings.get(meeting_id)
+    if meeting is None:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    return meeting
+
+
+@app.get("/api/nudges")
+async def list_nudges(to: Optional[str] = None, limit: int = 100):
+    """List the most recent nudges, optionally for one recipient"""
+    nudges = store.query_nudges(to=to, limit=limit)
+    return {"nudges": nudges, "count": len(nudges)}
 
 
 @app.get("/api/nudges/{nudge_id}")
 async def get_nudge(nudge_id: str):
     """Get nudge details"""
-    return {
-        "id": nudge_id,
-        "status": "sent",
-    }
+    nudge = store.nudges.get(nudge_id)
+    if nudge is None:
+        raise HTTPException(status_code=404, detail="Nudge not found")
+    return nudge
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("CALENDAR_PORT", "7300"))
-    print(f"Starting Mock Calendar API on port {port}...")
+    log.info("Starting Mock Calendar API on port %d", port)
     uvicorn.run(app, host="0.0.0.0", port=port)
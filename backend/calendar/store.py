@@ -0,0 +1,114 @@
+"""
+Calendar Store
+In-memory meeting and nudge store indexed by id, participant and start time
+"""
+import bisect
+import itertools
+import threading
+from datetime import datetime, timezone
+
+from backend.common.ids import IdGenerator
+
+
+def parse_timestamp(value: str) -> float:
+    """ISO 8601 timestamp to epoch seconds (naive times are taken as UTC)"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class CalendarStore:
+    """
+    Meetings and nudges held in memory
+
+    Meetings are indexed by id, by participant and by start time (a sorted
+    list searched with bisect), so range and participant queries do not scan
+    the whole store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.meeting_ids = IdGenerator("mtg")
+        self.nudge_ids = IdGenerator("nudge")
+        self.meetings: dict[str, dict] = {}
+        self.nudges: dict[str, dict] = {}
+        self._meetings_by_participant: dict[str, list[str]] = {}
+        self._nudges_by_recipient: dict[str, list[str]] = {}
+        # (start epoch, meeting id), kept sorted
+        self._starts: list[tuple[float, str]] = []
+        self._max_duration = 0.0
+
+    def add_meeting(self, meeting: dict) -> dict:
+        """Store a meeting (start_at must be ISO 8601) and return it with its new id"""
+        start = parse_timestamp(meeting["start_at"])
+        with self._lock:
+            meeting_id = self.meeting_ids.next()
+            stored = {"id": meeting_id, **meeting}
+            self.meetings[meeting_id] = stored
+            for participant in meeting.get("participants", []):
+                self._meetings_by_participant.setdefault(participant, []).append(meeting_id)
+            bisect.insort(self._starts, (start, meeting_id))
+            self._max_duration = max(self._max_duration, meeting.get("duration_min", 0) * 60)
+        return stored
+
+    def add_nudge(self, nudge: dict) -> dict:
+        """Store a nudge and return it with its new id"""
+        with self._lock:
+            nudge_id = self.nudge_ids.next()
+            stored = {"id": nudge_id, **nudge}
+            self.nudges[nudge_id] = stored
+            self._nudges_by_recipient.setdefault(nudge["to"], []).append(nudge_id)
+        return stored
+
+    def query_meetings(
+        self,
+        participant: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        """
+        Meetings for a participant and/or overlapping a time range, ordered by start
+
+        Args:
+            participant: Only meetings that include this participant
+            start: ISO 8601 lower bound; meetings still running at this time match
+            end: ISO 8601 upper bound (exclusive) on a meeting's start
+            limit: Maximum number of meetings returned
+        """
+        lo = parse_timestamp(start) if start else None
+        hi = parse_timestamp(end) if end else None
+        with self._lock:
+            if lo is None and hi is None and participant is not None:
+                ids = self._meetings_by_participant.get(participant, [])
+                found = [self.meetings[i] for i in ids]
+                found.sort(key=lambda m: m["start_at"])
+                return found[:limit]
+
+            # A meeting overlapping [lo, hi) starts before hi and no earlier than lo - longest meeting
+            first = 0 if lo is None else bisect.bisect_left(self._starts, (lo - self._max_duration, ""))
+            last = len(self._starts) if hi is None else bisect.bisect_left(self._starts, (hi, ""))
+            results = []
+            for i in range(first, last):
+                meeting_start, meeting_id = self._starts[i]
+                meeting = self.meetings[meeting_id]
+                if lo is not None and meeting_start + meeting.get("duration_min", 0) * 60 <= lo:
+                    continue
+                if participant is not None and participant not in meeting.get("participants", []):
+                    continue
+                results.append(meeting)
+                if len(results) >= limit:
+                    break
+            return results
+
+    def query_nudges(self, to: str | None = None, limit: int = 100) -> list[dict]:
+        """Most recent nudges, optionally only those sent to one recipient"""
+        with self._lock:
+            if to is not None:
+                ids = self._nudges_by_recipient.get(to, [])[-limit:]
+                return [self.nudges[i] for i in reversed(ids)]
+            return list(itertools.islice(reversed(self.nudges.values()), limit))
+
+    def stats(self) -> dict:
+        return {"meetings": len(self.meetings), "nudges": len(self.nudges)}
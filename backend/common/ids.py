@@ -0,0 +1,17 @@
+"""
+Record Ids
+Collision-free ids for records a process creates
+"""
+import itertools
+import uuid
+
+
+class IdGenerator:
+    """Collision-free ids: a per-process random prefix plus a counter"""
+
+    def __init__(self, prefix: str):
+        self.prefix = f"{prefix}-{uuid.uuid4().hex[:8]}"
+        self._counter = itertools.count(1)
+
+    def next(self) -> str:
+        return f"{self.prefix}-{next(self._counter)}"
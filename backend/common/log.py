@@ -0,0 +1,126 @@
+"""
+Logging
+Buffered, leveled, rate-limited structured logging shared by the backend services
+
+Records are handed to a queue and written by a background thread, so a
+request handler never waits on stdout. Set LOG_FORMAT=json for one JSON
+object per line; structured fields are passed in `extra={"fields": {...}}`.
+
+Each message template (per logger) may emit LOG_RATE_LIMIT records per
+second with bursts of LOG_RATE_BURST; the excess is dropped and counted in
+the next record that gets through. Pass per-event values as %-style
+arguments (log.info("Sent %s", event_id)) so they share one template.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "50"))
+LOG_RATE_BURST = float(os.getenv("LOG_RATE_BURST", "100"))
+
+# Bound on tracked message templates; the table is reset when it fills up
+MAX_RATE_KEYS = 10_000
+
+_listener: logging.handlers.QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with key=value fields appended"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"[{record.levelname}] {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, message template)"""
+
+    def __init__(self, rate: float = LOG_RATE_LIMIT, burst: float = LOG_RATE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_RATE_KEYS:
+                    self._buckets.clear()
+                # [tokens, last refill, suppressed since last emit]
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.fields = {**(getattr(record, "fields", None) or {}), "suppressed": suppressed}
+        return True
+
+
+def _setup() -> None:
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger("backend")
+        root.setLevel(LOG_LEVEL)
+        handler = logging.handlers.QueueHandler(records)
+        handler.addFilter(RateLimitFilter())
+        root.addHandler(handler)
+        root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the shared 'backend' hierarchy"""
+    _setup()
+    return logging.getLogger(f"backend.{name}")
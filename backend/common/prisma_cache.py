@@ -0,0 +1,224 @@
+"""
+Prisma Read Cache
+Read-through LRU over the Next.js app's SQLite database, invalidated when the app writes
+
+Lookups go to an in-process LRU first; misses read from read-only
+connections. At most every PRISMA_POLL_SECONDS a lookup checks SQLite's
+data_version, which changes whenever another connection commits. When it
+has, each table's (row count, max updatedAt) watermark is compared and the
+cached rows of every table that changed are dropped, so the app's edits
+show up within a poll interval.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter
+
+load_dotenv()
+
+PRISMA_DB = os.getenv("PRISMA_DB") or str(Path(__file__).resolve().parents[2] / "prisma" / "dev.db")
+PRISMA_CACHE_SIZE = int(os.getenv("PRISMA_CACHE_SIZE", "10000"))
+PRISMA_POLL_SECONDS = float(os.getenv("PRISMA_POLL_SECONDS", "1"))
+# Opt-in: switch the database to WAL once at startup so our reads never block
+# the app's writes. This rewrites the file's header and leaves -wal/-shm files
+# next to it, so it is left to the operator; the cache itself only reads.
+PRISMA_ENABLE_WAL = os.getenv("PRISMA_ENABLE_WAL", "false").lower() in ("1", "true", "yes")
+
+# Columns stored as JSON text by the Prisma schema, decoded on read
+JSON_COLUMNS = {
+    "Employee": ("skills", "currentProjects"),
+}
+
+log = get_logger("prisma")
+
+LOOKUPS = counter("prisma_cache_lookups_total", "Cached Prisma row lookups", ("table", "result"))
+INVALIDATIONS = counter("prisma_cache_invalidations_total", "Tables dropped from the cache after a write", ("table",))
+
+
+def connect_readonly(path: str = PRISMA_DB) -> sqlite3.Connection:
+    """A connection that cannot write, waiting briefly rather than failing if the app holds a lock"""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    db.execute("PRAGMA busy_timeout=2000")
+    db.execute("PRAGMA query_only=1")
+    return db
+
+
+def enable_wal(path: str = PRISMA_DB) -> bool:
+    """Put the database in WAL mode (persistent, and harmless to Prisma); False if it can't be"""
+    try:
+        db = sqlite3.connect(path, timeout=5)
+        try:
+            mode = db.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        log.warning("Could not enable WAL on %s: %s", path, e)
+        return False
+    return mode.lower() == "wal"
+
+
+def _decode(table: str, row: sqlite3.Row | None) -> dict | None:
+    if row is None:
+        return None
+    record = dict(row)
+    for column in JSON_COLUMNS.get(table, ()):
+        value = record.get(column)
+        if isinstance(value, str):
+            try:
+                record[column] = json.loads(value)
+            except ValueError:
+                pass
+    return record
+
+
+class PrismaCache:
+    """
+    LRU of decoded rows keyed by (table, lookup, value)
+
+    Misses are cached too (as None), so an unknown owner handle costs one
+    query per invalidation rather than one per event. Holds at most
+    `max_entries` rows; the least recently used are evicted first.
+    """
+
+    def __init__(self, path: str = PRISMA_DB, max_entries: int = PRISMA_CACHE_SIZE, poll_interval: float = PRISMA_POLL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.poll_interval = poll_interval
+        self._entries: OrderedDict[tuple, dict | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # data_version is per connection, so changes are always checked on this one
+        self._watch: sqlite3.Connection | None = None
+        self._generation = 0
+        self._checked = 0.0
+        self._data_version = None
+        self._watermarks: dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if PRISMA_ENABLE_WAL and os.path.exists(path):
+            enable_wal(path)
+
+    def _db(self) -> sqlite3.Connection:
+        """This thread's read-only connection"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = connect_readonly(self.path)
+            db.row_factory = sqlite3.Row
+        return db
+
+    def _watermark(self, db: sqlite3.Connection, table: str) -> tuple:
+        return tuple(db.execute(f'SELECT count(*), max(updatedAt) FROM "{table}"').fetchone())
+
+    def check(self) -> list[str]:
+        """Drop cached rows of tables written since the last check; returns their names"""
+        now = time.monotonic()
+        if now - self._checked < self.poll_interval:
+            return []
+        with self._lock:
+            if now - self._checked < self.poll_interval:
+                return []
+            self._checked = now
+            try:
+                if self._watch is None:
+                    self._watch = connect_readonly(self.path)
+                db = self._watch
+                version = db.execute("PRAGMA data_version").fetchone()[0]
+                if version == self._data_version:
+                    return []
+                marks = {table: self._watermark(db, table) for table in JSON_COLUMNS}
+                self._data_version = version
+            except sqlite3.Error as e:
+                log.warning("Could not check %s for changes: %s", self.path, e)
+                return []
+
+            changed = [table for table, mark in marks.items() if self._watermarks.get(table) != mark]
+            first = not self._watermarks
+            self._watermarks = marks
+            if first or not changed:
+                return []
+            for key in [key for key in self._entries if key[0] in changed]:
+                del self._entries[key]
+            self._generation += 1
+            for table in changed:
+                INVALIDATIONS.labels(table).inc()
+            self.invalidations += len(changed)
+            log.debug("Invalidated cached rows for %s", ", ".join(changed))
+            return changed
+
+    def lookup(self, table: str, column: str, value, query: str, params: tuple) -> dict | None:
+        """Cached row for `query`, stored under (table, column, value)"""
+        self.check()
+        key = (table, column, value)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                LOOKUPS.labels(table, "hit").inc()
+                return self._entries[key]
+            generation = self._generation
+
+        try:
+            row = _decode(table, self._db().execute(query, params).fetchone())
+        except sqlite3.Error as e:
+            log.warning("Lookup in %s failed: %s", table, e)
+            return None
+        with self._lock:
+            self.misses += 1
+            LOOKUPS.labels(table, "miss").inc()
+            if generation != self._generation:
+                # Invalidated while we were reading; the row may already be stale
+                return row
+            self._entries[key] = row
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return row
+
+    def get_employee(self, employee_id: str) -> dict | None:
+        return self.lookup("Employee", "id", employee_id, 'SELECT * FROM "Employee" WHERE id = ?', (employee_id,))
+
+    def find_employee(self, handle: str) -> dict | None:
+        """Employee by email, name or email local part, as targets name them, all case-insensitive"""
+        # The query sees only the lower-cased handle, so every spelling cached under it gets the same row
+        handle = handle.strip().lower()
+        return self.lookup(
+            "Employee", "handle", handle,
+            'SELECT * FROM "Employee" WHERE lower(email) = ?1 OR lower(name) = ?1 '
+            "OR lower(substr(email, 1, length(?1) + 1)) = ?1 || '@' "
+            "ORDER BY lower(email) = ?1 DESC LIMIT 1",
+            (handle,),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache: PrismaCache | None = None
+
+
+def get_cache() -> PrismaCache:
+    """Return the process-wide cache over PRISMA_DB"""
+    global _cache
+    if _cache is None:
+        _cache = PrismaCache()
+    return _cache
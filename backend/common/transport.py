@@ -0,0 +1,292 @@
+"""
+HTTP Transport
+Shared outbound HTTP layer: keep-alive pools per origin, retries with jitter and circuit breakers
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("TRANSPORT_POOL_SIZE", "20"))
+RETRIES = int(os.getenv("TRANSPORT_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("TRANSPORT_BACKOFF_BASE", "0.1"))
+BACKOFF_MAX = float(os.getenv("TRANSPORT_BACKOFF_MAX", "2.0"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Breakers kept per transport; the least recently used endpoint's is dropped beyond this
+BREAKER_MAX_ENDPOINTS = int(os.getenv("BREAKER_MAX_ENDPOINTS", "256"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+# Path segments that name a resource rather than an endpoint: numbers, UUIDs, hex ids, long tokens
+_ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{8,}|(?=.*\d)[\w-]{16,})$",
+    re.IGNORECASE,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint whose breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker
+
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a half-open trial that ended without an outcome (e.g. the caller was cancelled)"""
+        with self._lock:
+            if self.state == "half-open":
+                # The reset timeout has already passed, so the next call becomes the trial
+                self.state = "open"
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def endpoint_key(url: str) -> str:
+    """Origin plus path with id-like segments collapsed, so /api/meetings/42 and /api/meetings/43 share a breaker"""
+    parts = urlsplit(url)
+    path = "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    return f"{parts.scheme}://{parts.netloc}{path}"
+
+
+class _Endpoints:
+    """Breaker bookkeeping shared by the sync and async transports"""
+
+    def __init__(self, base_url: str, retries: int):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self._breakers: OrderedDict[str, CircuitBreaker] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def url(self, path_or_url: str) -> str:
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return f"{self.base_url}/{path_or_url.lstrip('/')}"
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Breaker for an endpoint (see endpoint_key()), query string ignored"""
+        endpoint = endpoint_key(url)
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker()
+                if len(self._breakers) > BREAKER_MAX_ENDPOINTS:
+                    self._breakers.popitem(last=False)
+            else:
+                self._breakers.move_to_end(endpoint)
+            return breaker
+
+    def attempts(self, method: str, idempotent: bool | None) -> int:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return 1 + (self.retries if idempotent else 0)
+
+
+class Transport(_Endpoints):
+    """Blocking client for one origin backed by a keep-alive requests.Session"""
+
+    def __init__(self, base_url: str, pool_size: int = POOL_SIZE, retries: int = RETRIES):
+        super().__init__(base_url, retries)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, path_or_url: str, idempotent: bool | None = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the endpoint's circuit breaker
+
+        Args:
+            method: HTTP method
+            path_or_url: Path relative to the base URL, or an absolute URL on the same origin
+            idempotent: Whether the call may be retried (defaults to True for GET/PUT/DELETE/...)
+            **kwargs: Passed through to requests (json, headers, timeout, ...)
+
+        Returns:
+            The final response; raise_for_status() is left to the caller
+
+        Raises:
+            CircuitOpenError: If the endpoint's breaker is open
+        """
+        url = self.url(path_or_url)
+        breaker = self.breaker(url)
+        attempts = self.attempts(method, idempotent)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {method} {url}")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except Exception:
+                # Anything else from the call (a broken body, a bad response) is the
+                # endpoint's failure and must settle a half-open trial
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # The caller gave up (cancellation, interrupt): not the endpoint's fault,
+                # but a half-open trial must be handed back or no call is let through again
+                breaker.release()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                    return response
+                response.close()
+            time.sleep(backoff_delay(attempt))
+
+    def get(self, path_or_url: str, **kwargs) -> requests.Response:
+        return self.request("GET", path_or_url, **kwargs)
+
+    def post(self, path_or_url: str, **kwargs) -> requests.Response:
+        return self.request("POST", path_or_url, **kwargs)
+
+    def delete(self, path_or_url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path_or_url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncTransport(_Endpoints):
+    """Async client for one origin backed by a pooled httpx.AsyncClient"""
+
+    def __init__(self, base_url: str, pool_size: int = POOL_SIZE, retries: int = RETRIES):
+        super().__init__(base_url, retries)
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.AsyncClient(limits=limits)
+
+    async def request(self, method: str, path_or_url: str, idempotent: bool | None = None, **kwargs) -> httpx.Response:
+        """Async counterpart of Transport.request()"""
+        url = self.url(path_or_url)
+        breaker = self.breaker(url)
+        attempts = self.attempts(method, idempotent)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {method} {url}")
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: see Transport.request()
+                breaker.release()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                    return response
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def get(self, path_or_url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path_or_url, **kwargs)
+
+    async def post(self, path_or_url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path_or_url, **kwargs)
+
+    async def delete(self, path_or_url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", path_or_url, **kwargs)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_transports: dict[str, Transport] = {}
+_async_transports: dict[str, AsyncTransport] = {}
+_registry_lock = threading.Lock()
+
+
+def get_transport(url: str, **kwargs) -> Transport:
+    """Return the process-wide sync transport for a URL's origin, creating it on first use"""
+    origin = _origin(url)
+    with _registry_lock:
+        if origin not in _transports:
+            _transports[origin] = Transport(origin, **kwargs)
+        return _transports[origin]
+
+
+def get_async_transport(url: str, **kwargs) -> AsyncTransport:
+    """Return the process-wide async transport for a URL's origin, creating it on first use"""
+    origin = _origin(url)
+    with _registry_lock:
+        if origin not in _async_transports:
+            _async_transports[origin] = AsyncTransport(origin, **kwargs)
+        return _async_transports[origin]
+
+
+async def close_async_transports() -> None:
+    """Close every async transport (call on app shutdown)"""
+    with _registry_lock:
+        transports = list(_async_transports.values())
+        _async_transports.clear()
+    for transport in transports:
+        await transport.close()
@@ -0,0 +1,170 @@
+"""
+Record Codecs
+Key/value encoding shared by every producer and consumer of the Redpanda topics
+
+Two wire formats are in use:
+
+    json     Pandaproxy's JSON embedded format; values are stored as JSON text
+    binary   Pandaproxy's binary embedded format carrying schema-encoded values
+
+A binary value is a three-byte header (a NUL byte, the codec, the schema id
+from backend.events.schema) followed by [present-field bitmask, values in
+schema order..., {unlisted fields}] packed with MessagePack, or as compact
+JSON when msgpack is not installed. JSON text never starts with a NUL byte,
+so a reader tells the two apart per record and both can share a topic while
+producers migrate. Consumers therefore always fetch in the binary format,
+which returns the stored bytes untouched whichever way they were produced.
+
+Keys are JSON-encoded in both formats, so a project's records keep hashing
+to the same partition when a producer switches.
+
+EVENT_ENCODING picks what producers write. Switch it to binary once every
+consumer reading the topics runs this codec.
+"""
+import base64
+import json
+import os
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter
+from backend.events.schema import UnknownSchema, schema_by_id, schema_for_topic
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; values are then packed as compact JSON arrays
+    msgpack = None
+
+try:
+    import orjson
+
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=str)
+
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib gives the same bytes, slower
+    def dumps(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+    loads = json.loads
+
+load_dotenv()
+
+EVENT_ENCODING = os.getenv("EVENT_ENCODING", "json").lower()
+
+JSON_RECORDS = "application/vnd.kafka.json.v2+json"
+BINARY_RECORDS = "application/vnd.kafka.binary.v2+json"
+# Format for consumer instances: raw bytes, decoded here, so JSON and binary records both read back
+CONSUMER_FORMAT = "binary"
+
+MAGIC = 0
+CODEC_MSGPACK = 1
+CODEC_JSON = 2
+
+log = get_logger("events.codec")
+
+DECODE_ERRORS = counter("event_decode_errors_total", "Fetched records whose value could not be decoded", ("topic",))
+
+
+class CodecError(ValueError):
+    """Raised for a binary value this process cannot decode"""
+
+
+def _pack(body: list) -> tuple[int, bytes]:
+    if msgpack is not None:
+        return CODEC_MSGPACK, msgpack.packb(body, use_bin_type=True, default=str)
+    return CODEC_JSON, dumps(body)
+
+
+def _unpack(codec: int, data: bytes) -> list:
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise CodecError("Record is MessagePack-encoded but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if codec == CODEC_JSON:
+        return loads(data)
+    raise CodecError(f"Unknown codec {codec}")
+
+
+def encode_value(topic: str, value) -> bytes:
+    """Binary value for a record on `topic`; JSON text for topics without a schema or non-dict values"""
+    schema = schema_for_topic(topic)
+    if schema is None or not isinstance(value, dict):
+        return dumps(value)
+    mask, listed, unlisted = schema.layout(tuple(value))
+    body = [mask]
+    body.extend([value[field] for field in listed])
+    if unlisted:
+        body.append({key: value[key] for key in unlisted})
+    codec, data = _pack(body)
+    return bytes((MAGIC, codec, schema.schema_id)) + data
+
+
+def decode_value(data: bytes | None):
+    """A stored value, binary or JSON, back as the object that was produced"""
+    if not data:
+        return None
+    if data[0] != MAGIC:
+        return loads(data)
+    if len(data) < 3:
+        raise CodecError("Truncated record header")
+    try:
+        schema = schema_by_id(data[2])
+    except UnknownSchema as e:
+        raise CodecError(str(e)) from None
+    body = _unpack(data[1], data[3:])
+    fields = schema.present(body[0])
+    value = dict(zip(fields, body[1:]))
+    if len(body) > len(fields) + 1:
+        value.update(body[-1])
+    return value
+
+
+def encode_key(key) -> bytes | None:
+    return None if key is None else dumps(key)
+
+
+def decode_key(data: bytes | None):
+    if data is None:
+        return None
+    try:
+        return loads(data)
+    except ValueError:
+        # Written by a client that does not JSON-encode its keys
+        return data.decode("utf-8", "replace")
+
+
+def produce_request(topic: str, records: list[dict], encoding: str = EVENT_ENCODING) -> tuple[str, bytes]:
+    """Content type and body of a Pandaproxy produce request for {"key", "value"} records"""
+    if encoding != "binary":
+        return JSON_RECORDS, dumps({"records": records})
+    entries = []
+    for record in records:
+        key = encode_key(record.get("key"))
+        entries.append({
+            "key": None if key is None else base64.b64encode(key).decode(),
+            "value": base64.b64encode(encode_value(topic, record.get("value"))).decode(),
+        })
+    return BINARY_RECORDS, dumps({"records": entries})
+
+
+def decode_records(records: list[dict]) -> list[dict]:
+    """
+    Decode the base64 keys and values of records fetched in the binary format, in place
+
+    A value that cannot be decoded is logged and replaced by None, which
+    consumers already skip, rather than wedging its partition.
+    """
+    for record in records:
+        key = record.get("key")
+        value = record.get("value")
+        record["key"] = None if key is None else decode_key(base64.b64decode(key))
+        try:
+            record["value"] = None if value is None else decode_value(base64.b64decode(value))
+        except (ValueError, TypeError, IndexError) as e:
+            DECODE_ERRORS.labels(record.get("topic", "")).inc()
+            log.error(
+                "Could not decode %s/%s@%s: %s", record.get("topic"), record.get("partition"), record.get("offset"), e
+            )
+            record["value"] = None
+    return records
@@ -0,0 +1,118 @@
+"""
+Consumer Group Client
+Pandaproxy consumer-group instance: create, subscribe, poll, commit and delete
+"""
+import os
+import requests
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.transport import get_transport
+from backend.events.codec import BINARY_RECORDS, CONSUMER_FORMAT, decode_records
+
+load_dotenv()
+
+PANDA = os.getenv("PANDA_PROXY", "http://localhost:8082")
+
+V2_CONTENT_TYPE = "application/vnd.kafka.v2+json"
+
+log = get_logger("events.group")
+
+
+class GroupConsumer:
+    """
+    One consumer instance in a Pandaproxy consumer group
+
+    Offsets are never auto-committed; call commit() with the positions that
+    are safe to resume from. `offset_reset` ("earliest"/"latest") sets where
+    a group without committed offsets starts; the proxy's default otherwise.
+    """
+
+    def __init__(
+        self, group: str, instance: str, topics: list[str], base_url: str = PANDA, offset_reset: str | None = None
+    ):
+        self.group = group
+        self.instance = instance
+        self.topics = topics
+        self.base_url = base_url.rstrip("/")
+        self.offset_reset = offset_reset
+        self.base: str | None = None
+
+    def _create(self) -> str:
+        config = {"name": self.instance, "format": CONSUMER_FORMAT, "auto.commit.enable": "false"}
+        if self.offset_reset:
+            config["auto.offset.reset"] = self.offset_reset
+        r = get_transport(self.base_url).post(
+            f"{self.base_url}/consumers/{self.group}",
+            json=config,
+            headers={"Content-Type": V2_CONTENT_TYPE},
+            timeout=10,
+        )
+        r.raise_for_status()
+        return r.json()["base_uri"]
+
+    def open(self) -> str:
+        """Create the instance (replacing a stale one) and subscribe; returns its base URI"""
+        try:
+            base = self._create()
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code != 409:
+                raise
+            log.info("Consumer instance '%s' already exists, replacing it", self.instance)
+            self.base = f"{self.base_url}/consumers/{self.group}/instances/{self.instance}"
+            self.close()
+            base = self._create()
+
+        r = get_transport(base).post(
+            f"{base}/subscription",
+            json={"topics": self.topics},
+            headers={"Content-Type": V2_CONTENT_TYPE},
+            timeout=10,
+            idempotent=True,
+        )
+        r.raise_for_status()
+        self.base = base
+        log.info("Group '%s' instance '%s' subscribed to %s", self.group, self.instance, self.topics)
+        return base
+
+    def poll(self, timeout_ms: int = 500) -> list[dict]:
+        """Fetch the next records, keys and values decoded; [] when there are none or the poll failed"""
+        try:
+            r = get_transport(self.base).get(
+                f"{self.base}/records?timeout={timeout_ms}", headers={"Accept": BINARY_RECORDS}, timeout=10
+            )
+            if r.status_code == 204:
+                return []
+            r.raise_for_status()
+            return decode_records(r.json())
+        except Exception as e:
+            log.warning("Error polling group '%s': %s", self.group, e)
+            return []
+
+    def commit(self, offsets: list[dict]) -> bool:
+        """Commit [{"topic", "partition", "offset"}] positions (next offset to read)"""
+        if not offsets:
+            return True
+        try:
+            r = get_transport(self.base).post(
+                f"{self.base}/offsets",
+                json={"partitions": offsets},
+                headers={"Content-Type": V2_CONTENT_TYPE},
+                timeout=10,
+                idempotent=True,
+            )
+            r.raise_for_status()
+            return True
+        except Exception as e:
+            log.warning("Error committing offsets for group '%s': %s", self.group, e)
+            return False
+
+    def close(self) -> None:
+        """Delete the instance so its partitions are reassigned right away"""
+        if not self.base:
+            return
+        try:
+            get_transport(self.base).delete(self.base, headers={"Content-Type": V2_CONTENT_TYPE}, timeout=10)
+        except Exception as e:
+            log.warning("Error deleting consumer instance %s: %s", self.base, e)
+        self.base = None
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Latency Report CLI
+Per-stage latency percentiles from the trace stamps on the outcomes topic
+
+    python3 backend/events/latency.py                                # outcomes from now on, Ctrl+C to report
+    python3 backend/events/latency.py --from-beginning --idle 5      # everything on the topic
+    python3 backend/events/latency.py --seconds 60 --max 50000
+
+Reads through a throwaway consumer group that never commits and is deleted
+on exit, so it does not disturb the risk service. Each row is the time
+between two consecutive stages (see backend.events.trace), in milliseconds;
+the last one is the whole trip from the first stamped stage.
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.events.group import PANDA, GroupConsumer
+from backend.events.trace import STAGES, TRACE_FIELD, hops
+
+load_dotenv()
+
+TOPIC = "outcomes"
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(ordered: list[int], q: float) -> int:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def collect(consumer: GroupConsumer, seconds: float, idle: float, limit: int) -> tuple[dict[str, list[int]], int, int]:
+    """
+    Poll outcomes until `seconds` pass, nothing arrives for `idle` seconds, `limit` are read, or Ctrl+C
+
+    Returns:
+        ({hop: [ms, ...]}, outcomes read, outcomes without a trace)
+    """
+    samples: dict[str, list[int]] = {}
+    read = untraced = 0
+    started = last_record = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if (seconds and now - started >= seconds) or (idle and now - last_record >= idle) or (limit and read >= limit):
+                break
+            records = consumer.poll(timeout_ms=500)
+            if records:
+                last_record = time.monotonic()
+            for record in records:
+                outcome = record.get("value")
+                if not isinstance(outcome, dict):
+                    continue
+                read += 1
+                trace = outcome.get(TRACE_FIELD)
+                if not isinstance(trace, dict):
+                    untraced += 1
+                    continue
+                for hop, ms in hops(trace):
+                    samples.setdefault(hop, []).append(ms)
+    except KeyboardInterrupt:
+        pass
+    return samples, read, untraced
+
+
+def hop_order(hop: str) -> tuple:
+    """Rows in pipeline order, totals last"""
+    first = hop.split(" → ")[0]
+    return ("(total)" in hop, STAGES.index(first) if first in STAGES else len(STAGES), hop)
+
+
+def print_report(samples: dict[str, list[int]], read: int, untraced: int) -> None:
+    print(f"\n{read:,} outcomes read from '{TOPIC}'" + (f" ({untraced:,} without a trace)" if untraced else ""))
+    if not samples:
+        print("No traced outcomes; nothing to report")
+        return
+    width = max(len(hop) for hop in samples) + 2
+    header = "".join(f"{f'p{q * 100:g}':>9}" for q in PERCENTILES)
+    print(f"\n{'Hop (ms)':<{width}}{'count':>9}{header}{'max':>9}")
+    for hop in sorted(samples, key=hop_order):
+        ordered = sorted(samples[hop])
+        values = "".join(f"{percentile(ordered, q):>9,}" for q in PERCENTILES)
+        print(f"{hop:<{width}}{len(ordered):>9,}{values}{ordered[-1]:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-stage latency from traced outcomes")
+    parser.add_argument("--from-beginning", action="store_true", help="Read the whole topic, not just new outcomes")
+    parser.add_argument("--seconds", type=float, default=0.0, help="Stop after this long (0 = no limit)")
+    parser.add_argument("--idle", type=float, default=0.0, help="Stop once nothing arrives for this long (0 = never)")
+    parser.add_argument("--max", type=int, default=0, help="Stop after this many outcomes (0 = no limit)")
+    args = parser.parse_args()
+
+    group = f"latency-{socket.gethostname()}-{os.getpid()}"
+    consumer = GroupConsumer(
+        group, "report", [TOPIC], offset_reset="earliest" if args.from_beginning else "latest"
+    )
+    consumer.open()
+    print(f"Reading '{TOPIC}' from {PANDA}{' (from the beginning)' if args.from_beginning else ''}; Ctrl+C to report")
+    try:
+        samples, read, untraced = collect(consumer, args.seconds, args.idle, args.max)
+    finally:
+        consumer.close()
+    print_report(samples, read, untraced)
+
+
+if __name__ == "__main__":
+    main()
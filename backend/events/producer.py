@@ -0,0 +1,179 @@
+"""
+Redpanda Producer
+Async, batching Pandaproxy producer shared by the webhook receivers and the agent
+"""
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import SIZE_BUCKETS, counter, histogram
+from backend.common.transport import get_async_transport
+from backend.events.codec import EVENT_ENCODING, produce_request
+
+load_dotenv()
+
+PANDA = os.getenv("PANDA_PROXY", "http://localhost:8082")
+LINGER_MS = float(os.getenv("PRODUCER_LINGER_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("PRODUCER_MAX_BATCH", "500"))
+MAX_CONNECTIONS = int(os.getenv("PRODUCER_MAX_CONNECTIONS", "20"))
+
+log = get_logger("producer")
+
+PRODUCE_SECONDS = histogram("producer_request_seconds", "Pandaproxy produce request latency", ("topic",))
+BATCH_RECORDS = histogram("producer_batch_records", "Records per produce request", ("topic",), buckets=SIZE_BUCKETS)
+PRODUCE_ERRORS = counter("producer_errors_total", "Failed produce requests", ("topic",))
+
+
+class ProduceError(Exception):
+    """Raised when Pandaproxy fails to accept a record"""
+
+
+class Producer:
+    """
+    Buffers records per topic and flushes them as multi-record Pandaproxy requests
+
+    A topic buffer is flushed when it reaches max_batch_size records or when
+    linger_ms has passed since its first record, whichever comes first.
+    Records are written in `encoding` (see backend.events.codec).
+    """
+
+    def __init__(
+        self,
+        base_url: str = PANDA,
+        linger_ms: float = LINGER_MS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: float = 5.0,
+        encoding: str = EVENT_ENCODING,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.linger_ms = linger_ms
+        self.max_batch_size = max_batch_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.encoding = encoding
+        self._buffers: dict[str, list[tuple[dict, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._inflight: set[asyncio.Task] = set()
+
+    def send(self, topic: str, key: str, value: dict) -> asyncio.Future:
+        """
+        Buffer a record for delivery
+
+        Returns:
+            Future resolved with the record's partition/offset once its batch is
+            acknowledged, or failed with ProduceError
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        buffer = self._buffers.setdefault(topic, [])
+        buffer.append(({"key": key, "value": value}, future))
+
+        if len(buffer) >= self.max_batch_size:
+            self._flush_topic(topic)
+        elif topic not in self._timers:
+            self._timers[topic] = loop.call_later(self.linger_ms / 1000, self._flush_topic, topic)
+        return future
+
+    async def produce(self, topic: str, key: str, value: dict) -> dict:
+        """Buffer a record and wait until Pandaproxy has acknowledged it"""
+        return await self.send(topic, key, value)
+
+    def send_nowait(self, topic: str, key: str, value: dict) -> None:
+        """Fire-and-forget: buffer a record and only log delivery failures"""
+        future = self.send(topic, key, value)
+        future.add_done_callback(_log_failure)
+
+    def send_many(self, topic: str, records: list[tuple[str, dict]]) -> list[asyncio.Future]:
+        """
+        Buffer several (key, value) records and flush the topic right away
+
+        The records go out in as few requests as max_batch_size allows,
+        without waiting for linger_ms.
+        """
+        futures = [self.send(topic, key, value) for key, value in records]
+        self._flush_topic(topic)
+        return futures
+
+    def send_many_nowait(self, topic: str, records: list[tuple[str, dict]]) -> None:
+        """Fire-and-forget variant of send_many()"""
+        for future in self.send_many(topic, records):
+            future.add_done_callback(_log_failure)
+
+    def _flush_topic(self, topic: str) -> None:
+        timer = self._timers.pop(topic, None)
+        if timer:
+            timer.cancel()
+        batch = self._buffers.pop(topic, None)
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._deliver(topic, batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, topic: str, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        content_type, body = produce_request(topic, [record for record, _ in batch], self.encoding)
+        headers = {"Content-Type": content_type}
+        BATCH_RECORDS.labels(topic).observe(len(batch))
+        started = time.perf_counter()
+        try:
+            transport = get_async_transport(self.base_url, pool_size=self.max_connections)
+            r = await transport.post(
+                f"{self.base_url}/topics/{topic}", content=body, headers=headers, timeout=self.timeout
+            )
+            r.raise_for_status()
+            offsets = r.json().get("offsets", [])
+        except Exception as e:
+            PRODUCE_ERRORS.labels(topic).inc()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ProduceError(f"Produce to '{topic}' failed: {e}"))
+            return
+        finally:
+            PRODUCE_SECONDS.labels(topic).observe(time.perf_counter() - started)
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = offsets[i] if i < len(offsets) else {}
+            if result.get("error_code"):
+                future.set_exception(ProduceError(f"Produce to '{topic}' failed: {result}"))
+            else:
+                future.set_result(result)
+
+    async def flush(self) -> None:
+        """Send every buffered record and wait for all in-flight batches"""
+        for topic in list(self._buffers):
+            self._flush_topic(topic)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Flush outstanding records (pooled connections belong to the shared transport)"""
+        await self.flush()
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception():
+        log.error("Error producing to Redpanda: %s", future.exception())
+
+
+_producer: Producer | None = None
+
+
+def get_producer() -> Producer:
+    """Return the process-wide producer, creating it on first use"""
+    global _producer
+    if _producer is None:
+        _producer = Producer()
+    return _producer
+
+
+async def close_producer() -> None:
+    """Flush and close the process-wide producer (call on app shutdown)"""
+    global _producer
+    if _producer is not None:
+        await _producer.close()
+        _producer = None
@@ -2,25 +2,45 @@
 """
 Event Publisher CLI
 Publish sample events to Redpanda topics for testing
+
+Single event:
+    python3 backend/events/publish.py --topic issues --file event.json
+
+Bulk replay (streamed, batched, concurrent):
+    python3 backend/events/publish.py --topic issues --ndjson capture.ndjson --key-field project_id
+    python3 backend/events/publish.py --topic issues --dir captures/ --rate 2000
+    zcat capture.ndjson.gz | python3 backend/events/publish.py --topic issues --ndjson -
 """
 import argparse
+import asyncio
 import json
 import os
 import sys
-import requests
+import time
+from pathlib import Path
+from typing import Iterator
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.transport import close_async_transports, get_transport
+from backend.events.codec import produce_request
+from backend.events.producer import Producer
+
 load_dotenv()
 
 PANDA = os.getenv("PANDA_PROXY", "http://localhost:8082")
+DEFAULT_KEY = "alpha"
 
 
 def publish_event(topic: str, key: str, value: dict) -> None:
     """Publish an event to Redpanda via Pandaproxy"""
-    payload = {"records": [{"key": key, "value": value}]}
-    headers = {"Content-Type": "application/vnd.kafka.json.v2+json"}
+    content_type, body = produce_request(topic, [{"key": key, "value": value}])
+    headers = {"Content-Type": content_type}
     try:
-        r = requests.post(f"{PANDA}/topics/{topic}", json=payload, headers=headers, timeout=5)
+        r = get_transport(PANDA).post(f"{PANDA}/topics/{topic}", data=body, headers=headers, timeout=5)
         r.raise_for_status()
         print(f"✓ Published to '{topic}' with key '{key}'")
         print(f"  Event ID: {value.get('event_id', 'N/A')}")
@@ -29,15 +49,169 @@ def publish_event(topic: str, key: str, value: dict) -> None:
         sys.exit(1)
 
 
+def iter_ndjson(path: str) -> Iterator[dict | None]:
+    """Yield one event per line of an NDJSON file ('-' for stdin); None for unparseable lines"""
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_json_dir(path: str) -> Iterator[dict | None]:
+    """Yield the events in every *.json file of a directory (a file may hold one event or a list)"""
+    for file in sorted(Path(path).glob("*.json")):
+        try:
+            with open(file, "r") as f:
+                data = json.load(f)
+        except ValueError:
+            yield None
+            continue
+        if isinstance(data, list):
+            yield from data
+        else:
+            yield data
+
+
+def extract_key(event: dict, field_path: str) -> str | None:
+    """Look up a dotted field path (e.g. 'issue.fields.project.key') in an event"""
+    value = event
+    for part in field_path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return None if value is None else str(value)
+
+
+async def publish_stream(
+    topic: str,
+    events: Iterator[dict | None],
+    key: str | None = None,
+    key_field: str = "project_id",
+    batch_size: int = 500,
+    concurrency: int = 8,
+    rate: float = 0.0,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Publish a stream of events as multi-record requests over concurrent connections
+
+    At most `concurrency` batches are in flight; reading pauses until one
+    completes, so memory stays bounded by concurrency * batch_size records.
+    With `rate` (events per second) batches are paced against a schedule,
+    and kept small enough that the stream does not arrive in bursts.
+
+    Returns:
+        Summary with sent/failed/invalid counts, elapsed seconds and events/s
+    """
+    if rate > 0:
+        batch_size = max(1, min(batch_size, int(rate / 10)))
+    producer = Producer(max_batch_size=batch_size, max_connections=concurrency, timeout=timeout)
+    pending: set[asyncio.Task] = set()
+    summary = {"sent": 0, "failed": 0, "invalid": 0}
+    errors: dict[str, int] = {}
+    submitted = 0
+    started = time.monotonic()
+
+    async def deliver(futures: list[asyncio.Future]) -> None:
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception):
+                summary["failed"] += 1
+                errors[str(result)] = errors.get(str(result), 0) + 1
+            else:
+                summary["sent"] += 1
+
+    async def submit(batch: list[tuple[str, dict]]) -> None:
+        nonlocal submitted
+        while len(pending) >= concurrency:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        submitted += len(batch)
+        if rate > 0:
+            delay = started + submitted / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        task = asyncio.create_task(deliver(producer.send_many(topic, batch)))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    batch: list[tuple[str, dict]] = []
+    for event in events:
+        if not isinstance(event, dict):
+            summary["invalid"] += 1
+            continue
+        batch.append((key or extract_key(event, key_field) or DEFAULT_KEY, event))
+        if len(batch) >= batch_size:
+            await submit(batch)
+            batch = []
+    if batch:
+        await submit(batch)
+    if pending:
+        await asyncio.wait(pending)
+    await close_async_transports()
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["events_per_s"] = round(summary["sent"] / elapsed, 1) if elapsed else 0.0
+    summary["errors"] = errors
+    return summary
+
+
+def bulk_main(args) -> None:
+    """Stream --ndjson / --dir input to a topic and print a summary"""
+    events = iter_ndjson(args.ndjson) if args.ndjson else iter_json_dir(args.dir)
+    print(f"\nReplaying {args.ndjson or args.dir} to '{args.topic}' via {PANDA}")
+    rate = f"{args.rate:g}/s" if args.rate else "unlimited"
+    print(f"  Batch: {args.batch_size}  Connections: {args.concurrency}  Rate: {rate}")
+
+    summary = asyncio.run(publish_stream(
+        args.topic,
+        events,
+        key=args.key,
+        key_field=args.key_field,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        rate=args.rate,
+    ))
+
+    print(f"\n{'✓' if not summary['failed'] else '✗'} Sent {summary['sent']:,} events "
+          f"in {summary['elapsed_s']:.1f}s ({summary['events_per_s']:,.0f} events/s)")
+    if summary["invalid"]:
+        print(f"  Skipped {summary['invalid']:,} unparseable records")
+    if summary["failed"]:
+        print(f"  Failed: {summary['failed']:,}")
+        for error, count in sorted(summary["errors"].items(), key=lambda item: -item[1])[:5]:
+            print(f"    {count:,} × {error}")
+        sys.exit(1)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Publish events to Redpanda")
     parser.add_argument("--topic", required=True, help="Topic to publish to (issues, builds, vendors)")
     parser.add_argument("--file", help="JSON file containing event data")
     parser.add_argument("--key", help="Partition key (defaults to project_id from event)")
     parser.add_argument("--inline", help="Inline JSON event data")
+    bulk = parser.add_argument_group("bulk replay")
+    bulk.add_argument("--ndjson", help="NDJSON file with one event per line ('-' for stdin)")
+    bulk.add_argument("--dir", help="Directory of *.json event files")
+    bulk.add_argument("--key-field", default="project_id", help="Dotted field path used as the partition key")
+    bulk.add_argument("--batch-size", type=int, default=500, help="Records per Pandaproxy request")
+    bulk.add_argument("--concurrency", type=int, default=8, help="Concurrent requests/connections")
+    bulk.add_argument("--rate", type=float, default=0.0, help="Target events per second (0 = as fast as possible)")
 
     args = parser.parse_args()
 
+    if args.ndjson or args.dir:
+        bulk_main(args)
+        return
+
     # Load event data
     if args.file:
         with open(args.file, "r") as f:
@@ -45,11 +219,11 @@ def main():
     elif args.inline:
         event = json.loads(args.inline)
     else:
-        print("Error: Must provide --file or --inline")
+        print("Error: Must provide --file, --inline, --ndjson or --dir")
         sys.exit(1)
 
     # Determine partition key
-    key = args.key or event.get("project_id", "alpha")
+    key = args.key or event.get("project_id", DEFAULT_KEY)
 
     print(f"\nPublishing to Redpanda:")
     print(f"  Proxy: {PANDA}")
@@ -0,0 +1,116 @@
+"""
+Event Schemas
+Versioned field lists for the records carried on each topic
+
+A schema names the fields a record usually has, in a fixed order, so the
+binary encoding can send values by position instead of repeating every
+field name in every record. Fields a record lacks cost one bit; fields a
+schema does not list still travel, by name, so producers can add fields
+before the schema catches up.
+
+Schemas are append-only: a changed field list is a new schema with a new
+id and a higher version, and the old id stays registered so records
+already on the topics remain readable. Ids are one byte and never reused.
+"""
+# Distinct record shapes remembered per schema before the cache starts over
+LAYOUT_CACHE_SIZE = 1024
+
+
+class Schema:
+    """A record type's field order at one version"""
+
+    def __init__(self, schema_id: int, name: str, version: int, fields: tuple[str, ...]):
+        if not 0 < schema_id < 256:
+            raise ValueError(f"Schema id {schema_id} does not fit in a byte")
+        self.schema_id = schema_id
+        self.name = name
+        self.version = version
+        self.fields = fields
+        self.index = {field: i for i, field in enumerate(fields)}
+        self._layouts: dict[tuple, tuple[int, tuple, tuple]] = {}
+        self._present: dict[int, tuple] = {}
+
+    def layout(self, keys: tuple) -> tuple[int, tuple, tuple]:
+        """
+        How a record with these keys (in its own order) is laid out
+
+        Returns:
+            (bitmask of listed fields present, those fields in schema order, unlisted keys)
+        """
+        layout = self._layouts.get(keys)
+        if layout is None:
+            listed = tuple(sorted((key for key in keys if key in self.index), key=self.index.get))
+            mask = 0
+            for field in listed:
+                mask |= 1 << self.index[field]
+            layout = (mask, listed, tuple(key for key in keys if key not in self.index))
+            if len(self._layouts) >= LAYOUT_CACHE_SIZE:
+                self._layouts.clear()
+            self._layouts[keys] = layout
+        return layout
+
+    def present(self, mask: int) -> tuple:
+        """Fields a bitmask marks present, in schema order"""
+        fields = self._present.get(mask)
+        if fields is None:
+            fields = tuple(field for i, field in enumerate(self.fields) if mask >> i & 1)
+            if len(self._present) >= LAYOUT_CACHE_SIZE:
+                self._present.clear()
+            self._present[mask] = fields
+        return fields
+
+    def __repr__(self) -> str:
+        return f"Schema({self.name} v{self.version}, id={self.schema_id})"
+
+
+# Normalized tracker events (webhooks -> issues/builds/vendors -> gateway -> agent)
+EVENT_V1 = Schema(1, "event", 1, (
+    "event_id", "project_id", "source", "type", "repo", "issue_number", "issue_key", "title", "url",
+    "labels", "assignee", "author", "priority", "status", "issue_type", "state", "created_at",
+    "updated_at", "due_at", "body_preview",
+))
+# + coalesced update count and stage timestamps (backend.events.trace)
+EVENT_V2 = Schema(5, "event", 2, EVENT_V1.fields + ("coalesced", "trace"))
+
+# Decisions the agent records on 'actions'
+ACTION_V1 = Schema(2, "action", 1, ("event_id", "project_id", "action", "target", "rationale", "source_ref"))
+# + the event that caused the action
+ACTION_V2 = Schema(6, "action", 2, ACTION_V1.fields + ("source_event_id",))
+
+# Results of executed actions on 'outcomes'
+OUTCOME_V1 = Schema(3, "outcome", 1, ("event_id", "project_id", "action", "risk_delta", "ack", "ts"))
+# + the event that caused the action and its stage timestamps
+OUTCOME_V2 = Schema(7, "outcome", 2, OUTCOME_V1.fields + ("source_event_id", "trace"))
+
+# Events the gateway gave up on; original_event keeps its own field names
+DLQ_V1 = Schema(4, "dlq", 1, ("original_event", "error", "timestamp"))
+
+SCHEMAS: dict[int, Schema] = {
+    schema.schema_id: schema
+    for schema in (EVENT_V1, ACTION_V1, OUTCOME_V1, DLQ_V1, EVENT_V2, ACTION_V2, OUTCOME_V2)
+}
+
+# The schema each topic is written with; topics not listed are written as plain JSON
+TOPIC_SCHEMAS: dict[str, Schema] = {
+    "issues": EVENT_V2,
+    "builds": EVENT_V2,
+    "vendors": EVENT_V2,
+    "actions": ACTION_V2,
+    "outcomes": OUTCOME_V2,
+    "dlq": DLQ_V1,
+}
+
+
+class UnknownSchema(Exception):
+    """Raised when a record names a schema id this build does not know"""
+
+
+def schema_for_topic(topic: str) -> Schema | None:
+    return TOPIC_SCHEMAS.get(topic)
+
+
+def schema_by_id(schema_id: int) -> Schema:
+    schema = SCHEMAS.get(schema_id)
+    if schema is None:
+        raise UnknownSchema(f"Unknown schema id {schema_id}")
+    return schema
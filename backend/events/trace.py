@@ -0,0 +1,50 @@
+"""
+Event Tracing
+Stage timestamps carried on each event and copied onto its outcome
+
+Every hop stamps the record's `trace` field with the wall-clock time, in
+integer milliseconds, at which it handled the event:
+
+    received     webhook receiver got the delivery
+    published    handed to the producer (or the spool)
+    polled       gateway poll returned it
+    dispatched   gateway sent it to the agent
+    decided      agent's policy decision made
+    acted        agent's action finished
+    reported     outcome handed to the producer
+
+Stamps are wall-clock so they compare across processes and hosts; a hop
+between two hosts includes their clock skew. Events produced before tracing
+existed simply start their trace at the gateway.
+"""
+import time
+
+TRACE_FIELD = "trace"
+STAGES = ("received", "published", "polled", "dispatched", "decided", "acted", "reported")
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def stamp(record: dict, stage: str, at_ms: int | None = None) -> dict:
+    """Record when `stage` handled `record` (now, unless `at_ms` is given)"""
+    trace = record.get(TRACE_FIELD)
+    if not isinstance(trace, dict):
+        trace = record[TRACE_FIELD] = {}
+    trace[stage] = now_ms() if at_ms is None else at_ms
+    return record
+
+
+def hops(trace: dict) -> list[tuple[str, int]]:
+    """
+    Time spent between consecutive stamped stages, plus the end-to-end total
+
+    Returns:
+        [("received → published", ms), ..., ("received → reported (total)", ms)]
+    """
+    present = [stage for stage in STAGES if isinstance(trace.get(stage), int)]
+    result = [(f"{a} → {b}", trace[b] - trace[a]) for a, b in zip(present, present[1:])]
+    if len(present) > 2:
+        result.append((f"{present[0]} → {present[-1]} (total)", trace[present[-1]] - trace[present[0]]))
+    return result
@@ -3,65 +3,84 @@ Gateway Consumer
 Subscribes to Redpanda topics and forwards events to AgentKit for processing
 """
 import os
+import signal
+import sys
+import threading
 import time
-import requests
-import json
+from pathlib import Path
+from typing import Callable
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.log import get_logger
+from backend.common.metrics import SIZE_BUCKETS, counter, gauge, histogram, start_metrics_server
+from backend.common.transport import backoff_delay, get_transport
+from backend.events.codec import produce_request
+from backend.events.group import GroupConsumer
+from backend.events.trace import now_ms, stamp
+from backend.gateway.dispatcher import KeyedDispatcher
+from backend.gateway.offsets import OffsetTracker
+
 load_dotenv()
 
 PANDA = os.getenv("PANDA_PROXY", "http://localhost:8082")
 AGENT = os.getenv("AGENTKIT_URL", "http://localhost:8000/run")
 GROUP = "agent-gw"
 INSTANCE = os.getenv("CONSUMER_INSTANCE", "gw-1")
+CONCURRENCY = int(os.getenv("GATEWAY_CONCURRENCY", "8"))
+MAX_IN_FLIGHT = int(os.getenv("GATEWAY_MAX_IN_FLIGHT", "64"))
+COMMIT_EVERY = int(os.getenv("GATEWAY_COMMIT_EVERY", "100"))
+COMMIT_INTERVAL = float(os.getenv("GATEWAY_COMMIT_INTERVAL", "5"))
+METRICS_PORT = int(os.getenv("GATEWAY_METRICS_PORT", "9100"))
+# Longest wait between attempts at a record that could neither be processed nor dead-lettered
+RETRY_MAX_BACKOFF = float(os.getenv("GATEWAY_RETRY_MAX_BACKOFF", "30"))
+# Polling pauses while a partition has this many records behind its commit position
+MAX_UNCOMMITTED = int(os.getenv("GATEWAY_MAX_UNCOMMITTED", "10000"))
+
+log = get_logger("gateway")
 
+POLL_SECONDS = histogram("gateway_poll_seconds", "Time spent in one Pandaproxy poll")
+POLL_RECORDS = histogram("gateway_poll_records", "Records returned per poll", buckets=SIZE_BUCKETS)
+AGENT_SECONDS = histogram("gateway_agentkit_seconds", "AgentKit call latency")
+AGENT_CALLS = counter("gateway_agentkit_calls_total", "AgentKit calls by result", ("result",))
+DLQ_SENDS = counter("gateway_dlq_total", "Events sent to the dead letter queue by result", ("result",))
+IN_FLIGHT = gauge("gateway_in_flight", "Records dispatched and not yet handled")
+RETRIES = counter("gateway_record_retries_total", "Repeat attempts at records neither processed nor dead-lettered")
+RETRYING = gauge("gateway_records_retrying", "Records being retried; each holds back its partition's commit")
+UNCOMMITTED = gauge("gateway_uncommitted_records", "Records behind the commit position in the most backed-up partition")
 
-def subscribe(topics: list[str]) -> str:
+# Set by use_local_agent() when the agent runs in this process
+_local_agent: Callable[[dict], dict] | None = None
+
+
+def poll(group: GroupConsumer, timeout_ms: int = 500) -> list:
     """
-    Subscribe to Redpanda topics using consumer groups
-    Returns the base URI for polling
+    Poll the group for new records, timing the poll and stamping each event
+    Returns list of records, keys and values decoded
     """
-    print(f"Creating consumer group '{GROUP}' instance '{INSTANCE}'...")
-    headers = {"Content-Type": "application/vnd.kafka.v2+json"}
-    try:
-        r = requests.post(
-            f"{PANDA}/consumers/{GROUP}",
-            json={"name": INSTANCE, "format": "json"},
-            headers=headers,
-            timeout=10
-        )
-        r.raise_for_status()
-        base = r.json()["base_uri"]
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 409:
-            # Consumer already exists, construct base URI
-            print(f"Consumer instance already exists, reusing...")
-            base = f"{PANDA}/consumers/{GROUP}/instances/{INSTANCE}"
-        else:
-            raise
+    started = time.perf_counter()
+    records = group.poll(timeout_ms)
+    polled = now_ms()
+    for rec in records:
+        if isinstance(rec.get("value"), dict):
+            stamp(rec["value"], "polled", polled)
+    POLL_SECONDS.observe(time.perf_counter() - started)
+    POLL_RECORDS.observe(len(records))
+    return records
 
-    print(f"Subscribing to topics: {topics}")
-    r = requests.post(f"{base}/subscription", json={"topics": topics}, headers=headers, timeout=10)
-    r.raise_for_status()
-    print(f"Successfully subscribed to {topics}")
-    return base
 
-
-def poll(base: str, timeout_ms: int = 500) -> list:
+def use_local_agent(handler: Callable[[dict], dict] | None) -> None:
     """
-    Poll for new messages from subscribed topics
-    Returns list of records
+    Hand events to `handler` instead of POSTing them to AGENTKIT_URL
+
+    For hosts that run the agent in this process; the handler raises when
+    the event was not processed, like a failed HTTP call.
     """
-    headers = {"Accept": "application/vnd.kafka.json.v2+json"}
-    try:
-        r = requests.get(f"{base}/records?timeout={timeout_ms}", headers=headers, timeout=10)
-        if r.status_code == 204:
-            return []
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        print(f"Error polling: {e}")
-        return []
+    global _local_agent
+    _local_agent = handler
 
 
 def send_to_agentkit(event: dict) -> bool:
@@ -69,20 +88,30 @@ def send_to_agentkit(event: dict) -> bool:
     Send event to AgentKit for processing
     Returns True if successful
     """
+    started = time.perf_counter()
+    stamp(event, "dispatched")
     try:
-        print(f"Sending event {event.get('event_id')} to AgentKit...")
-        r = requests.post(AGENT, json=event, timeout=30)
-        r.raise_for_status()
-        print(f"  ✓ AgentKit processed event {event.get('event_id')}")
+        if _local_agent is not None:
+            _local_agent(event)
+        else:
+            # Fails fast with CircuitOpenError while AgentKit is degraded, routing events to the DLQ
+            r = get_transport(AGENT).post(AGENT, json=event, timeout=30)
+            r.raise_for_status()
+        AGENT_CALLS.labels("ok").inc()
+        log.debug("AgentKit processed event %s", event.get("event_id"))
         return True
     except Exception as e:
-        print(f"  ✗ AgentKit error for event {event.get('event_id')}: {e}")
+        AGENT_CALLS.labels("error").inc()
+        log.error("AgentKit error for event %s: %s", event.get("event_id"), e)
         return False
+    finally:
+        AGENT_SECONDS.observe(time.perf_counter() - started)
 
 
-def send_to_dlq(event: dict, error: str = "") -> None:
+def send_to_dlq(event: dict, error: str = "") -> bool:
     """
     Send failed event to dead letter queue
+    Returns True if successful
     """
     try:
         dlq_record = {
@@ -90,63 +119,165 @@ def send_to_dlq(event: dict, error: str = "") -> None:
             "error": error,
             "timestamp": time.time(),
         }
-        payload = {
-            "records": [
-                {"key": event.get("project_id", "unknown"), "value": dlq_record}
-            ]
-        }
-        requests.post(f"{PANDA}/topics/dlq", json=payload, timeout=5)
-        print(f"  [WARN] Sent event {event.get('event_id')} to DLQ")
+        content_type, body = produce_request("dlq", [{"key": event.get("project_id", "unknown"), "value": dlq_record}])
+        r = get_transport(PANDA).post(
+            f"{PANDA}/topics/dlq", data=body, headers={"Content-Type": content_type}, timeout=5
+        )
+        r.raise_for_status()
+        DLQ_SENDS.labels("ok").inc()
+        log.warning("Sent event %s to DLQ", event.get("event_id"))
+        return True
     except Exception as e:
-        print(f"  ✗ Failed to send to DLQ: {e}")
+        DLQ_SENDS.labels("error").inc()
+        log.error("Failed to send event %s to DLQ: %s", event.get("event_id"), e)
+        return False
 
 
-def main():
-    """Main consumer loop"""
-    print("Starting Gateway Consumer...")
-    print(f"  Redpanda: {PANDA}")
-    print(f"  AgentKit: {AGENT}")
-    print(f"  Consumer Group: {GROUP}")
-    print(f"  Instance: {INSTANCE}")
-    print()
+def handle_event(event: dict) -> bool:
+    """
+    Forward a single event to AgentKit, routing it to the DLQ on failure
+    Returns True once the event has been either processed or dead-lettered
+    """
+    log.debug(
+        "Received %s/%s (ID: %s)",
+        event.get("source", "unknown"), event.get("type", "unknown"), event.get("event_id", "unknown"),
+    )
+
+    # Send to AgentKit
+    success = send_to_agentkit(event)
 
-    # Subscribe to topics
-    topics = ["issues", "builds", "vendors"]
-    base = subscribe(topics)
+    if not success:
+        # Send to DLQ on failure
+        return send_to_dlq(event, "AgentKit processing failed")
+    return True
 
-    print("\nPolling for events... (Ctrl+C to stop)\n")
 
-    while True:
+def handle_record(rec: dict, tracker: OffsetTracker, stopping: threading.Event | None = None) -> None:
+    """
+    Handle a polled record and mark its offset complete
+
+    A record whose event could neither be processed nor dead-lettered is
+    retried with backoff until it is, holding up the records queued behind it
+    for the same key. Only once `stopping` is set is it given up on: its
+    offset stays uncommitted, so it is redelivered after the restart.
+    """
+    event = rec.get("value")
+    if event and not handle_event(event):
+        stopping = stopping or threading.Event()
+        RETRYING.inc()
         try:
-            records = poll(base)
+            attempt = 0
+            while True:
+                delay = backoff_delay(attempt, base=1.0, cap=RETRY_MAX_BACKOFF)
+                log.error(
+                    "Event %s not acknowledged; retrying offset %s in %.1fs",
+                    event.get("event_id"), rec.get("offset"), delay,
+                )
+                if stopping.wait(delay):
+                    log.error("Stopping with event %s unacknowledged; offset %s held back", event.get("event_id"), rec.get("offset"))
+                    return
+                attempt += 1
+                RETRIES.inc()
+                if handle_event(event):
+                    break
+        finally:
+            RETRYING.dec()
+    tracker.complete(rec["topic"], rec["partition"], rec["offset"])
+
+
+def run(stopping: threading.Event) -> None:
+    """Consume until `stopping` is set, then drain in-flight events, commit and leave the group"""
+    log.info(
+        "Starting Gateway Consumer",
+        extra={"fields": {
+            "redpanda": PANDA, "agentkit": "in-process" if _local_agent is not None else AGENT,
+            "group": GROUP, "instance": INSTANCE, "concurrency": CONCURRENCY, "max_in_flight": MAX_IN_FLIGHT,
+        }},
+    )
+
+    # Subscribe to topics, replacing an instance a dead worker left behind
+    group = GroupConsumer(GROUP, INSTANCE, ["issues", "builds", "vendors"], PANDA)
+    group.open()
+
+    # Only offsets whose records (and every earlier one) are handled get committed
+    tracker = OffsetTracker(
+        group.commit,
+        commit_every=COMMIT_EVERY,
+        commit_interval=COMMIT_INTERVAL,
+    )
+
+    UNCOMMITTED.set_function(tracker.backlog)
+
+    # Events for the same project are handled in order, different projects in parallel
+    dispatcher = KeyedDispatcher(
+        lambda rec: handle_record(rec, tracker, stopping),
+        concurrency=CONCURRENCY,
+        max_in_flight=MAX_IN_FLIGHT,
+    )
+    IN_FLIGHT.set_function(lambda: dispatcher.in_flight)
+
+    log.info("Polling for events... (Ctrl+C to stop)")
+
+    paused = False
+    while not stopping.is_set():
+        try:
+            if tracker.backlog() >= MAX_UNCOMMITTED:
+                # A record being retried holds its partition's commit; fetch no further until it clears
+                if not paused:
+                    log.warning("%d records behind the commit position, pausing polls", tracker.backlog())
+                    paused = True
+                tracker.maybe_commit()
+                stopping.wait(0.5)
+                continue
+            if paused:
+                log.info("Commit position caught up, resuming polls")
+                paused = False
+
+            records = poll(group)
 
             for rec in records:
+                tracker.track(rec["topic"], rec["partition"], rec["offset"])
                 event = rec.get("value")
                 if not event:
+                    tracker.complete(rec["topic"], rec["partition"], rec["offset"])
                     continue
 
-                event_id = event.get("event_id", "unknown")
-                event_type = event.get("type", "unknown")
-                source = event.get("source", "unknown")
+                # Blocks while MAX_IN_FLIGHT events are outstanding, which holds off the next poll
+                key = rec.get("key") or event.get("project_id", "unknown")
+                dispatcher.submit(key, rec)
 
-                print(f"\n[RECEIVED] {source}/{event_type} (ID: {event_id})")
+            tracker.maybe_commit()
 
-                # Send to AgentKit
-                success = send_to_agentkit(event)
+            # Small delay between empty polls
+            if not records:
+                stopping.wait(0.1)
 
-                if not success:
-                    # Send to DLQ on failure
-                    send_to_dlq(event, "AgentKit processing failed")
+        except Exception as e:
+            log.exception("Unexpected error: %s", e)
+            stopping.wait(5)  # Wait before retrying
 
-            # Small delay between polls
-            time.sleep(0.1)
+    log.info("Shutting down gracefully")
+    dispatcher.shutdown(wait=True)
+    tracker.maybe_commit(force=True)
+    group.close()
+    log.info("Consumer instance '%s' removed", INSTANCE)
 
-        except KeyboardInterrupt:
-            print("\n\nShutting down gracefully...")
-            break
-        except Exception as e:
-            print(f"\n[ERROR] Unexpected error: {e}")
-            time.sleep(5)  # Wait before retrying
+
+def main():
+    """Run the consumer loop; SIGTERM or Ctrl+C drains in-flight events, commits and leaves the group"""
+    stopping = threading.Event()
+
+    def request_stop(signum, frame) -> None:
+        log.info("Received %s, draining", signal.Signals(signum).name)
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+        log.info("Metrics on http://0.0.0.0:%d/metrics", METRICS_PORT)
+    run(stopping)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+Keyed Dispatcher
+Bounded worker pool that processes records concurrently while keeping per-key order
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from backend.common.log import get_logger
+
+log = get_logger("gateway.dispatcher")
+
+
+class KeyedDispatcher:
+    """
+    Runs a handler over submitted items on a thread pool
+
+    Items that share a key are handled one after another in submission order;
+    items with different keys run in parallel up to `concurrency` at a time.
+    At most `max_in_flight` items may be queued or running, after which
+    submit() blocks so the caller stops polling (backpressure).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        concurrency: int = 8,
+        max_in_flight: int = 64,
+    ):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gw-worker")
+        self._slots = threading.Semaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        # key -> items waiting behind the one currently being handled for that key
+        self._queues: dict[str, deque] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of items queued or running"""
+        return self._in_flight
+
+    def submit(self, key: str, item: Any, timeout: float | None = None) -> bool:
+        """
+        Queue an item for its key, blocking while the pool is at max_in_flight
+
+        Returns:
+            False if no slot became free within timeout, True otherwise
+        """
+        if not self._slots.acquire(timeout=timeout):
+            return False
+
+        with self._lock:
+            self._in_flight += 1
+            queue = self._queues.get(key)
+            if queue is not None:
+                # A worker is already draining this key; it will pick the item up
+                queue.append(item)
+                return True
+            self._queues[key] = deque()
+
+        self._executor.submit(self._drain, key, item)
+        return True
+
+    def _drain(self, key: str, item: Any) -> None:
+        while True:
+            try:
+                self.handler(item)
+            except Exception as e:
+                log.exception("Handler error for key %s: %s", key, e)
+            finally:
+                self._slots.release()
+
+            with self._lock:
+                self._in_flight -= 1
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    if self._in_flight == 0:
+                        self._idle.notify_all()
+                    return
+                item = queue.popleft()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted item has been handled"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool, optionally waiting for in-flight items to finish"""
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
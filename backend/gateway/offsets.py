@@ -0,0 +1,108 @@
+"""
+Offset Tracker
+Tracks completed records per partition and commits contiguous offsets in batches
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class OffsetTracker:
+    """
+    At-least-once commit bookkeeping for concurrently processed records
+
+    Every polled record is registered with track() and marked with complete()
+    once it has been handled. Per partition only the contiguous prefix of
+    completed offsets is committable, so a slow record holds back the commit
+    position even if later records finished first. Commits are batched: they
+    are sent once `commit_every` records have completed or `commit_interval`
+    seconds have passed since the last commit.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[list[dict]], bool],
+        commit_every: int = 100,
+        commit_interval: float = 5.0,
+    ):
+        self._commit = commit
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        # (topic, partition) -> offsets in poll order that are not yet committable
+        self._tracked: dict[tuple[str, int], deque] = {}
+        self._completed: dict[tuple[str, int], set] = {}
+        # (topic, partition) -> next offset to consume, as Kafka expects it committed
+        self._positions: dict[tuple[str, int], int] = {}
+        self._committed: dict[tuple[str, int], int] = {}
+        self._since_commit = 0
+        self._last_commit = time.monotonic()
+
+    def track(self, topic: str, partition: int, offset: int) -> None:
+        """Register a polled record as in flight"""
+        with self._lock:
+            self._tracked.setdefault((topic, partition), deque()).append(offset)
+            self._completed.setdefault((topic, partition), set())
+
+    def complete(self, topic: str, partition: int, offset: int) -> None:
+        """Mark a record as handled and advance its partition's low-water mark"""
+        tp = (topic, partition)
+        with self._lock:
+            tracked = self._tracked.get(tp)
+            if tracked is None:
+                return
+            completed = self._completed[tp]
+            completed.add(offset)
+            while tracked and tracked[0] in completed:
+                done = tracked.popleft()
+                completed.discard(done)
+                self._positions[tp] = done + 1
+            self._since_commit += 1
+
+    def backlog(self) -> int:
+        """Records polled but not yet committable in the most backed-up partition"""
+        with self._lock:
+            return max((len(tracked) for tracked in self._tracked.values()), default=0)
+
+    def pending(self) -> dict[tuple[str, int], int]:
+        """Commit positions that have advanced since the last successful commit"""
+        with self._lock:
+            return {
+                tp: position
+                for tp, position in self._positions.items()
+                if self._committed.get(tp) != position
+            }
+
+    def maybe_commit(self, force: bool = False) -> bool:
+        """
+        Commit advanced positions if a count or time threshold has been reached
+
+        Returns:
+            True if a commit was sent and accepted
+        """
+        with self._lock:
+            due = (
+                self._since_commit >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval
+            )
+        if not (force or due):
+            return False
+
+        positions = self.pending()
+        if not positions:
+            with self._lock:
+                self._last_commit = time.monotonic()
+            return False
+
+        offsets = [
+            {"topic": topic, "partition": partition, "offset": offset}
+            for (topic, partition), offset in positions.items()
+        ]
+        ok = self._commit(offsets)
+        with self._lock:
+            self._last_commit = time.monotonic()
+            if ok:
+                self._committed.update(positions)
+                self._since_commit = 0
+        return ok
@@ -0,0 +1,133 @@
+"""
+Gateway Supervisor
+Runs several gateway consumer processes in the agent-gw group and keeps them alive
+
+Usage:
+    python3 backend/gateway/supervisor.py                 # one worker per core
+    python3 backend/gateway/supervisor.py --workers 4
+
+Each worker gets its own consumer instance name (<prefix>-<index>) and
+metrics port (GATEWAY_METRICS_PORT + index), so Redpanda spreads the topic
+partitions across them. A worker that exits unexpectedly is restarted with
+backoff under the same name; on SIGTERM/SIGINT every worker is asked to
+drain, commit and delete its consumer instance before the supervisor exits.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.log import get_logger
+
+load_dotenv()
+
+WORKERS = int(os.getenv("GATEWAY_WORKERS", "0")) or os.cpu_count() or 1
+INSTANCE_PREFIX = os.getenv("CONSUMER_INSTANCE_PREFIX") or f"gw-{socket.gethostname()}"
+METRICS_PORT = int(os.getenv("GATEWAY_METRICS_PORT", "9100"))
+DRAIN_SECONDS = float(os.getenv("GATEWAY_DRAIN_SECONDS", "30"))
+RESTART_BACKOFF_MAX = 30.0
+# A worker that ran this long before dying is restarted without accumulated backoff
+STABLE_SECONDS = 60.0
+
+CONSUMER = str(Path(__file__).with_name("consumer.py"))
+
+log = get_logger("gateway.supervisor")
+
+
+class Worker:
+    """One consumer process slot, restarted under the same instance name"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.instance = f"{INSTANCE_PREFIX}-{index}"
+        self.process: subprocess.Popen | None = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+
+    def start(self) -> None:
+        env = dict(os.environ, CONSUMER_INSTANCE=self.instance)
+        env["GATEWAY_METRICS_PORT"] = str(METRICS_PORT + self.index if METRICS_PORT else 0)
+        self.process = subprocess.Popen([sys.executable, CONSUMER], env=env)
+        self.started_at = time.monotonic()
+        log.info("Started worker %s (pid %d)", self.instance, self.process.pid)
+
+    def check(self) -> None:
+        """Restart the process if it exited, backing off while it keeps crashing"""
+        now = time.monotonic()
+        if self.process is None:
+            if now >= self.next_start:
+                self.start()
+            return
+        code = self.process.poll()
+        if code is None:
+            return
+
+        if now - self.started_at >= STABLE_SECONDS:
+            self.restarts = 0
+        delay = min(RESTART_BACKOFF_MAX, 2 ** self.restarts) if self.restarts else 0.0
+        self.restarts += 1
+        log.warning("Worker %s exited with %s; restarting in %.0fs", self.instance, code, delay)
+        self.process = None
+        self.next_start = now + delay
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+
+    def wait(self, deadline: float) -> None:
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            log.warning("Worker %s did not drain in time; killing it", self.instance)
+            self.process.kill()
+            self.process.wait()
+
+
+def run(workers: int) -> None:
+    """Supervise `workers` consumer processes until SIGTERM/SIGINT"""
+    stopping = False
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    slots = [Worker(index) for index in range(workers)]
+    log.info("Supervising %d gateway workers (%s-0..%d)", workers, INSTANCE_PREFIX, workers - 1)
+    while not stopping:
+        for worker in slots:
+            worker.check()
+        time.sleep(0.5)
+
+    log.info("Stopping workers; waiting up to %.0fs for them to drain", DRAIN_SECONDS)
+    for worker in slots:
+        worker.stop()
+    deadline = time.monotonic() + DRAIN_SECONDS
+    for worker in slots:
+        worker.wait(deadline)
+    log.info("All workers stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run and supervise gateway consumer processes")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Consumer processes (default: one per core)")
+    args = parser.parse_args()
+    run(max(1, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Service Host
+Runs a chosen set of the backend's web apps, and optionally the gateway, under one multi-worker ASGI server
+
+Usage:
+    python3 backend/host/server.py                                   # every app, one worker per core
+    python3 backend/host/server.py --apps github,agent --workers 2
+    python3 backend/host/server.py --apps agent,calendar,gateway     # gateway calls the agent in-process
+
+Apps are imported once per worker, so they share its producer and
+connection pools. Every app keeps its own paths (POST /github/issues,
+POST /run, /api/nudges, ...) and its /health and /metrics move under its
+name (/agent/health). Point AGENTKIT_URL and CALENDAR_API_BASE at this
+port when those apps are hosted here.
+
+With `gateway` in --apps each worker also runs a gateway consumer (instance
+<CONSUMER_INSTANCE_PREFIX>-<pid>); when `agent` is hosted too, events are
+handed to it directly instead of over HTTP. uvicorn uses uvloop and
+httptools when they are installed.
+
+Each worker has its own metrics and in-memory state: scrape every worker
+or run one, and keep the mock calendar (an in-memory store) at one worker.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import socket
+import sys
+import threading
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.log import get_logger
+
+load_dotenv()
+
+# Hostable apps in startup order; shutdown runs in reverse, so the receivers
+# flush first and the services they call stay up until they have
+APPS = {
+    "calendar": "backend.calendar.mock_api",
+    "agent": "backend.agentkit.mock_agent",
+    "github": "backend.webhooks.github_issues",
+    "jira": "backend.webhooks.jira_issues",
+    "gitlab": "backend.webhooks.gitlab_issues",
+}
+HOST_APPS = os.getenv("HOST_APPS", ",".join(APPS))
+HOST_PORT = int(os.getenv("HOST_PORT", "8080"))
+HOST_WORKERS = int(os.getenv("HOST_WORKERS", "0")) or os.cpu_count() or 1
+INSTANCE_PREFIX = os.getenv("CONSUMER_INSTANCE_PREFIX") or f"gw-{socket.gethostname()}"
+# Routes every app has; they are only reachable under the app's name
+SHARED_SEGMENTS = {"", "health", "metrics", "docs", "redoc", "openapi.json"}
+GATEWAY_STOP_SECONDS = 60.0
+
+log = get_logger("host")
+
+
+def parse_apps(spec: str) -> list[str]:
+    """Names from a comma-separated list, checked and put in startup order"""
+    names = {name.strip() for name in spec.split(",") if name.strip()}
+    unknown = names - set(APPS) - {"gateway"}
+    if unknown:
+        raise ValueError(f"Unknown app(s) {', '.join(sorted(unknown))}; choose from {', '.join(APPS)}, gateway")
+    return [name for name in (*APPS, "gateway") if name in names]
+
+
+def first_segment(path: str) -> str:
+    return path.split("/", 2)[1] if path.startswith("/") else ""
+
+
+class GatewayThread:
+    """A gateway consumer loop in this worker, restarted after errors until stopped"""
+
+    def __init__(self, local_agent: bool):
+        self.local_agent = local_agent
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="gateway", daemon=True)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        from backend.gateway import consumer
+
+        consumer.INSTANCE = f"{INSTANCE_PREFIX}-{os.getpid()}"
+        if self.local_agent:
+            from backend.agentkit.mock_agent import run_event
+
+            def call_agent(event: dict) -> dict:
+                return asyncio.run_coroutine_threadsafe(run_event(event), loop).result(timeout=30)
+
+            consumer.use_local_agent(call_agent)
+        self.thread.start()
+
+    def run(self) -> None:
+        from backend.gateway import consumer
+
+        while not self.stopping.is_set():
+            try:
+                consumer.run(self.stopping)
+            except Exception as e:
+                log.exception("Gateway loop failed: %s; restarting", e)
+                self.stopping.wait(5)
+
+    async def stop(self) -> None:
+        """Drain the consumer; the loop stays free to finish in-process agent calls meanwhile"""
+        self.stopping.set()
+        await asyncio.to_thread(self.thread.join, GATEWAY_STOP_SECONDS)
+
+
+class Host:
+    """
+    ASGI root dispatching on the first path segment
+
+    /<name>/health, /<name>/metrics (and docs) go to that app with the
+    prefix stripped; any other path goes, unchanged, to the app that has
+    routes starting with its first segment.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.apps = {name: importlib.import_module(APPS[name]).app for name in names if name in APPS}
+        self.owners = {}
+        for name, app in self.apps.items():
+            for route in app.routes:
+                segment = first_segment(getattr(route, "path", ""))
+                if segment in SHARED_SEGMENTS or self.owners.get(segment) is app:
+                    continue
+                if segment in self.owners:
+                    raise ValueError(f"Apps conflict on /{segment}")
+                self.owners[segment] = app
+        self.gateway = GatewayThread(local_agent="agent" in self.apps) if "gateway" in names else None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        path = scope["path"]
+        if path == "/health" and scope["type"] == "http":
+            await self.respond(send, 200, {"status": "ok", "service": "host", "apps": self.names, "pid": os.getpid()})
+            return
+        segment = first_segment(path)
+        rest = path[len(segment) + 1:]
+        app = self.apps.get(segment)
+        if app is not None and first_segment(rest) in SHARED_SEGMENTS:
+            scope = dict(scope, path=rest or "/", root_path=scope.get("root_path", "") + f"/{segment}")
+        else:
+            app = self.owners.get(segment)
+        if app is None:
+            if scope["type"] == "http":
+                await self.respond(send, 404, {"detail": "Not Found"})
+            return
+        await app(scope, receive, send)
+
+    @asynccontextmanager
+    async def running(self):
+        """Every hosted app's lifespan, then the gateway; torn down in reverse"""
+        async with AsyncExitStack() as stack:
+            for app in self.apps.values():
+                await stack.enter_async_context(app.router.lifespan_context(app))
+            if self.gateway is not None:
+                self.gateway.start(asyncio.get_running_loop())
+                stack.push_async_callback(self.gateway.stop)
+            log.info("Hosting %s (pid %d)", ", ".join(self.names), os.getpid())
+            yield
+
+    async def lifespan(self, receive, send) -> None:
+        await receive()
+        started = False
+        try:
+            async with self.running():
+                started = True
+                await send({"type": "lifespan.startup.complete"})
+                await receive()
+        except Exception as e:
+            log.exception("Host %s failed: %s", "shutdown" if started else "startup", e)
+            await send({"type": f"lifespan.{'shutdown' if started else 'startup'}.failed", "message": str(e)})
+            return
+        await send({"type": "lifespan.shutdown.complete"})
+
+    @staticmethod
+    async def respond(send, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+
+def create_app() -> Host:
+    """The ASGI root for this worker, hosting HOST_APPS"""
+    return Host(parse_apps(os.getenv("HOST_APPS", HOST_APPS)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run backend apps under one multi-worker ASGI server")
+    parser.add_argument("--apps", default=HOST_APPS, help=f"Comma-separated subset of {', '.join(APPS)}, gateway")
+    parser.add_argument("--workers", type=int, default=HOST_WORKERS, help="Worker processes")
+    parser.add_argument("--port", type=int, default=HOST_PORT)
+    args = parser.parse_args()
+
+    names = parse_apps(args.apps)
+    if "calendar" in names and args.workers > 1:
+        log.warning("The mock calendar keeps its store per worker; meetings and nudges are split across %d", args.workers)
+    # Each worker builds its own Host (and imports the apps) from the environment
+    os.environ["HOST_APPS"] = ",".join(names)
+
+    import uvicorn
+    log.info("Starting host on port %d: %s x %d workers", args.port, ", ".join(names), args.workers)
+    uvicorn.run("backend.host.server:create_app", factory=True, host="0.0.0.0", port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Risk Aggregator
+Per-project risk state folded from the outcomes stream, snapshotted to SQLite with its offsets
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from backend.risk.state import ProjectRisk
+
+load_dotenv()
+
+RISK_DB = os.getenv("RISK_DB", "risk.db")
+TUMBLING_SECONDS = float(os.getenv("RISK_TUMBLING_SECONDS", "3600"))
+SLIDING_SECONDS = float(os.getenv("RISK_SLIDING_SECONDS", "900"))
+SLIDING_BUCKETS = int(os.getenv("RISK_SLIDING_BUCKETS", "60"))
+
+
+class RiskAggregator:
+    """
+    Folds outcome records into ProjectRisk states
+
+    The state and the stream position it reflects are written to SQLite in
+    one transaction, so after a restart the aggregator resumes exactly where
+    its last snapshot left off: records at or past a stored position are
+    applied, earlier ones (redelivered because the group commit lagged the
+    snapshot) are skipped.
+    """
+
+    def __init__(
+        self,
+        path: str = RISK_DB,
+        tumbling_seconds: float = TUMBLING_SECONDS,
+        sliding_seconds: float = SLIDING_SECONDS,
+        buckets: int = SLIDING_BUCKETS,
+    ):
+        self.path = path
+        self.tumbling_seconds = tumbling_seconds
+        self.sliding_seconds = sliding_seconds
+        self.buckets = buckets
+        self.projects: dict[str, ProjectRisk] = {}
+        # (topic, partition) -> next offset to apply
+        self.positions: dict[tuple[str, int], int] = {}
+        self.applied = 0
+        self.skipped = 0
+        self.last_snapshot = 0.0
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS projects (project_id TEXT PRIMARY KEY, state TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS positions ("
+            "topic TEXT NOT NULL, partition INTEGER NOT NULL, next_offset INTEGER NOT NULL, "
+            "PRIMARY KEY (topic, partition))"
+        )
+        self._load()
+
+    def _load(self) -> None:
+        for project_id, state in self._db.execute("SELECT project_id, state FROM projects"):
+            self.projects[project_id] = ProjectRisk.from_dict(
+                project_id, json.loads(state), self.tumbling_seconds, self.sliding_seconds, self.buckets
+            )
+        for topic, partition, next_offset in self._db.execute("SELECT topic, partition, next_offset FROM positions"):
+            self.positions[(topic, partition)] = next_offset
+
+    def apply(self, record: dict) -> bool:
+        """Fold one polled record; returns False if it was already reflected in the state"""
+        position = (record["topic"], record["partition"])
+        outcome = record.get("value")
+        with self._lock:
+            if record["offset"] < self.positions.get(position, 0):
+                self.skipped += 1
+                return False
+            self.positions[position] = record["offset"] + 1
+            if isinstance(outcome, dict):
+                project_id = str(outcome.get("project_id") or record.get("key") or "unknown")
+                state = self.projects.get(project_id)
+                if state is None:
+                    state = self.projects[project_id] = ProjectRisk(
+                        project_id, self.tumbling_seconds, self.sliding_seconds, self.buckets
+                    )
+                state.apply(outcome)
+                self._dirty.add(project_id)
+            self.applied += 1
+            return True
+
+    def snapshot(self) -> list[dict]:
+        """
+        Persist changed projects and the current positions atomically
+
+        Returns:
+            The positions as Pandaproxy commit entries
+        """
+        with self._lock:
+            rows = [(project_id, json.dumps(self.projects[project_id].to_dict())) for project_id in self._dirty]
+            positions = [(topic, partition, offset) for (topic, partition), offset in self.positions.items()]
+            self._dirty.clear()
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO projects (project_id, state) VALUES (?, ?) "
+                    "ON CONFLICT(project_id) DO UPDATE SET state = excluded.state",
+                    rows,
+                )
+                self._db.executemany(
+                    "INSERT INTO positions (topic, partition, next_offset) VALUES (?, ?, ?) "
+                    "ON CONFLICT(topic, partition) DO UPDATE SET next_offset = excluded.next_offset",
+                    positions,
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                self._dirty.update(project_id for project_id, _ in rows)
+                raise
+            self.last_snapshot = time.time()
+        return [{"topic": topic, "partition": partition, "offset": offset} for topic, partition, offset in positions]
+
+    def get(self, project_id: str) -> dict | None:
+        """Current risk for one project, or None if it has no outcomes"""
+        with self._lock:
+            state = self.projects.get(project_id)
+            return state.view() if state else None
+
+    def summary(self) -> list[dict]:
+        """Cumulative and sliding risk for every project, riskiest first"""
+        with self._lock:
+            views = [state.view() for state in self.projects.values()]
+        return sorted(
+            (
+                {
+                    "project_id": view["project_id"],
+                    "cumulative_risk": view["cumulative_risk"],
+                    "sliding_sum": view["sliding"]["sum"],
+                    "failure_ratio": view["failure_ratio"],
+                    "outcomes": view["outcomes"],
+                }
+                for view in views
+            ),
+            key=lambda row: -row["cumulative_risk"],
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "projects": len(self.projects),
+                "applied": self.applied,
+                "skipped": self.skipped,
+                "pending_snapshot": len(self._dirty),
+                "last_snapshot": self.last_snapshot,
+                "positions": {f"{topic}/{partition}": offset for (topic, partition), offset in self.positions.items()},
+            }
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,152 @@
+"""
+Risk Service
+Consumes the outcomes topic and serves per-project risk from incrementally maintained state
+
+Run a single instance per RISK_DB: every instance in the risk-agg group only
+sees its share of partitions, so only the whole set of instances together has
+every project.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, HTTPException
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter, gauge, instrument
+from backend.common.transport import close_async_transports
+from backend.events.group import GroupConsumer
+from backend.risk.aggregator import RiskAggregator
+
+load_dotenv()
+
+GROUP = "risk-agg"
+TOPIC = "outcomes"
+INSTANCE = os.getenv("RISK_INSTANCE") or f"risk-{socket.gethostname()}"
+# Snapshot (and then commit) after this many applied records or seconds, whichever comes first
+SNAPSHOT_EVERY = int(os.getenv("RISK_SNAPSHOT_EVERY", "1000"))
+SNAPSHOT_INTERVAL = float(os.getenv("RISK_SNAPSHOT_INTERVAL", "5"))
+POLL_TIMEOUT_MS = 1000
+
+log = get_logger("risk")
+
+APPLIED = counter("risk_outcomes_applied_total", "Outcome records folded into project state")
+REDELIVERED = counter("risk_outcomes_skipped_total", "Redelivered outcome records already in the snapshot")
+SNAPSHOTS = counter("risk_snapshots_total", "State snapshots written", ("result",))
+PROJECTS = gauge("risk_projects", "Projects with aggregated risk")
+
+
+class OutcomeFollower:
+    """Background thread that polls outcomes, folds them in and snapshots before committing"""
+
+    def __init__(self, aggregator: RiskAggregator):
+        self.aggregator = aggregator
+        self.consumer = GroupConsumer(GROUP, INSTANCE, [TOPIC])
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="risk-follower", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self.stopping.set()
+        self.thread.join(timeout)
+
+    def snapshot_and_commit(self) -> None:
+        """Offsets are committed only once the state that reflects them is on disk"""
+        try:
+            offsets = self.aggregator.snapshot()
+        except Exception as e:
+            SNAPSHOTS.labels("error").inc()
+            log.error("Risk snapshot failed: %s", e)
+            return
+        SNAPSHOTS.labels("ok").inc()
+        self.consumer.commit(offsets)
+
+    def run(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                self.consumer.open()
+                break
+            except Exception as e:
+                log.warning("Could not join group '%s': %s; retrying", GROUP, e)
+                self.stopping.wait(2.0)
+        else:
+            return
+
+        unsaved = 0
+        last_snapshot = time.monotonic()
+        while not self.stopping.is_set():
+            for record in self.consumer.poll(POLL_TIMEOUT_MS):
+                if self.aggregator.apply(record):
+                    APPLIED.inc()
+                    unsaved += 1
+                else:
+                    REDELIVERED.inc()
+            if unsaved and (unsaved >= SNAPSHOT_EVERY or time.monotonic() - last_snapshot >= SNAPSHOT_INTERVAL):
+                self.snapshot_and_commit()
+                unsaved = 0
+                last_snapshot = time.monotonic()
+
+        self.snapshot_and_commit()
+        self.consumer.close()
+        log.info("Risk follower stopped")
+
+
+aggregator: RiskAggregator | None = None
+follower: OutcomeFollower | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Restore state, follow outcomes, and snapshot/commit/leave the group on the way out"""
+    global aggregator, follower
+    aggregator = RiskAggregator()
+    PROJECTS.set_function(lambda: len(aggregator.projects))
+    log.info("Restored risk state for %d projects from %s", len(aggregator.projects), aggregator.path)
+    follower = OutcomeFollower(aggregator)
+    follower.start()
+    yield
+    follower.stop()
+    aggregator.close()
+    await close_async_transports()
+
+
+app = FastAPI(lifespan=lifespan)
+instrument(app, "risk")
+
+
+@app.get("/health")
+async def health():
+    """Health check, with how far the aggregator has read"""
+    return {"status": "ok", "service": "risk", **aggregator.stats()}
+
+
+@app.get("/projects")
+async def list_projects():
+    """Every project's headline numbers, riskiest first"""
+    return {"projects": aggregator.summary()}
+
+
+@app.get("/projects/{project_id}")
+async def get_project(project_id: str):
+    """Cumulative, windowed, ratio and action-count risk for one project"""
+    view = aggregator.get(project_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"No outcomes for project '{project_id}'")
+    return view
+
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.getenv("RISK_PORT", "7400"))
+    log.info("Starting Risk service on port %d", port)
+    uvicorn.run(app, host="0.0.0.0", port=port)
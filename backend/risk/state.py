@@ -0,0 +1,177 @@
+"""
+Risk State
+Incrementally maintained per-project risk: cumulative, windowed sums, ratios and action counts
+
+Every outcome updates its project's state in O(1) (amortised), and reading a
+project's numbers never touches its history, so queries cost the same after
+ten events or ten million.
+"""
+import time
+from collections import deque
+
+
+class ProjectRisk:
+    """
+    Running risk for one project
+
+    - cumulative: sum of every risk_delta seen
+    - tumbling: sum within the current fixed window of `tumbling_seconds`
+      (aligned to the epoch), plus the sum of the window before it
+    - sliding: sum over the last `sliding_seconds`, kept as `buckets` sub-window
+      sums with a running total so reads do not re-add them
+
+    Event time comes from the outcome's `ts` and is clamped so it never moves
+    backwards; a late outcome counts toward the current windows.
+    """
+
+    __slots__ = (
+        "project_id", "tumbling_seconds", "sliding_seconds", "bucket_seconds",
+        "cumulative", "outcomes", "acks", "failures", "actions",
+        "window_start", "window_sum", "previous_window_sum",
+        "slots", "sliding_sum", "last_ts",
+    )
+
+    def __init__(self, project_id: str, tumbling_seconds: float, sliding_seconds: float, buckets: int):
+        self.project_id = project_id
+        self.tumbling_seconds = tumbling_seconds
+        self.sliding_seconds = sliding_seconds
+        self.bucket_seconds = sliding_seconds / max(1, buckets)
+        self.cumulative = 0.0
+        self.outcomes = 0
+        self.acks = 0
+        self.failures = 0
+        self.actions: dict[str, int] = {}
+        self.window_start = 0.0
+        self.window_sum = 0.0
+        self.previous_window_sum = 0.0
+        # [bucket_start, sum] oldest first
+        self.slots: deque[list] = deque()
+        self.sliding_sum = 0.0
+        self.last_ts = 0.0
+
+    def apply(self, outcome: dict) -> None:
+        """Fold one outcome record into the state"""
+        delta = float(outcome.get("risk_delta") or 0.0)
+        ts = max(float(outcome.get("ts") or time.time()), self.last_ts)
+        self.last_ts = ts
+
+        self.cumulative += delta
+        self.outcomes += 1
+        if outcome.get("ack"):
+            self.acks += 1
+        else:
+            self.failures += 1
+        action = outcome.get("action")
+        if action:
+            self.actions[action] = self.actions.get(action, 0) + 1
+
+        self._roll_tumbling(ts)
+        self.window_sum += delta
+
+        bucket = ts - ts % self.bucket_seconds
+        if self.slots and self.slots[-1][0] == bucket:
+            self.slots[-1][1] += delta
+        else:
+            self.slots.append([bucket, delta])
+        self.sliding_sum += delta
+        self._expire_sliding(ts)
+
+    def _roll_tumbling(self, now: float) -> None:
+        start = now - now % self.tumbling_seconds
+        if start == self.window_start:
+            return
+        consecutive = start - self.window_start == self.tumbling_seconds
+        self.previous_window_sum = self.window_sum if consecutive else 0.0
+        self.window_start = start
+        self.window_sum = 0.0
+
+    def _expire_sliding(self, now: float) -> None:
+        horizon = now - self.sliding_seconds
+        while self.slots and self.slots[0][0] + self.bucket_seconds <= horizon:
+            self.sliding_sum -= self.slots.popleft()[1]
+        if not self.slots:
+            # Reset accumulated float drift whenever the window empties
+            self.sliding_sum = 0.0
+
+    def view(self, now: float | None = None) -> dict:
+        """
+        Current numbers for the project, with windows advanced to `now`
+
+        Read-only: the windows are advanced on the side, so a later outcome
+        timed before `now` still lands in its own window.
+        """
+        now = max(now or time.time(), self.last_ts)
+        start = now - now % self.tumbling_seconds
+        if start == self.window_start:
+            window_sum, previous_window_sum = self.window_sum, self.previous_window_sum
+        elif start - self.window_start == self.tumbling_seconds:
+            window_sum, previous_window_sum = 0.0, self.window_sum
+        else:
+            window_sum, previous_window_sum = 0.0, 0.0
+        sliding_sum = self.sliding_sum
+        horizon = now - self.sliding_seconds
+        expired = 0
+        for bucket_start, total in self.slots:
+            if bucket_start + self.bucket_seconds > horizon:
+                break
+            sliding_sum -= total
+            expired += 1
+        if expired == len(self.slots):
+            sliding_sum = 0.0
+        return {
+            "project_id": self.project_id,
+            "cumulative_risk": round(self.cumulative, 6),
+            "tumbling": {
+                "seconds": self.tumbling_seconds,
+                "window_start": start,
+                "sum": round(window_sum, 6),
+                "previous_sum": round(previous_window_sum, 6),
+            },
+            "sliding": {"seconds": self.sliding_seconds, "sum": round(sliding_sum, 6)},
+            "outcomes": self.outcomes,
+            "ack_ratio": self.acks / self.outcomes if self.outcomes else 0.0,
+            "failure_ratio": self.failures / self.outcomes if self.outcomes else 0.0,
+            "actions": dict(self.actions),
+            "updated_at": self.last_ts,
+        }
+
+    def to_dict(self) -> dict:
+        """Snapshot form; restore with from_dict()"""
+        return {
+            "cumulative": self.cumulative,
+            "outcomes": self.outcomes,
+            "acks": self.acks,
+            "failures": self.failures,
+            "actions": self.actions,
+            "window_start": self.window_start,
+            "window_sum": self.window_sum,
+            "previous_window_sum": self.previous_window_sum,
+            "slots": list(self.slots),
+            "last_ts": self.last_ts,
+        }
+
+    @classmethod
+    def from_dict(cls, project_id: str, data: dict, tumbling_seconds: float, sliding_seconds: float, buckets: int):
+        state = cls(project_id, tumbling_seconds, sliding_seconds, buckets)
+        state.cumulative = data["cumulative"]
+        state.outcomes = data["outcomes"]
+        state.acks = data["acks"]
+        state.failures = data["failures"]
+        state.actions = dict(data["actions"])
+        state.window_start = data["window_start"]
+        state.window_sum = data["window_sum"]
+        state.previous_window_sum = data["previous_window_sum"]
+        state.last_ts = data["last_ts"]
+        # Re-bucket the sliding window in case the bucket size changed since the snapshot
+        for start, total in data["slots"]:
+            bucket = start - start % state.bucket_seconds
+            if state.slots and state.slots[-1][0] == bucket:
+                state.slots[-1][1] += total
+            else:
+                state.slots.append([bucket, total])
+            state.sliding_sum += total
+        state._expire_sliding(state.last_ts)
+        if state.window_start % tumbling_seconds:
+            # Tumbling size changed; the partial window no longer lines up
+            state.window_start, state.window_sum, state.previous_window_sum = 0.0, 0.0, 0.0
+        return state
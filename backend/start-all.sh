@@ -18,16 +18,26 @@ fi
 # Load environment
 export $(grep -v '^#' backend/.env | xargs)
 
-# Start Redpanda
-echo "1️⃣  Starting Redpanda..."
-docker compose -f backend/docker/docker-compose.yml up -d
-echo "   Waiting for Redpanda to be ready..."
-sleep 5
+mkdir -p logs
 
-# Create topics
-echo ""
-echo "2️⃣  Creating Redpanda topics..."
-bash backend/docker/setup-topics.sh
+if [ "${LOCAL_BROKER:-false}" = "true" ]; then
+    # Pandaproxy-compatible stand-in on :8082; creates the topics itself
+    echo "1️⃣  Starting local broker (no Docker)..."
+    python3 backend/broker/proxy.py > logs/broker.log 2>&1 &
+    echo $! > logs/broker.pid
+    sleep 2
+else
+    # Start Redpanda
+    echo "1️⃣  Starting Redpanda..."
+    docker compose -f backend/docker/docker-compose.yml up -d
+    echo "   Waiting for Redpanda to be ready..."
+    sleep 5
+
+    # Create topics
+    echo ""
+    echo "2️⃣  Creating Redpanda topics..."
+    bash backend/docker/setup-topics.sh
+fi
 
 # Start services in background
 echo ""
@@ -48,11 +58,16 @@ echo "   Starting GitHub Webhook Receiver (port 7000)..."
 python3 backend/webhooks/github_issues.py > logs/github_webhook.log 2>&1 &
 echo $! > logs/github_webhook.pid
 
-# Gateway Consumer
-echo "   Starting Gateway Consumer..."
-python3 backend/gateway/consumer.py > logs/gateway.log 2>&1 &
+# Gateway Consumers (one process per core unless GATEWAY_WORKERS is set)
+echo "   Starting Gateway Supervisor..."
+python3 backend/gateway/supervisor.py > logs/gateway.log 2>&1 &
 echo $! > logs/gateway.pid
 
+# Risk Aggregator
+echo "   Starting Risk Service (port 7400)..."
+python3 backend/risk/service.py > logs/risk.log 2>&1 &
+echo $! > logs/risk.pid
+
 sleep 2
 
 echo ""
@@ -63,6 +78,7 @@ echo "  - Redpanda Proxy:       http://localhost:8082"
 echo "  - Calendar API:         http://localhost:7300"
 echo "  - AgentKit Agent:       http://localhost:8000"
 echo "  - GitHub Webhook:       http://localhost:7000"
+echo "  - Risk Service:         http://localhost:7400"
 echo "  - Gateway Consumer:     Running"
 echo ""
 echo "Logs are in the logs/ directory"
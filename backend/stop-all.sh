@@ -30,9 +30,21 @@ if [ -f logs/gateway.pid ]; then
     rm logs/gateway.pid
 fi
 
-# Stop Redpanda
-echo "Stopping Redpanda..."
-docker compose -f backend/docker/docker-compose.yml down
+if [ -f logs/risk.pid ]; then
+    echo "Stopping Risk Service..."
+    kill $(cat logs/risk.pid) 2>/dev/null || true
+    rm logs/risk.pid
+fi
+
+if [ -f logs/broker.pid ]; then
+    echo "Stopping local broker..."
+    kill $(cat logs/broker.pid) 2>/dev/null || true
+    rm logs/broker.pid
+else
+    # Stop Redpanda
+    echo "Stopping Redpanda..."
+    docker compose -f backend/docker/docker-compose.yml down
+fi
 
 echo ""
 echo "✅ All services stopped"
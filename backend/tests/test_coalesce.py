@@ -0,0 +1,32 @@
+import asyncio
+
+from backend.webhooks.coalesce import Coalescer, merge
+
+
+def update(labels: list[str], n: int) -> dict:
+    return {"source": "github", "repo": "o/r", "issue_number": 7, "type": "issue_labeled", "event_id": f"e-{n}", "labels": labels}
+
+
+def test_merge_keeps_latest_label_set():
+    held = update(["bug", "p0"], 1)
+    held["trace"] = {"received": 1}
+    merged = merge(merge(held, update(["bug"], 2)), update(["bug", "docs"], 3))
+    assert merged["labels"] == ["bug", "docs"]
+    assert merged["event_id"] == "e-3"
+    assert merged["coalesced"] == 3
+    assert merged["trace"] == {"received": 1}
+
+
+def test_failed_merged_publish_is_counted():
+    async def scenario():
+        async def emit(event):
+            raise ConnectionError("broker down")
+
+        coalescer = Coalescer("github", emit, window_ms=10, max_delay_ms=10)
+        assert await coalescer.submit(update(["p0"], 1))
+        assert await coalescer.submit(update([], 2))
+        await coalescer.close()
+        return coalescer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["dropped"] == 1 and stats["flushed"] == 1 and stats["coalesced"] == 1
@@ -0,0 +1,74 @@
+import base64
+import json
+
+from backend.events import codec
+from backend.events.codec import BINARY_RECORDS, MAGIC, decode_records, decode_value, encode_value, produce_request
+from backend.events.schema import EVENT_V1, EVENT_V2
+
+EVENT = {
+    "event_id": "evt-1", "project_id": "alpha", "source": "github", "type": "issue_opened",
+    "repo": "o/r", "issue_number": 7, "labels": ["bug"], "coalesced": 2, "trace": {"received": 1},
+}
+
+
+def encode_with(schema, value: dict) -> bytes:
+    """A value as an older producer would have written it with `schema`"""
+    mask, listed, unlisted = schema.layout(tuple(value))
+    body = [mask, *(value[field] for field in listed)]
+    if unlisted:
+        body.append({key: value[key] for key in unlisted})
+    packed_with, data = codec._pack(body)
+    return bytes((MAGIC, packed_with, schema.schema_id)) + data
+
+
+def fetched(values: list[bytes | None]) -> list[dict]:
+    return [
+        {"topic": "issues", "partition": 0, "offset": n, "key": base64.b64encode(b'"alpha"').decode(),
+         "value": None if value is None else base64.b64encode(value).decode()}
+        for n, value in enumerate(values)
+    ]
+
+
+def test_binary_round_trip_keeps_unlisted_fields():
+    value = dict(EVENT, extra={"new": True})
+    data = encode_value("issues", value)
+    assert data[0] == MAGIC and data[2] == EVENT_V2.schema_id
+    assert decode_value(data) == value
+
+
+def test_records_from_older_schema_versions_decode():
+    v1 = encode_with(EVENT_V1, EVENT)
+    assert v1[2] == EVENT_V1.schema_id
+    # coalesced and trace are not in v1, so they travel by name
+    assert decode_value(v1) == EVENT
+    assert decode_value(encode_with(EVENT_V2, EVENT)) == EVENT
+
+
+def test_json_codec_fallback_round_trips(monkeypatch):
+    monkeypatch.setattr(codec, "msgpack", None)
+    data = encode_value("issues", EVENT)
+    assert data[1] == codec.CODEC_JSON
+    assert decode_value(data) == EVENT
+
+
+def test_nul_byte_tells_json_from_binary():
+    text = json.dumps(EVENT).encode()
+    assert text[0] != MAGIC
+    assert decode_value(text) == EVENT
+    assert decode_value(encode_value("issues", EVENT)) == EVENT
+    # Topics without a schema and non-dict values stay JSON text
+    assert encode_value("scratch", EVENT) == codec.dumps(EVENT)
+    assert encode_value("issues", [1, 2]) == b"[1,2]"
+    assert decode_value(b"") is None
+
+
+def test_decode_records_mixes_formats_and_nulls_bad_values():
+    content_type, body = produce_request("issues", [{"key": "alpha", "value": EVENT}], encoding="binary")
+    assert content_type == BINARY_RECORDS
+    produced = json.loads(body)["records"][0]
+    binary = base64.b64decode(produced["value"])
+    unknown_schema = bytes((MAGIC, codec.CODEC_JSON, 255)) + b"[0]"
+
+    records = decode_records(fetched([binary, json.dumps(EVENT).encode(), bytes((MAGIC,)), unknown_schema, None]))
+    assert [r["value"] for r in records] == [EVENT, EVENT, None, None, None]
+    assert {r["key"] for r in records} == {"alpha"}
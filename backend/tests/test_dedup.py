@@ -0,0 +1,27 @@
+import asyncio
+
+from backend.webhooks.dedup import DedupCache
+
+
+def test_shared_table_claims_across_workers(tmp_path):
+    path = str(tmp_path / "dedup.db")
+
+    async def scenario():
+        first, second = DedupCache(path=path), DedupCache(path=path)
+        assert not await first.seen_async("k")
+        assert await second.seen_async("k")
+        await first.forget_async("k")
+        assert not await first.seen_async("k")
+        return first.stats(), second.stats()
+
+    first, second = asyncio.run(scenario())
+    assert first["misses"] == 2
+    assert second["hits"] == 1 and second["misses"] == 0
+
+
+def test_memory_only_cache_matches_sync_path():
+    cache = DedupCache()
+    assert not asyncio.run(cache.seen_async("k"))
+    assert cache.seen("k")
+    cache.forget("k")
+    assert not cache.seen("k")
@@ -0,0 +1,82 @@
+import threading
+
+from backend.gateway import consumer
+from backend.gateway.offsets import OffsetTracker
+
+
+class Commits:
+    def __init__(self, ok: bool = True):
+        self.ok = ok
+        self.sent: list[list[dict]] = []
+
+    def __call__(self, offsets: list[dict]) -> bool:
+        self.sent.append(offsets)
+        return self.ok
+
+
+def tracked(commits: Commits, offsets=range(5), **kwargs) -> OffsetTracker:
+    tracker = OffsetTracker(commits, commit_every=kwargs.get("commit_every", 1000), commit_interval=10**9)
+    for offset in offsets:
+        tracker.track("issues", 0, offset)
+    return tracker
+
+
+def test_out_of_order_completion_commits_contiguous_prefix():
+    tracker = tracked(Commits())
+    for offset in (2, 1, 4):
+        tracker.complete("issues", 0, offset)
+    assert tracker.pending() == {}
+    tracker.complete("issues", 0, 0)
+    assert tracker.pending() == {("issues", 0): 3}
+    tracker.complete("issues", 0, 3)
+    assert tracker.pending() == {("issues", 0): 5}
+    assert tracker.backlog() == 0
+
+
+def test_held_back_offset_blocks_commit_and_counts_as_backlog():
+    commits = Commits()
+    tracker = tracked(commits, commit_every=1)
+    for offset in (0, 2, 3, 4):
+        tracker.complete("issues", 0, offset)
+    assert tracker.maybe_commit()
+    assert commits.sent[-1] == [{"topic": "issues", "partition": 0, "offset": 1}]
+    assert tracker.backlog() == 4
+    # Nothing new is committable until offset 1 is done
+    assert not tracker.maybe_commit()
+    tracker.complete("issues", 0, 1)
+    assert tracker.maybe_commit()
+    assert commits.sent[-1] == [{"topic": "issues", "partition": 0, "offset": 5}]
+
+
+def test_forced_commit_ignores_thresholds_and_retries_after_failure():
+    commits = Commits(ok=False)
+    tracker = tracked(commits, offsets=range(2))
+    tracker.complete("issues", 0, 0)
+    assert not tracker.maybe_commit()
+    assert commits.sent == []
+    assert not tracker.maybe_commit(force=True)
+    assert tracker.pending() == {("issues", 0): 1}
+    commits.ok = True
+    assert tracker.maybe_commit(force=True)
+    assert tracker.pending() == {}
+    assert not tracker.maybe_commit(force=True)
+    assert len(commits.sent) == 2
+
+
+def test_unacknowledged_record_is_retried_until_handled(monkeypatch):
+    results = iter([False, False, True])
+    monkeypatch.setattr(consumer, "handle_event", lambda event: next(results))
+    monkeypatch.setattr(consumer, "backoff_delay", lambda attempt, **kwargs: 0)
+    tracker = tracked(Commits(), offsets=[7])
+    consumer.handle_record({"topic": "issues", "partition": 0, "offset": 7, "value": {"event_id": "e"}}, tracker)
+    assert tracker.pending() == {("issues", 0): 8}
+
+
+def test_unacknowledged_record_is_held_back_when_stopping(monkeypatch):
+    monkeypatch.setattr(consumer, "handle_event", lambda event: False)
+    stopping = threading.Event()
+    stopping.set()
+    tracker = tracked(Commits(), offsets=[7])
+    consumer.handle_record({"topic": "issues", "partition": 0, "offset": 7, "value": {"event_id": "e"}}, tracker, stopping)
+    assert tracker.pending() == {}
+    assert tracker.backlog() == 1
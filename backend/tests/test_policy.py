@@ -0,0 +1,49 @@
+import json
+
+from backend.agentkit.policy import PolicyEngine, PolicyError
+
+
+def write_rules(path, target: str) -> None:
+    path.write_text(json.dumps({"rules": [
+        {"name": "frontend", "priority": 90, "when": {"labels": ["frontend"]},
+         "then": {"action": "assign_owner", "target": target, "rationale": "frontend"}},
+    ]}))
+
+
+def test_evaluate_many_reports_errors_per_event(tmp_path):
+    rules = tmp_path / "rules.json"
+    write_rules(rules, "owner:alice")
+    engine = PolicyEngine(str(rules), reload_interval=0)
+
+    results = engine.evaluate_many([
+        {"event_id": "e1", "labels": ["frontend"]},
+        {"event_id": "e2", "labels": ["docs"]},
+        "not an event",
+        {"event_id": "e3", "labels": ["frontend"]},
+    ])
+
+    assert [r["target"] for r in (results[0], results[3])] == ["owner:alice", "owner:alice"]
+    assert isinstance(results[1], PolicyError)
+    assert isinstance(results[2], Exception)
+
+
+def test_evaluate_many_uses_one_snapshot(tmp_path, monkeypatch):
+    rules = tmp_path / "rules.json"
+    write_rules(rules, "owner:alice")
+    engine = PolicyEngine(str(rules), reload_interval=0)
+    policy = engine.policy
+    decide = PolicyEngine._decide
+
+    def decide_then_edit(snapshot, event):
+        # The rule file changes mid-batch; the rest of the batch must not see it
+        write_rules(rules, "owner:bob")
+        engine._mtime = -1
+        assert engine.maybe_reload()
+        assert snapshot is policy
+        return decide(snapshot, event)
+
+    monkeypatch.setattr(PolicyEngine, "_decide", staticmethod(decide_then_edit))
+    results = engine.evaluate_many([{"labels": ["frontend"]}] * 3)
+    assert [r["target"] for r in results] == ["owner:alice"] * 3
+    monkeypatch.undo()
+    assert engine.evaluate({"labels": ["frontend"]})["target"] == "owner:bob"
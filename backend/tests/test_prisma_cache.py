@@ -0,0 +1,32 @@
+import sqlite3
+
+from backend.common.prisma_cache import PrismaCache
+
+
+def employees(tmp_path) -> str:
+    path = str(tmp_path / "app.db")
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE "Employee" (id TEXT, name TEXT, email TEXT, skills TEXT, currentProjects TEXT, updatedAt TEXT)')
+    db.executemany('INSERT INTO "Employee" VALUES (?, ?, ?, ?, ?, ?)', [
+        ("e1", "Alice Smith", "Alice.Smith@example.com", '["python"]', "[]", "1"),
+        ("e2", "Bob", "bob@example.com", "[]", "[]", "1"),
+    ])
+    db.commit()
+    db.close()
+    return path
+
+
+def test_find_employee_ignores_case_on_every_match(tmp_path):
+    cache = PrismaCache(path=employees(tmp_path), poll_interval=3600)
+    for handle in ("alice.smith@example.com", "ALICE.SMITH@EXAMPLE.COM", "alice.smith", "Alice.Smith", "alice smith"):
+        employee = cache.find_employee(handle)
+        assert employee is not None and employee["id"] == "e1", handle
+    assert cache.find_employee("BOB")["skills"] == []
+    assert cache.find_employee("carol") is None
+
+
+def test_handle_spellings_share_one_cached_row(tmp_path):
+    cache = PrismaCache(path=employees(tmp_path), poll_interval=3600)
+    assert cache.find_employee("Alice.Smith")["id"] == "e1"
+    assert cache.find_employee(" alice.smith ")["id"] == "e1"
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
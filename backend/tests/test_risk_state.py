@@ -0,0 +1,49 @@
+from backend.risk.state import ProjectRisk
+
+
+def make_state() -> ProjectRisk:
+    return ProjectRisk("p1", tumbling_seconds=60, sliding_seconds=60, buckets=6)
+
+
+def test_view_advances_windows_without_changing_state():
+    state = make_state()
+    state.apply({"risk_delta": 1.0, "ack": True, "ts": 1000.0})
+    before = state.to_dict()
+
+    view = state.view(now=1130.0)
+
+    assert view["tumbling"]["window_start"] == 1080.0
+    assert view["tumbling"]["sum"] == 0.0
+    assert view["tumbling"]["previous_sum"] == 0.0
+    assert view["sliding"]["sum"] == 0.0
+    assert state.to_dict() == before
+
+
+def test_apply_after_view_with_older_ts_keeps_windows_ordered():
+    state = make_state()
+    state.apply({"risk_delta": 1.0, "ack": True, "ts": 1000.0})
+    state.view(now=1130.0)
+    state.apply({"risk_delta": 2.0, "ack": True, "ts": 1010.0})
+
+    assert state.window_start == 960.0
+    assert state.window_sum == 3.0
+    assert [start for start, _ in state.slots] == sorted(start for start, _ in state.slots)
+    assert state.view(now=1010.0)["sliding"]["sum"] == 3.0
+
+    state.apply({"risk_delta": 4.0, "ack": False, "ts": 1075.0})
+    view = state.view(now=1075.0)
+    assert view["tumbling"]["sum"] == 4.0
+    assert view["tumbling"]["previous_sum"] == 3.0
+    assert view["sliding"]["sum"] == 6.0
+
+
+def test_view_matches_folded_state():
+    state = make_state()
+    for ts in (1000.0, 1015.0, 1030.0, 1055.0):
+        state.apply({"risk_delta": 1.0, "ack": True, "ts": ts})
+    view = state.view(now=1085.0)
+
+    state.apply({"risk_delta": 0.0, "ack": True, "ts": 1085.0})
+    folded = state.view(now=1085.0)
+    assert view["tumbling"] == folded["tumbling"]
+    assert view["sliding"] == folded["sliding"]
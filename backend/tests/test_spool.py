@@ -0,0 +1,56 @@
+import asyncio
+
+from backend.webhooks.spool import Spool
+
+
+def test_drainer_adopts_spools_of_departed_workers(tmp_path):
+    async def scenario():
+        # Three workers spool while the broker is down, then only one comes back
+        workers = [Spool(str(tmp_path), "github", fsync_ms=0) for _ in range(3)]
+        assert [w.root.name for w in workers] == ["github", "github-1", "github-2"]
+        for n, worker in enumerate(workers):
+            await worker.append("issues", f"key-{n}", {"event_id": f"e-{n}"})
+        await workers[1].append("issues", "key-1", {"event_id": "e-1b"})
+        for worker in workers:
+            await worker.close()
+
+        replayed = []
+        survivor = Spool(str(tmp_path), "github", fsync_ms=0)
+
+        async def replay(records):
+            replayed.extend(record["value"]["event_id"] for record in records)
+
+        survivor._replay = replay
+        survivor.start()
+        assert survivor.waiting() == 4
+        assert survivor.should_spool("issues", "key-1")
+        for _ in range(100):
+            if not survivor.waiting():
+                break
+            await asyncio.sleep(0.01)
+        stats = survivor.stats()
+        await survivor.close()
+        return replayed, stats
+
+    replayed, stats = asyncio.run(scenario())
+    assert sorted(replayed) == ["e-0", "e-1", "e-1b", "e-2"]
+    assert replayed.index("e-1") < replayed.index("e-1b")
+    assert replayed[-1] == "e-0"
+    assert stats["adopted"] == [] and stats["records"] == 0
+
+
+def test_live_workers_spools_are_left_alone(tmp_path):
+    async def scenario():
+        live = Spool(str(tmp_path), "jira", fsync_ms=0)
+        await live.append("issues", "k", {"event_id": "e"})
+        other = Spool(str(tmp_path), "jira", fsync_ms=0)
+        other._replay = lambda records: asyncio.sleep(0)
+        other.start()
+        adopted = other.stats()["adopted"]
+        await other.close()
+        await live.close()
+        return adopted, live.records
+
+    adopted, records = asyncio.run(scenario())
+    assert adopted == []
+    assert records == 1
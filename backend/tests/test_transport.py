@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from backend.common.transport import AsyncTransport, CircuitBreaker, CircuitOpenError, Transport
+
+URL = "http://calendar.test/api/nudges"
+
+
+def half_open(transport) -> CircuitBreaker:
+    """Trip the endpoint's breaker so the next call is its half-open trial"""
+    breaker = transport.breaker(URL)
+    breaker.reset_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_cancelled_trial_reopens_breaker():
+    async def hang(request):
+        await asyncio.sleep(60)
+
+    async def scenario():
+        transport = AsyncTransport("http://calendar.test", retries=0)
+        transport.client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+        breaker = half_open(transport)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(transport.post(URL, json={}), 0.05)
+            assert breaker.state == "open"
+            breaker.reset_timeout = 30
+            with pytest.raises(CircuitOpenError):
+                await transport.post(URL, json={})
+        finally:
+            await transport.close()
+
+    asyncio.run(scenario())
+
+
+def test_unexpected_error_in_trial_reopens_breaker(monkeypatch):
+    transport = Transport("http://calendar.test", retries=0)
+    breaker = half_open(transport)
+
+    def broken(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("connection broken mid-body")
+
+    monkeypatch.setattr(transport.session, "request", broken)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        transport.post(URL, json={})
+    assert breaker.state == "open"
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+
+
+def test_cancellation_does_not_trip_closed_breaker():
+    async def hang(request):
+        await asyncio.sleep(60)
+
+    async def scenario():
+        transport = AsyncTransport("http://calendar.test", retries=0)
+        transport.client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+        breaker = transport.breaker(URL)
+        try:
+            for _ in range(breaker.failure_threshold + 1):
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(transport.post(URL, json={}), 0.01)
+            assert breaker.state == "closed"
+        finally:
+            await transport.close()
+
+    asyncio.run(scenario())
+
+
+def test_breakers_keyed_by_normalized_endpoint():
+    transport = Transport("http://calendar.test")
+    meeting = transport.breaker("http://calendar.test/api/meetings/42?expand=1")
+    assert transport.breaker("http://calendar.test/api/meetings/43") is meeting
+    assert transport.breaker("http://calendar.test/api/meetings/0f3c2a9be1d44c55") is meeting
+    assert transport.breaker("http://calendar.test/api/meetings") is not meeting
+    assert transport.breaker("http://other.test/api/meetings/42") is not meeting
+
+
+def test_breaker_count_is_bounded(monkeypatch):
+    monkeypatch.setattr("backend.common.transport.BREAKER_MAX_ENDPOINTS", 2)
+    transport = Transport("http://calendar.test")
+    first = transport.breaker("http://calendar.test/a")
+    transport.breaker("http://calendar.test/b")
+    transport.breaker("http://calendar.test/c")
+    assert len(transport._breakers) == 2
+    assert transport.breaker("http://calendar.test/a") is not first
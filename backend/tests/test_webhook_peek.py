@@ -0,0 +1,31 @@
+import json
+
+from backend.bench.payloads import github_payload
+from backend.webhooks.pipeline import peek_pattern, peek_string
+from backend.webhooks.sources import GITHUB_ISSUES, JIRA_ISSUES
+
+ACTION = peek_pattern("action")
+
+
+def test_peeks_leading_top_level_field():
+    assert peek_string(b'{"action": "closed", "issue": {}}', ACTION) == "closed"
+    assert peek_string(b' {\n "zen": "x", "hook_id": 12, "ok": true,\n "action":"opened"}', ACTION) == "opened"
+
+
+def test_ignores_nested_or_unprovable_matches():
+    assert peek_string(b'{"issue": {"action": "closed"}, "action": "opened"}', ACTION) is None
+    assert peek_string(b'{"items": [{"action": "closed"}], "action": "opened"}', ACTION) is None
+    assert peek_string(b'{"note": "say \\"hi\\"", "action": "closed"}', ACTION) is None
+    assert peek_string(b'{"note": "\\"action\\": \\"closed\\"", "action": "opened"}', ACTION) is None
+
+
+def test_nested_discriminator_does_not_drop_relevant_delivery():
+    payload = {"changes": {"action": "closed"}, **github_payload("small", action="opened")}
+    event, reason, value = GITHUB_ISSUES.parse(json.dumps(payload).encode(), {"project_id": "alpha"})
+    assert event is not None, (reason, value)
+
+
+def test_ignored_delivery_still_rejected():
+    body = json.dumps({"timestamp": 1, "webhookEvent": "jira:worklog_updated", "issue": {}}).encode()
+    event, reason, value = JIRA_ISSUES.parse(body, {"project_id": "alpha"})
+    assert event is None and value == "jira:worklog_updated"
@@ -0,0 +1,181 @@
+"""
+Webhook Admission Control
+Bounded in-flight publishing per receiver, shedding low-priority deliveries first
+
+Every delivery that gets past parsing and dedup holds a slot until its
+record is acknowledged by the broker. A receiver holds at most
+WEBHOOK_MAX_IN_FLIGHT slots, and each priority class may only use a share of
+them, so as the broker slows down updates are held back first, then new
+issues, and urgent new issues last:
+
+    0  urgent new issue (opened/created with a p0-style label or priority)    100%
+    1  new issue, or an urgent update                                          75%
+    2  everything else (labeled, issue_updated, ...)                           50%
+
+A delivery without a free slot waits in a priority queue of at most
+WEBHOOK_MAX_QUEUED entries for up to WEBHOOK_QUEUE_TIMEOUT seconds. When the
+queue is full, a more important arrival evicts the least important waiter
+(429); an arrival that can't get in, or times out waiting, gets 503. Both
+carry Retry-After, lower priorities being asked to wait longer. Queue wait
+and produce wait are both capped, so latency at the edge stays bounded
+instead of growing with the backlog.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+from dotenv import load_dotenv
+
+from backend.common.metrics import counter, gauge
+
+load_dotenv()
+
+MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "256"))
+MAX_QUEUED = int(os.getenv("WEBHOOK_MAX_QUEUED", "256"))
+QUEUE_TIMEOUT = float(os.getenv("WEBHOOK_QUEUE_TIMEOUT", "1"))
+PRODUCE_TIMEOUT = float(os.getenv("WEBHOOK_PRODUCE_TIMEOUT", "2"))
+# Seconds suggested to the sender, multiplied by (1 + priority)
+RETRY_AFTER = int(os.getenv("WEBHOOK_RETRY_AFTER", "5"))
+
+SHARES = (1.0, 0.75, 0.5)
+URGENT_LABELS = {"p0", "critical", "urgent", "security", "sev1"}
+URGENT_PRIORITIES = {"p0", "highest", "blocker", "critical"}
+NEW_ISSUE_TYPES = {"issue_opened", "issue_reopened", "issue_created"}
+
+IN_FLIGHT = gauge("webhook_in_flight", "Deliveries waiting for the broker to acknowledge them", ("source",))
+QUEUED = gauge("webhook_queued", "Deliveries waiting for an in-flight slot", ("source",))
+SHED = counter("webhook_shed_total", "Deliveries turned away by admission control", ("source", "priority", "status"))
+
+
+class Overloaded(Exception):
+    """Raised when a delivery is not admitted; carries the reply status and Retry-After seconds"""
+
+    def __init__(self, status: int, retry_after: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def priority_of(event: dict) -> int:
+    """0 (most important) to 2 for a normalized event"""
+    labels = {str(label).lower() for label in event.get("labels") or ()}
+    urgent = bool(labels & URGENT_LABELS) or str(event.get("priority") or "").lower() in URGENT_PRIORITIES
+    new = event.get("type") in NEW_ISSUE_TYPES
+    if new and urgent:
+        return 0
+    if new or urgent:
+        return 1
+    return 2
+
+
+class AdmissionController:
+    """
+    In-flight slots and the priority wait queue for one receiver
+
+    Used from the event loop only, so the counters need no lock.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        limit: int = MAX_IN_FLIGHT,
+        max_queued: int = MAX_QUEUED,
+        queue_timeout: float = QUEUE_TIMEOUT,
+        shares: tuple = SHARES,
+    ):
+        self.source = source
+        self.limit = max(1, limit)
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        # Non-increasing with priority number, so if the queue head can't start nobody behind it can
+        self.ceilings = tuple(max(1, int(self.limit * share)) for share in shares)
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        # [priority, arrival, future], most important and oldest first
+        self._waiting: list[list] = []
+        self._arrivals = itertools.count()
+        IN_FLIGHT.labels(source).set_function(lambda: self.in_flight)
+        QUEUED.labels(source).set_function(lambda: len(self._waiting))
+
+    def _reject(self, priority: int, status: int, reason: str) -> Overloaded:
+        self.shed += 1
+        SHED.labels(self.source, str(priority), str(status)).inc()
+        return Overloaded(
+            status, RETRY_AFTER * (1 + priority), f"{reason} ({self.in_flight}/{self.limit} in flight)"
+        )
+
+    async def acquire(self, priority: int) -> None:
+        """Take a slot for a delivery of this priority, waiting briefly; raises Overloaded"""
+        priority = min(max(priority, 0), len(self.ceilings) - 1)
+        if self.in_flight < self.ceilings[priority]:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiting) >= self.max_queued:
+            worst = max(self._waiting, key=lambda entry: (entry[0], entry[1]), default=None)
+            if worst is None or worst[0] <= priority:
+                raise self._reject(priority, 503, "Receiver queue full")
+            self._remove(worst)
+            worst[2].set_exception(self._reject(worst[0], 429, "Shed for higher-priority deliveries"))
+
+        entry = [priority, next(self._arrivals), asyncio.get_running_loop().create_future()]
+        heapq.heappush(self._waiting, entry)
+        try:
+            await asyncio.wait_for(entry[2], self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise self._reject(priority, 503, f"No slot within {self.queue_timeout:g}s")
+        except BaseException:
+            # Evicted (the Overloaded is re-raised as is) or the request was cancelled
+            future = entry[2]
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Granted a slot just as the request went away
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free a slot and hand it to the most important waiter that may use it"""
+        self.in_flight -= 1
+        while self._waiting:
+            priority, _, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            if self.in_flight >= self.ceilings[priority]:
+                break
+            heapq.heappop(self._waiting)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _remove(self, entry: list) -> None:
+        try:
+            self._waiting.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiting)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiting),
+            "limit": self.limit,
+            "ceilings": list(self.ceilings),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+_controllers: dict[str, AdmissionController] = {}
+
+
+def get_admission(source: str) -> AdmissionController:
+    """Return this process's controller for a webhook source"""
+    controller = _controllers.get(source)
+    if controller is None:
+        controller = _controllers[source] = AdmissionController(source)
+    return controller
@@ -0,0 +1,204 @@
+"""
+Update Coalescing
+Holds bursts of updates to one issue and publishes them as a single merged event
+
+Bulk edits arrive as storms: GitHub sends one `labeled` delivery per label,
+Jira one `issue_updated` per field change. Updates are held per issue
+(Jira issue_key, or repo#issue_number) until the issue has been quiet for
+COALESCE_WINDOW_MS, and never longer than COALESCE_MAX_DELAY_MS after the
+first one. The merged event carries the latest delivery's fields, labels
+included (every sender reports the issue's full label set, so a label
+removed mid-burst stays removed), and `coalesced`: how many deliveries it
+stands for.
+
+Opened/created/closed events are never held, but anything held for their
+issue is published first so the order per issue is kept. At most
+COALESCE_MAX_PENDING issues are held; a new one beyond that flushes the
+oldest. Held updates are acknowledged to the sender before they are
+published, so a crash can lose at most one window of them; shutdown
+flushes everything. A merged event goes out through the normal publish, so
+a broker failure sends it to the spool; only when there is no spool (or the
+spool cannot be written) is it dropped, counted in
+webhook_coalesce_dropped_total and in `dropped` of stats().
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter, gauge
+
+load_dotenv()
+
+# 0 disables coalescing
+COALESCE_WINDOW_MS = float(os.getenv("WEBHOOK_COALESCE_WINDOW_MS", "2000"))
+COALESCE_MAX_DELAY_MS = float(os.getenv("WEBHOOK_COALESCE_MAX_DELAY_MS", "10000"))
+COALESCE_MAX_PENDING = int(os.getenv("WEBHOOK_COALESCE_MAX_PENDING", "10000"))
+
+COALESCE_TYPES = {"issue_labeled", "issue_updated"}
+
+log = get_logger("coalesce")
+
+COALESCED = counter("webhook_coalesced_total", "Updates merged into another event instead of published", ("source",))
+FLUSHES = counter("webhook_coalesce_flushes_total", "Merged events published, by why they were released", ("source", "reason"))
+DROPPED = counter("webhook_coalesce_dropped_total", "Merged events that could not be published", ("source",))
+PENDING = gauge("webhook_coalesce_pending", "Issues with updates being held", ("source",))
+
+
+def coalesce_key(event: dict) -> str | None:
+    """The issue an event is about, or None when it cannot be told"""
+    if event.get("issue_key"):
+        return f"{event.get('source')}:{event['issue_key']}"
+    if event.get("repo") and event.get("issue_number") is not None:
+        return f"{event.get('source')}:{event['repo']}#{event['issue_number']}"
+    return None
+
+
+def merge(held: dict, event: dict) -> dict:
+    """The latest event's fields and current labels, with a count of merged deliveries"""
+    merged = dict(event)
+    merged["coalesced"] = held.get("coalesced", 1) + 1
+    if "trace" in held:
+        # Timed from the first delivery, so the hold counts toward its latency
+        merged["trace"] = held["trace"]
+    return merged
+
+
+class Held:
+    """Updates held for one issue"""
+
+    def __init__(self, event: dict, now: float):
+        self.event = event
+        self.first_at = now
+        self.last_at = now
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class Coalescer:
+    """
+    Per-issue hold buffer for one receiver, publishing through `emit`
+
+    Used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        emit: Callable[[dict], Awaitable],
+        window_ms: float = COALESCE_WINDOW_MS,
+        max_delay_ms: float = COALESCE_MAX_DELAY_MS,
+        max_pending: int = COALESCE_MAX_PENDING,
+    ):
+        self.source = source
+        self.emit = emit
+        self.window = window_ms / 1000
+        self.max_delay = max(max_delay_ms, window_ms) / 1000
+        self.max_pending = max(1, max_pending)
+        # Oldest first, so overflow releases the issue held longest
+        self._held: OrderedDict[str, Held] = OrderedDict()
+        self._emitting: set[asyncio.Task] = set()
+        self.coalesced = 0
+        self.flushed = 0
+        self.dropped = 0
+        PENDING.labels(source).set_function(lambda: len(self._held))
+
+    async def submit(self, event: dict) -> bool:
+        """
+        Hold an update, merging it with earlier ones for its issue
+
+        Returns:
+            True if the event is held (it will go out merged), False if the
+            caller should publish it now
+        """
+        key = coalesce_key(event)
+        if key is None:
+            return False
+        if event.get("type") not in COALESCE_TYPES:
+            if key in self._held:
+                await self._release(key, "passthrough")
+            return False
+
+        now = time.monotonic()
+        held = self._held.get(key)
+        if held is not None:
+            held.event = merge(held.event, event)
+            held.last_at = now
+            self.coalesced += 1
+            COALESCED.labels(self.source).inc()
+            return True
+
+        if len(self._held) >= self.max_pending:
+            oldest = next(iter(self._held))
+            self._spawn(self._release(oldest, "overflow"))
+        held = self._held[key] = Held(event, now)
+        held.timer = asyncio.get_running_loop().call_later(self.window, self._due, key)
+        return True
+
+    def _due(self, key: str) -> None:
+        held = self._held.get(key)
+        if held is None:
+            return
+        now = time.monotonic()
+        quiet_at = held.last_at + self.window
+        deadline = held.first_at + self.max_delay
+        if now < quiet_at and now < deadline:
+            held.timer = asyncio.get_running_loop().call_later(min(quiet_at, deadline) - now, self._due, key)
+            return
+        self._spawn(self._release(key, "quiet" if now >= quiet_at else "max_delay"))
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._emitting.add(task)
+        task.add_done_callback(self._emitting.discard)
+
+    async def _release(self, key: str, reason: str) -> None:
+        held = self._held.pop(key, None)
+        if held is None:
+            return
+        if held.timer is not None:
+            held.timer.cancel()
+        self.flushed += 1
+        FLUSHES.labels(self.source, reason).inc()
+        try:
+            await self.emit(held.event)
+        except Exception as e:
+            # Already acknowledged to the sender, so there is no one left to retry it
+            self.dropped += 1
+            DROPPED.labels(self.source).inc()
+            log.error(
+                "Dropped merged event %s for %s (%d deliveries): %s",
+                held.event.get("event_id"), key, held.event.get("coalesced", 1), e,
+            )
+
+    async def close(self) -> None:
+        """Publish everything held and wait for in-flight releases"""
+        for key in list(self._held):
+            await self._release(key, "shutdown")
+        if self._emitting:
+            await asyncio.gather(*self._emitting, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"pending": len(self._held), "coalesced": self.coalesced, "flushed": self.flushed, "dropped": self.dropped}
+
+
+_coalescers: dict[str, Coalescer] = {}
+
+
+def get_coalescer(source: str, emit: Callable[[dict], Awaitable]) -> Coalescer | None:
+    """Return this process's coalescer for a webhook source (created with `emit`), or None when disabled"""
+    if COALESCE_WINDOW_MS <= 0:
+        return None
+    coalescer = _coalescers.get(source)
+    if coalescer is None:
+        coalescer = _coalescers[source] = Coalescer(source, emit)
+    return coalescer
+
+
+async def close_coalescers() -> None:
+    """Flush every held update (call on app shutdown, before close_spools)"""
+    for coalescer in _coalescers.values():
+        await coalescer.close()
+    _coalescers.clear()
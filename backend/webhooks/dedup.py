@@ -0,0 +1,170 @@
+"""
+Delivery Dedup Cache
+TTL-bounded LRU of recently published events, optionally shared across workers via SQLite
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEDUP_TTL = float(os.getenv("DEDUP_TTL_SECONDS", "600"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))
+# Path to a SQLite file shared by every uvicorn worker on the host; empty keeps state per process
+DEDUP_DB = os.getenv("DEDUP_DB", "")
+
+# Fields that change on every redelivery without changing what the event means
+VOLATILE_FIELDS = {"event_id", "updated_at", "trace"}
+
+
+def fingerprint(event: dict) -> str:
+    """Dedup key for a normalized event: its id plus a hash of its content"""
+    content = {k: v for k, v in event.items() if k not in VOLATILE_FIELDS}
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{event.get('event_id')}:{digest[:32]}"
+
+
+class DedupCache:
+    """
+    Remembers event fingerprints for `ttl` seconds
+
+    An in-process LRU capped at `max_entries` answers repeat lookups without
+    I/O. With a `path`, fingerprints are also written to a SQLite table so a
+    delivery seen by one worker is recognised by the others. Those writes can
+    wait on other workers' locks, so they all run on one writer thread; the
+    event loop uses seen_async()/forget_async() and never blocks on them.
+    """
+
+    def __init__(self, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES, path: str = DEDUP_DB):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._writer: ThreadPoolExecutor | None = None
+        self._writes = 0
+        if path:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedup-db")
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS seen_expires ON seen (expires_at)")
+
+    def seen(self, key: str) -> bool:
+        """
+        Check-and-record a fingerprint
+
+        Returns:
+            True if the key was already recorded and has not expired (a duplicate),
+            False if it is new (it is recorded as of now)
+        """
+        now = time.time()
+        if self._recent(key, now):
+            return True
+        duplicate = self._db is not None and not self._writer.submit(self._claim, key, now).result()
+        return self._record(key, now, duplicate)
+
+    async def seen_async(self, key: str) -> bool:
+        """seen() for the event loop: the shared-table write is awaited, not waited on"""
+        now = time.time()
+        if self._recent(key, now):
+            return True
+        duplicate = False
+        if self._db is not None:
+            claimed = await asyncio.get_running_loop().run_in_executor(self._writer, self._claim, key, now)
+            duplicate = not claimed
+        return self._record(key, now, duplicate)
+
+    def forget(self, key: str) -> None:
+        """Drop a fingerprint, e.g. when publishing the event failed and the sender will retry"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._db is not None:
+            self._writer.submit(self._delete, key).result()
+
+    async def forget_async(self, key: str) -> None:
+        """forget() for the event loop"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self._delete, key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _recent(self, key: str, now: float) -> bool:
+        """True, counted as a hit, if this process recorded the key and it has not expired"""
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None or expires_at <= now:
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def _record(self, key: str, now: float, duplicate: bool) -> bool:
+        with self._lock:
+            self._remember(key, now + self.ttl)
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return duplicate
+
+    def _remember(self, key: str, expires_at: float) -> None:
+        self._entries[key] = expires_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _claim(self, key: str, now: float) -> bool:
+        """Insert the key into the shared table; False if another worker holds a live entry (writer thread)"""
+        cursor = self._db.execute(
+            "INSERT INTO seen (key, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at WHERE seen.expires_at <= ?",
+            (key, now + self.ttl, now),
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._prune(now)
+        return cursor.rowcount == 1
+
+    def _delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM seen WHERE key = ?", (key,))
+
+    def _prune(self, now: float) -> None:
+        """Bound the shared table: drop expired rows, then the oldest beyond max_entries"""
+        self._db.execute("DELETE FROM seen WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM seen WHERE key IN (SELECT key FROM seen ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+_dedup: DedupCache | None = None
+
+
+def get_dedup() -> DedupCache:
+    """Return the process-wide dedup cache, creating it on first use"""
+    global _dedup
+    if _dedup is None:
+        _dedup = DedupCache()
+    return _dedup
@@ -0,0 +1,35 @@
+"""
+GitLab Issues webhook receiver
+Receives GitLab issue webhooks and publishes normalized events to Redpanda
+"""
+import hmac
+import os
+import sys
+from pathlib import Path
+from fastapi import Request
+from dotenv import load_dotenv
+
+if __package__ in (None, ""):
+    # Allow running as a script: python3 backend/<service>/<module>.py
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.webhooks.pipeline import create_receiver
+from backend.webhooks.sources import GITLAB_ISSUES
+
+load_dotenv()
+
+GITLAB_TOKEN = os.getenv("GITLAB_WEBHOOK_TOKEN", "")
+
+
+def authenticate(request: Request, body: bytes) -> bool:
+    """Secret token check, when a token is configured"""
+    return not GITLAB_TOKEN or hmac.compare_digest(request.headers.get("x-gitlab-token") or "", GITLAB_TOKEN)
+
+
+app = create_receiver(GITLAB_ISSUES, "gitlab-webhook", "/gitlab/issues", authenticate=authenticate)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.getenv("GITLAB_WEBHOOK_PORT", "7002"))
+    uvicorn.run(app, host="0.0.0.0", port=port)
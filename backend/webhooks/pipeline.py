@@ -0,0 +1,410 @@
+"""
+Webhook Normalization Pipeline
+Single-parse ingest of webhook bodies through declarative, compiled field mappings
+
+A source is declared once as a `Source`: which top-level field decides
+whether a delivery is relevant, and how each field of our event schema is
+read from the payload. The mapping is compiled into a list of extractor
+closures when the module is imported, so a delivery costs one JSON decode
+and one pass over the mapping.
+
+Mapping values:
+    "issue.fields.summary"              dotted path (None when any step is missing)
+    Path("issue.body", default="", transform=fn)
+    Each("issue.labels", "name")        list of a field from every item
+    Const("github")                     fixed value
+    Context("project_id")               value passed in by the receiver
+    fn(payload, context)                anything else
+
+`create_receiver` turns a source into its FastAPI app, so a receiver module
+declares only how deliveries are authenticated and where they arrive.
+"""
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+from fastapi import FastAPI, HTTPException, Request
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter, instrument
+from backend.common.transport import close_async_transports
+from backend.events.producer import close_producer, get_producer
+from backend.events.trace import now_ms, stamp
+from backend.webhooks.admission import PRODUCE_TIMEOUT, RETRY_AFTER, SHED, Overloaded, get_admission, priority_of
+from backend.webhooks.coalesce import Coalescer, close_coalescers, get_coalescer
+from backend.webhooks.dedup import fingerprint, get_dedup
+from backend.webhooks.spool import Spool, close_spools, get_spool
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib decoder gives the same result, slower
+    loads = json.loads
+
+load_dotenv()
+
+PROJECT_ID = os.getenv("PROJECT_ID", "alpha")
+# Bytes of the body searched for the discriminator before the full decode
+PEEK_BYTES = 512
+
+log = get_logger("webhooks")
+
+IGNORED = counter("webhook_ignored_total", "Deliveries acknowledged without publishing", ("source", "reason"))
+DUPLICATES = counter("webhook_duplicates_total", "Deliveries dropped as duplicates", ("source",))
+SIGNATURE_FAILURES = counter("webhook_signature_failures_total", "Deliveries rejected for a bad signature", ("source",))
+MALFORMED = counter("webhook_malformed_total", "Deliveries rejected as unparseable or incomplete", ("source",))
+
+_MISSING = object()
+
+
+class SchemaError(Exception):
+    """Raised when a payload cannot be decoded or lacks a required field"""
+
+
+class Path:
+    """Read a dotted path, falling back to `default`, then apply `transform`"""
+
+    def __init__(self, path: str, default: Any = None, transform: Callable | None = None, required: bool = False):
+        self.parts = tuple(path.split("."))
+        self.default = default
+        self.transform = transform
+        self.required = required
+
+    def compile(self, name: str) -> Callable[[dict, dict], Any]:
+        parts, default, transform, required = self.parts, self.default, self.transform, self.required
+
+        def extract(payload: dict, context: dict) -> Any:
+            value = payload
+            for part in parts:
+                value = value.get(part, _MISSING) if isinstance(value, dict) else _MISSING
+                if value is _MISSING or value is None:
+                    if required:
+                        raise SchemaError(f"Missing required field '{'.'.join(parts)}' for '{name}'")
+                    value = default
+                    break
+            if transform is not None and value is not None:
+                value = transform(value)
+            return value
+
+        return extract
+
+
+class Each:
+    """Collect `item_path` from every element of the list at `path`"""
+
+    def __init__(self, path: str, item_path: str):
+        self.path = Path(path, default=())
+        self.item = Path(item_path)
+
+    def compile(self, name: str) -> Callable[[dict, dict], list]:
+        items, item = self.path.compile(name), self.item.compile(name)
+
+        def extract(payload: dict, context: dict) -> list:
+            return [value for value in (item(entry, context) for entry in items(payload, context)) if value is not None]
+
+        return extract
+
+
+class Const:
+    """A fixed value"""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def compile(self, name: str) -> Callable[[dict, dict], Any]:
+        value = self.value
+        return lambda payload, context: value
+
+
+class Context:
+    """A value supplied by the receiver (delivery id, configured project, ...)"""
+
+    def __init__(self, key: str, default: Any = None):
+        self.key = key
+        self.default = default
+
+    def compile(self, name: str) -> Callable[[dict, dict], Any]:
+        key, default = self.key, self.default
+        return lambda payload, context: context.get(key, default)
+
+
+def compile_mapping(mapping: dict) -> Callable[[dict, dict], dict]:
+    """Turn a {field: spec} mapping into a function payload, context -> event"""
+    extractors = []
+    for name, spec in mapping.items():
+        if isinstance(spec, str):
+            spec = Path(spec)
+        extractors.append((name, spec.compile(name) if hasattr(spec, "compile") else spec))
+    extractors = tuple(extractors)
+
+    def normalize(payload: dict, context: dict) -> dict:
+        return {name: extract(payload, context) for name, extract in extractors}
+
+    return normalize
+
+
+# Top-level keys whose values are plain scalars; anything nested ends the prefix
+_SCALAR_MEMBER = rb'\s*"[^"\\]*"\s*:\s*(?:"[^"\\]*"|-?[0-9][0-9.eE+-]*|true|false|null)\s*,'
+
+
+def peek_pattern(field: str) -> re.Pattern:
+    """
+    Regex matching `"field": "value"` as a member of the outermost JSON object
+
+    Only plain scalar members may come before it, so the match can never be
+    a key inside a nested object or array.
+    """
+    return re.compile(
+        rb'\s*\{(?:' + _SCALAR_MEMBER + rb')*?\s*"' + re.escape(field.encode()) + rb'"\s*:\s*"([^"\\]*)"'
+    )
+
+
+def peek_string(body: bytes, pattern: re.Pattern, limit: int = PEEK_BYTES) -> str | None:
+    """
+    Find a top-level string field near the start of a JSON body without decoding it
+
+    Webhook senders put the event discriminator (GitHub's `action`, Jira's
+    `webhookEvent`) among the first keys, after at most a few scalar ones.
+    Returns None when it is not provably a top-level member within the first
+    `limit` bytes (a nested object or an escaped string comes first, say),
+    in which case the caller decodes as usual.
+    """
+    match = pattern.match(body, 0, limit)
+    return match.group(1).decode() if match else None
+
+
+class Source:
+    """
+    One webhook source: its relevance filter and its mapping to our event schema
+
+    A delivery is relevant when the `discriminator` field is in `accept` or
+    starts with one of `accept_prefixes`, and `require` (if set) is present
+    and non-empty.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mapping: dict,
+        discriminator: str,
+        accept: set[str] = frozenset(),
+        accept_prefixes: tuple[str, ...] = (),
+        require: str | None = None,
+        topic: str = "issues",
+        ignored_reply: str = "ignored",
+    ):
+        self.name = name
+        self.discriminator = discriminator
+        self.accept = frozenset(accept)
+        self.accept_prefixes = tuple(accept_prefixes)
+        self.require = require
+        self.topic = topic
+        self.ignored_reply = ignored_reply
+        self.normalize = compile_mapping(mapping)
+        self._peek = peek_pattern(discriminator)
+
+    def accepts(self, value: str | None) -> bool:
+        return value is not None and (value in self.accept or value.startswith(self.accept_prefixes))
+
+    def parse(self, body: bytes, context: dict) -> tuple[dict | None, str | None, Any]:
+        """
+        Decode and normalize one delivery
+
+        Returns:
+            (event, None, None) for a relevant delivery, or (None, reason, value)
+            when it is ignored; raises SchemaError for malformed bodies
+        """
+        peeked = peek_string(body, self._peek)
+        if peeked is not None and not self.accepts(peeked):
+            return None, self.discriminator, peeked
+
+        try:
+            payload = loads(body)
+        except ValueError as e:
+            raise SchemaError(f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise SchemaError("Expected a JSON object")
+
+        value = payload.get(self.discriminator)
+        if not isinstance(value, str) or not self.accepts(value):
+            return None, self.discriminator, value
+        if self.require and not payload.get(self.require):
+            return None, "incomplete", f"no_{self.require}_data"
+        return self.normalize(payload, context), None, None
+
+
+async def ingest(source: Source, body: bytes, context: dict) -> dict:
+    """
+    Run an authenticated delivery through filter, normalize, dedup, coalesce and publish
+
+    Returns the JSON reply for the sender; raises SchemaError for bodies that
+    cannot be normalized and Overloaded when the delivery should be retried later.
+    Updates held for coalescing are acknowledged right away and published merged.
+    """
+    received = now_ms()
+    try:
+        event, reason, value = source.parse(body, context)
+    except SchemaError:
+        MALFORMED.labels(source.name).inc()
+        raise
+    if event is None:
+        IGNORED.labels(source.name, reason).inc()
+        return {"ok": True, source.ignored_reply: value}
+    stamp(event, "received", received)
+
+    # Drop redeliveries and repeated identical updates without touching the broker
+    dedup = get_dedup()
+    key = fingerprint(event)
+    if await dedup.seen_async(key):
+        DUPLICATES.labels(source.name).inc()
+        return {"ok": True, "duplicate": True, "event_id": event["event_id"]}
+
+    try:
+        # Storms of updates to one issue go out as a single merged event
+        coalescer = source_coalescer(source)
+        if coalescer is not None and await coalescer.submit(event):
+            return {"ok": True, "event_id": event["event_id"], "coalesced": True}
+        return await publish(source, event)
+    except Exception:
+        # Let the upstream's retry through instead of treating it as a duplicate
+        await dedup.forget_async(key)
+        raise
+
+
+def source_coalescer(source: Source) -> Coalescer | None:
+    """
+    This process's coalescer for a source, or None when coalescing is off
+
+    Merged events skip admission: their deliveries were already acknowledged,
+    and holding them is what keeps their rate down.
+    """
+    return get_coalescer(source.name, lambda merged: publish(source, merged, admit=False))
+
+
+async def publish(source: Source, event: dict, admit: bool = True) -> dict:
+    """
+    Publish a normalized event to the source's topic
+
+    With `admit` the event first takes an admission slot, raising Overloaded
+    when there is none. The wait for the broker is capped; if it fails or
+    times out and a spool is configured, the event is spooled and
+    acknowledged instead, otherwise the error is raised.
+    """
+    stamp(event, "published")
+    # Events for a key that already has spooled records follow them, keeping per-key order
+    topic, record_key = source.topic, event["project_id"]
+    spool = get_spool(source.name)
+    if spool is not None and spool.should_spool(topic, record_key):
+        return await _spool(spool, topic, event)
+
+    admission = get_admission(source.name) if admit else None
+    priority = priority_of(event)
+    if admission is not None:
+        try:
+            await admission.acquire(priority)
+        except Overloaded:
+            if spool is not None and spool.diverting:
+                # The slots were held by produces to a broker that has since failed
+                return await _spool(spool, topic, event)
+            raise
+    try:
+        await asyncio.wait_for(get_producer().produce(topic, record_key, event), PRODUCE_TIMEOUT)
+    except Exception as e:
+        if spool is None:
+            if isinstance(e, asyncio.TimeoutError):
+                SHED.labels(source.name, str(priority), "503").inc()
+                raise Overloaded(503, RETRY_AFTER, f"Broker did not acknowledge within {PRODUCE_TIMEOUT:g}s")
+            raise
+        log.warning("Produce to '%s' failed, spooling: %s", topic, str(e) or type(e).__name__)
+    else:
+        return {"ok": True, "event_id": event["event_id"]}
+    finally:
+        if admission is not None:
+            admission.release()
+
+    # Until the drainer gets through, later events skip the broker instead of waiting out the timeout
+    spool.diverting = True
+    return await _spool(spool, topic, event)
+
+
+async def _spool(spool: Spool, topic: str, event: dict) -> dict:
+    """Write the event to the local spool and acknowledge it once it is on disk"""
+    await spool.append(topic, event["project_id"], event)
+    return {"ok": True, "event_id": event["event_id"], "spooled": True}
+
+
+def create_receiver(
+    source: Source,
+    service: str,
+    route: str,
+    authenticate: Callable[[Request, bytes], bool] | None = None,
+    auth_error: str = "Invalid token",
+    prefilter: Callable[[Request], str | None] | None = None,
+    context: Callable[[Request], dict] | None = None,
+) -> FastAPI:
+    """
+    FastAPI app that receives one source's webhooks at POST `route`
+
+    The app replays anything spooled by an earlier run on startup, publishes
+    held updates and closes connections on shutdown, serves /health and
+    /metrics, and answers SchemaError with 400 and Overloaded with its status
+    and Retry-After. The source supplies the rest:
+
+        authenticate(request, body)   False rejects the delivery with 401
+        prefilter(request)            a value to acknowledge as ignored without decoding, or None
+        context(request)              fields for the mapping besides project_id
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        spool = get_spool(source.name)
+        if spool is not None:
+            spool.start()
+        yield
+        await close_coalescers()
+        await close_spools()
+        await close_producer()
+        await close_async_transports()
+
+    app = FastAPI(lifespan=lifespan)
+    instrument(app, service)
+
+    @app.get("/health")
+    async def health():
+        """Health check endpoint"""
+        spool = get_spool(source.name)
+        coalescer = source_coalescer(source)
+        return {
+            "status": "ok",
+            "service": f"{service}-receiver",
+            "dedup": get_dedup().stats(),
+            "admission": get_admission(source.name).stats(),
+            "spool": spool.stats() if spool else None,
+            "coalesce": coalescer.stats() if coalescer else None,
+        }
+
+    @app.post(route, name=f"{source.name}_webhook")
+    async def receive(request: Request):
+        """Authenticate a delivery and publish it to the source's topic"""
+        body = await request.body()
+        if authenticate is not None and not authenticate(request, body):
+            SIGNATURE_FAILURES.labels(source.name).inc()
+            raise HTTPException(status_code=401, detail=auth_error)
+
+        ignored = prefilter(request) if prefilter is not None else None
+        if ignored is not None:
+            IGNORED.labels(source.name, "event").inc()
+            return {"ok": True, "ignored": ignored}
+
+        fields = {"project_id": PROJECT_ID, **(context(request) if context is not None else {})}
+        try:
+            return await ingest(source, body, fields)
+        except SchemaError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Overloaded as e:
+            raise HTTPException(status_code=e.status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    return app
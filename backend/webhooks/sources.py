@@ -0,0 +1,102 @@
+"""
+Webhook Sources
+Declarative mappings from each issue tracker's webhook payload to our event schema
+"""
+from backend.webhooks.pipeline import Const, Context, Each, Path, Source
+
+PREVIEW_CHARS = 280
+
+
+def _preview(text: str) -> str:
+    return text[:PREVIEW_CHARS]
+
+
+def _first_username(users: list) -> str | None:
+    return (users[0] or {}).get("username") if users else None
+
+
+GITHUB_ISSUES = Source(
+    name="github",
+    discriminator="action",
+    accept={"opened", "reopened", "labeled"},
+    ignored_reply="ignored_action",
+    mapping={
+        "event_id": lambda payload, context: context.get("delivery_id") or f"gh-{(payload.get('issue') or {}).get('id')}",
+        "project_id": Context("project_id"),
+        "source": Const("github"),
+        "type": Path("action", transform=lambda action: f"issue_{action}"),
+        "repo": Path("repository.full_name", required=True),
+        "issue_number": Path("issue.number", required=True),
+        "title": Path("issue.title", required=True),
+        "url": Path("issue.html_url", required=True),
+        "labels": Each("issue.labels", "name"),
+        "assignee": "issue.assignee.login",
+        "author": Path("sender.login", required=True),
+        "created_at": Path("issue.created_at", required=True),
+        "updated_at": "issue.updated_at",
+        "state": Path("issue.state", default="open"),
+        "body_preview": Path("issue.body", default="", transform=_preview),
+    },
+)
+
+JIRA_EVENT_TYPES = {
+    "jira:issue_created": "issue_created",
+    "jira:issue_updated": "issue_updated",
+}
+
+JIRA_ISSUES = Source(
+    name="jira",
+    discriminator="webhookEvent",
+    accept_prefixes=("jira:issue_",),
+    require="issue",
+    mapping={
+        "event_id": Path("issue.id", transform=lambda issue_id: f"jira-{issue_id}"),
+        "project_id": Context("project_id"),
+        "source": Const("jira"),
+        "type": Path("webhookEvent", transform=lambda name: JIRA_EVENT_TYPES.get(name, "issue_updated")),
+        "issue_key": Path("issue.key", default=""),
+        "title": Path("issue.fields.summary", default=""),
+        "url": Path("issue.self", default=""),
+        "labels": Path("issue.fields.labels", default=(), transform=list),
+        "assignee": "issue.fields.assignee.displayName",
+        "priority": Path("issue.fields.priority.name", default=""),
+        "status": Path("issue.fields.status.name", default=""),
+        "issue_type": Path("issue.fields.issuetype.name", default=""),
+        "created_at": Path("issue.fields.created", default=""),
+        "updated_at": Path("issue.fields.updated", default=""),
+        "due_at": Path("issue.fields.duedate", default=""),
+        "body_preview": Path("issue.fields.description", default="", transform=_preview),
+    },
+)
+
+# GitLab sends present-tense actions; ours read like GitHub's
+GITLAB_ACTIONS = {"open": "opened", "reopen": "reopened", "update": "updated", "close": "closed"}
+
+GITLAB_ISSUES = Source(
+    name="gitlab",
+    discriminator="object_kind",
+    accept={"issue"},
+    require="object_attributes",
+    mapping={
+        "event_id": Path("object_attributes.id", transform=lambda issue_id: f"gl-{issue_id}"),
+        "project_id": Context("project_id"),
+        "source": Const("gitlab"),
+        "type": Path(
+            "object_attributes.action",
+            default="updated",
+            transform=lambda action: f"issue_{GITLAB_ACTIONS.get(action, action)}",
+        ),
+        "repo": Path("project.path_with_namespace", required=True),
+        "issue_number": Path("object_attributes.iid", required=True),
+        "title": Path("object_attributes.title", default=""),
+        "url": Path("object_attributes.url", default=""),
+        "labels": Each("labels", "title"),
+        "assignee": Path("assignees", transform=_first_username),
+        "author": "user.username",
+        "created_at": "object_attributes.created_at",
+        "updated_at": "object_attributes.updated_at",
+        "due_at": Path("object_attributes.due_date", default=""),
+        "state": Path("object_attributes.state", default="opened"),
+        "body_preview": Path("object_attributes.description", default="", transform=_preview),
+    },
+)
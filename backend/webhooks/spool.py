@@ -0,0 +1,449 @@
+"""
+Webhook Spool
+Local write-ahead log for deliveries the broker could not take, replayed in the background
+
+When a produce fails or times out, the normalized event is appended here and
+the sender gets its 200 right away. Segments are append-only files of
+length- and CRC-prefixed JSON records:
+
+    <WEBHOOK_SPOOL_DIR>/<source>[-n]/<sequence, 20 digits>.spool
+                                     cursor          # "<sequence> <position>", the next record to replay
+
+Appends made within WEBHOOK_SPOOL_FSYNC_MS of each other share one fsync,
+and the receiver replies only once its record is on disk. The drainer
+replays records to Pandaproxy in file order, one request per topic at a
+time, retrying with backoff until the broker answers again.
+
+Per-key ordering: while a (topic, key) pair has records waiting, new events
+for it are spooled too instead of overtaking them, and while the broker is
+failing every event goes straight to the spool rather than waiting out the
+produce timeout. Replay is at-least-once; a record whose produce timed out
+may have reached the broker as well, and consumers already tolerate
+redelivery by event id.
+
+When a receiver runs with fewer workers than before, the directories of the
+workers that are gone are not claimed again. On start, each drainer adopts
+every <source>[-n] directory no live worker holds the lock of, replays it
+ahead of its own records and then lets it go.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import re
+import struct
+import zlib
+from collections import Counter
+from pathlib import Path
+from dotenv import load_dotenv
+
+from backend.common.log import get_logger
+from backend.common.metrics import counter, gauge
+from backend.events.producer import MAX_BATCH_SIZE, Producer
+
+load_dotenv()
+
+# Empty disables the spool; failed produces then surface to the sender as before
+SPOOL_DIR = os.getenv("WEBHOOK_SPOOL_DIR", ".spool")
+SPOOL_FSYNC_MS = float(os.getenv("WEBHOOK_SPOOL_FSYNC_MS", "5"))
+SPOOL_SEGMENT_BYTES = int(os.getenv("WEBHOOK_SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+SPOOL_DRAIN_BATCH = int(os.getenv("WEBHOOK_SPOOL_DRAIN_BATCH", "500"))
+SPOOL_MAX_BACKOFF = float(os.getenv("WEBHOOK_SPOOL_MAX_BACKOFF", "30"))
+
+FRAME = struct.Struct(">II")  # payload length, crc32 of the payload
+READ_CHUNK_BYTES = 1024 * 1024
+
+log = get_logger("spool")
+
+SPOOLED = gauge("webhook_spool_records", "Deliveries waiting in the local spool", ("source",))
+APPENDED = counter("webhook_spool_appended_total", "Deliveries written to the local spool", ("source",))
+DRAINED = counter("webhook_spool_drained_total", "Spooled deliveries replayed to the broker", ("source",))
+DRAIN_ERRORS = counter("webhook_spool_drain_errors_total", "Failed spool replay batches", ("source",))
+
+
+class Spool:
+    """
+    Segmented write-ahead log plus its drainer for one receiver process
+
+    The directory is held with an exclusive flock, so two workers never share
+    a spool; a worker started later takes over whatever a previous one left.
+    With `root`, that existing directory is opened instead (it must not be
+    locked), for adopting a departed worker's spool.
+    Used from the event loop only, apart from the fsyncs run in a thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        source: str,
+        fsync_ms: float = SPOOL_FSYNC_MS,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        drain_batch: int = SPOOL_DRAIN_BATCH,
+        root: Path | None = None,
+    ):
+        self.source = source
+        self.fsync_ms = fsync_ms
+        self.segment_bytes = segment_bytes
+        # No more than one produce request, so a topic's records stay in order
+        self.drain_batch = min(drain_batch, MAX_BATCH_SIZE)
+        if root is None:
+            self.root = self._claim(Path(directory), source)
+        else:
+            self._lock_file = self._lock(root)
+            if self._lock_file is None:
+                raise BlockingIOError(f"Spool {root} is held by another worker")
+            self.root = root
+        # Departed workers' spools being replayed by this one's drainer
+        self._adopted: list[Spool] = []
+
+        # (topic, key) -> records of that pair still in the spool
+        self.pending: Counter = Counter()
+        self.records = 0
+        self.appended = 0
+        self.drained = 0
+        # Set when a produce fails; cleared once the drainer has emptied the spool
+        self.diverting = False
+
+        self._cursor_path = self.root / "cursor"
+        self._cursor = self._load_cursor()
+        # Closed segments' lengths; the active one's is self._size
+        self._ends: dict[int, int] = {}
+        self._segments: list[int] = []
+        self._recover()
+        self._active = self._segments[-1]
+        self._size = self._ends.pop(self._active)
+        self._writer = open(self._path(self._active), "ab", buffering=0)
+
+        self._sync_future: asyncio.Future | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._producer: Producer | None = None
+        if root is None:
+            SPOOLED.labels(source).set_function(self.waiting)
+
+    @staticmethod
+    def _lock(root: Path):
+        """The directory's lock file, held exclusively, or None if a live worker holds it"""
+        lock = open(root / "lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _claim(self, directory: Path, source: str) -> Path:
+        """Lock the first free <source>[-n] directory under `directory`"""
+        n = 0
+        while True:
+            root = directory / (source if n == 0 else f"{source}-{n}")
+            root.mkdir(parents=True, exist_ok=True)
+            lock = self._lock(root)
+            if lock is None:
+                n += 1
+                continue
+            self._lock_file = lock
+            return root
+
+    def _adopt(self) -> None:
+        """Take over every other <source>[-n] directory that no live worker holds"""
+        name = re.compile(re.escape(self.source) + r"(-\d+)?")
+        for root in sorted(self.root.parent.iterdir()):
+            if root == self.root or not root.is_dir() or not name.fullmatch(root.name):
+                continue
+            try:
+                orphan = Spool(str(root.parent), self.source, self.fsync_ms, self.segment_bytes, self.drain_batch, root=root)
+            except BlockingIOError:
+                continue
+            if not orphan.records:
+                orphan._release()
+                continue
+            log.info("Adopting %d deliveries from %s, left by a worker that is gone", orphan.records, root)
+            self._adopted.append(orphan)
+
+    def _release(self) -> None:
+        """Close the log and give up the directory (everything appended must be synced)"""
+        self._writer.close()
+        self._lock_file.close()
+
+    def waiting(self) -> int:
+        """Records left to replay, adopted spools included"""
+        return self.records + sum(orphan.records for orphan in self._adopted)
+
+    def _path(self, sequence: int) -> Path:
+        return self.root / f"{sequence:020d}.spool"
+
+    def _load_cursor(self) -> tuple[int, int]:
+        try:
+            sequence, position = self._cursor_path.read_text().split()
+            return int(sequence), int(position)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_cursor(self) -> None:
+        temporary = self._cursor_path.with_suffix(".tmp")
+        temporary.write_text("%d %d\n" % self._cursor)
+        os.replace(temporary, self._cursor_path)
+
+    def _recover(self) -> None:
+        """Count what is left to replay and cut off a torn tail left by a crash"""
+        sequences = sorted(int(p.stem) for p in self.root.glob("*.spool"))
+        start_sequence, start_position = self._cursor
+        for sequence in sequences:
+            if sequence < start_sequence:
+                self._path(sequence).unlink(missing_ok=True)
+                continue
+            path = self._path(sequence)
+            data = path.read_bytes()
+            position = start_position if sequence == start_sequence else 0
+            end = self._scan(data, position)
+            if end < len(data):
+                log.warning("Truncating %d unreadable bytes from %s", len(data) - end, path)
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+            self._segments.append(sequence)
+            self._ends[sequence] = end
+        if not self._segments:
+            sequence = max(start_sequence, 0)
+            self._path(sequence).touch()
+            self._segments.append(sequence)
+            self._ends[sequence] = 0
+            self._cursor = (sequence, 0)
+        if self._cursor[0] < self._segments[0]:
+            self._cursor = (self._segments[0], 0)
+        if self.records:
+            log.info("Spool %s holds %d deliveries from an earlier run", self.root, self.records)
+
+    def _scan(self, data: bytes, position: int) -> int:
+        """Count intact records in data[position:]; returns where they end"""
+        while position + FRAME.size <= len(data):
+            length, crc = FRAME.unpack_from(data, position)
+            payload = data[position + FRAME.size:position + FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                record = json.loads(payload)
+            except ValueError:
+                break
+            self.pending[(record["topic"], record["key"])] += 1
+            self.records += 1
+            position += FRAME.size + length
+        return position
+
+    def should_spool(self, topic: str, key: str) -> bool:
+        """True while the broker is failing or earlier records for this key are still spooled"""
+        pair = (topic, key)
+        return self.diverting or pair in self.pending or any(pair in orphan.pending for orphan in self._adopted)
+
+    async def append(self, topic: str, key: str, value: dict) -> None:
+        """Write a record and return once it has been fsynced"""
+        payload = json.dumps({"topic": topic, "key": key, "value": value}, default=str).encode()
+        frame = FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        if self._size >= self.segment_bytes:
+            self._roll()
+        self._writer.write(frame)
+        self._size += len(frame)
+        self.pending[(topic, key)] += 1
+        self.records += 1
+        self.appended += 1
+        APPENDED.labels(self.source).inc()
+        self._notify()
+        await self._sync()
+
+    def _roll(self) -> None:
+        os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._ends[self._active] = self._size
+        self._active += 1
+        self._segments.append(self._active)
+        self._size = 0
+        self._writer = open(self._path(self._active), "ab", buffering=0)
+
+    def _sync(self) -> asyncio.Future:
+        """Join the next group fsync, scheduling it if none is pending"""
+        if self._sync_future is None:
+            loop = asyncio.get_running_loop()
+            self._sync_future = loop.create_future()
+            loop.call_later(self.fsync_ms / 1000, self._start_sync)
+        return asyncio.shield(self._sync_future)
+
+    def _start_sync(self) -> None:
+        future, self._sync_future = self._sync_future, None
+        if future is None:
+            # Closed in the meantime, which synced everything
+            return
+        # A duplicate descriptor stays valid if the segment rolls while the fsync runs
+        fd = os.dup(self._writer.fileno())
+
+        async def run():
+            try:
+                await asyncio.to_thread(os.fsync, fd)
+            except OSError as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+            finally:
+                os.close(fd)
+
+        asyncio.get_running_loop().create_task(run())
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def _read(self, limit: int) -> tuple[list[dict], tuple[int, int]]:
+        """Up to `limit` records from the cursor on, and the cursor just past them"""
+        sequence, position = self._cursor
+        records: list[dict] = []
+        while len(records) < limit:
+            end = self._size if sequence == self._active else self._ends[sequence]
+            if position >= end:
+                if sequence == self._active:
+                    break
+                sequence, position = sequence + 1, 0
+                continue
+            fd = os.open(self._path(sequence), os.O_RDONLY)
+            try:
+                data = os.pread(fd, min(end - position, READ_CHUNK_BYTES), position)
+                if len(data) >= FRAME.size:
+                    needed = FRAME.size + FRAME.unpack_from(data)[0]
+                    if needed > len(data):
+                        # A single record larger than the chunk
+                        data = os.pread(fd, needed, position)
+            finally:
+                os.close(fd)
+            offset = 0
+            while offset + FRAME.size <= len(data) and len(records) < limit:
+                length, _ = FRAME.unpack_from(data, offset)
+                if offset + FRAME.size + length > len(data):
+                    break
+                records.append(json.loads(data[offset + FRAME.size:offset + FRAME.size + length]))
+                offset += FRAME.size + length
+            position += offset
+        return records, (sequence, position)
+
+    def _advance(self, records: list[dict], cursor: tuple[int, int]) -> None:
+        for record in records:
+            pair = (record["topic"], record["key"])
+            self.pending[pair] -= 1
+            if self.pending[pair] <= 0:
+                del self.pending[pair]
+        self.records -= len(records)
+        self.drained += len(records)
+        DRAINED.labels(self.source).inc(len(records))
+        previous = self._cursor[0]
+        self._cursor = cursor
+        self._save_cursor()
+        for sequence in range(previous, cursor[0]):
+            self._ends.pop(sequence, None)
+            if sequence in self._segments:
+                self._segments.remove(sequence)
+            self._path(sequence).unlink(missing_ok=True)
+
+    async def _replay(self, records: list[dict]) -> None:
+        """Produce a batch, one request per topic, failing if any record fails"""
+        if self._producer is None:
+            # Our own buffers, so live traffic never splits a replayed batch across requests
+            self._producer = Producer()
+        producer = self._producer
+        by_topic: dict[str, list[tuple[str, dict]]] = {}
+        for record in records:
+            by_topic.setdefault(record["topic"], []).append((record["key"], record["value"]))
+        futures = [f for topic, batch in by_topic.items() for f in producer.send_many(topic, batch)]
+        await asyncio.gather(*futures)
+
+    async def _drain(self) -> None:
+        backoff = 0.5
+        while True:
+            # Adopted spools hold the older records, so they go first
+            spool = self._adopted[0] if self._adopted else self
+            if spool is not self and not spool.records:
+                self._adopted.pop(0)._release()
+                continue
+            if not self.records and spool is self:
+                self.diverting = False
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            # No more than the producer sends in one request, so a topic's records stay in order
+            records, cursor = spool._read(self.drain_batch)
+            if not records:
+                if spool is not self:
+                    self._adopted.pop(0)._release()
+                    continue
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            try:
+                await self._replay(records)
+            except Exception as e:
+                DRAIN_ERRORS.labels(self.source).inc()
+                self.diverting = True
+                log.warning("Spool replay failed (%d waiting), retrying in %.1fs: %s", self.waiting(), backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, SPOOL_MAX_BACKOFF)
+                continue
+            backoff = 0.5
+            spool._advance(records, cursor)
+
+    def start(self) -> None:
+        """Adopt departed workers' spools and start the drainer on the running loop"""
+        if self._task is None:
+            self._adopt()
+            self._wake = asyncio.Event()
+            if self.waiting():
+                self._wake.set()
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def close(self) -> None:
+        """Stop the drainer and flush the log; anything left is replayed on the next start"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._producer is not None:
+            await self._producer.close()
+        os.fsync(self._writer.fileno())
+        if self._sync_future is not None:
+            self._sync_future.set_result(None)
+            self._sync_future = None
+        self._release()
+        # Whatever is left of them is adopted again on the next start
+        for orphan in self._adopted:
+            orphan._release()
+        self._adopted.clear()
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.root),
+            "records": self.records,
+            "adopted": [str(orphan.root) for orphan in self._adopted],
+            "adopted_records": self.waiting() - self.records,
+            "keys": len(self.pending),
+            "appended": self.appended,
+            "drained": self.drained,
+            "diverting": self.diverting,
+        }
+
+
+_spools: dict[str, Spool] = {}
+
+
+def get_spool(source: str) -> Spool | None:
+    """Return this process's spool for a webhook source, or None when spooling is disabled"""
+    if not SPOOL_DIR:
+        return None
+    spool = _spools.get(source)
+    if spool is None:
+        spool = _spools[source] = Spool(SPOOL_DIR, source)
+    return spool
+
+
+async def close_spools() -> None:
+    """Stop every drainer and close the logs (call on app shutdown, before close_producer)"""
+    for spool in _spools.values():
+        await spool.close()
+    _spools.clear()